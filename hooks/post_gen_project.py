@@ -20,39 +20,60 @@ DEBUG_VALUE = "debug"
 
 
 def remove_open_source_files():
-    file_names = ["CONTRIBUTORS.txt", "LICENSE"]
+    file_names = ["CONTRIBUTING.txt", "LICENSE.txt"]
     for file_name in file_names:
-        Path(file_name).unlink()
+        Path(file_name).unlink(missing_ok=True)
 
 
 def remove_gplv3_files():
     file_names = ["COPYING"]
     for file_name in file_names:
-        Path(file_name).unlink()
+        Path(file_name).unlink(missing_ok=True)
 
 
 def remove_dotgitlabciyml_file():
-    Path(".gitlab-ci.yml").unlink()
+    Path(".gitlab-ci.yml").unlink(missing_ok=True)
 
 
 def remove_dotgithub_folder():
-    shutil.rmtree(".github")
-
-
-def main():
-    debug = "{{ cookiecutter.debug }}".lower() == "y"
-
-    if "{{ cookiecutter.open_source_license }}" == "Not open source":
+    shutil.rmtree(".github", ignore_errors=True)
+
+
+def create_dag_bundles(dag_bundles):
+    """
+    Create the DAG folders of the bundles the template does not ship. Also used
+    by scripts/bake.py for each project of a batch.
+    """
+    for bundle in dag_bundles.split(","):
+        if bundle.strip():
+            folder = Path("airflow", "dags", bundle.strip())
+            folder.mkdir(parents=True, exist_ok=True)
+            (folder / "__init__.py").touch()
+
+
+def prune(open_source_license, ci_tool):
+    """
+    Remove the files the chosen options do not use from the project in the
+    current directory. Also used by scripts/bake.py for each project of a batch.
+    """
+    if open_source_license == "Not open source":
         remove_open_source_files()
-    if "{{ cookiecutter.open_source_license}}" != "GPLv3":
+    if open_source_license != "GPLv3":
         remove_gplv3_files()
 
-    if "{{ cookiecutter.ci_tool }}" != "Gitlab":
+    if ci_tool != "Gitlab":
         remove_dotgitlabciyml_file()
 
-    if "{{ cookiecutter.ci_tool }}" != "Github":
+    if ci_tool != "Github":
         remove_dotgithub_folder()
 
+
+def main():
+    debug = "{{ cookiecutter.debug }}".lower() == "y"
+
+    prune("{{ cookiecutter.open_source_license }}", "{{ cookiecutter.ci_tool }}")
+    create_dag_bundles("{{ cookiecutter.dag_bundles }}")
+
     print(SUCCESS + "Project initialized, keep up the good work!" + TERMINATOR)
 
 
@@ -0,0 +1,43 @@
+import sys
+
+TERMINATOR = "\x1b[0m"
+ERROR = "\x1b[1;31m [ERROR]: "
+
+
+def dag_bundles(value) -> list[str]:
+    """
+    Return the DAG bundles of the comma separated ``dag_bundles`` option.
+    """
+    return [bundle.strip() for bundle in value.split(",") if bundle.strip()]
+
+
+def check_dag_processors(dag_processors, bundles):
+    """
+    Raise a ValueError when the options ask for more dag-processors than there
+    are DAG bundles to spread over them. Also used by scripts/bake.py for each
+    project of a batch.
+    """
+    bundles = dag_bundles(bundles)
+    if not bundles:
+        raise ValueError("dag_bundles lists no DAG bundle")
+    if not dag_processors.isdigit() or int(dag_processors) < 1:
+        raise ValueError(f"dag_processors {dag_processors!r} is not a positive number")
+    if int(dag_processors) > len(bundles):
+        raise ValueError(
+            f"dag_processors {dag_processors} exceeds the {len(bundles)} DAG "
+            f"bundles {bundles}, a dag-processor parses at least one bundle"
+        )
+
+
+def main():
+    try:
+        check_dag_processors(
+            "{{ cookiecutter.dag_processors }}", "{{ cookiecutter.dag_bundles }}"
+        )
+    except ValueError as error:
+        print(ERROR + str(error) + TERMINATOR)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+Bake many projects from the template in parallel, one per manifest entry.
+
+The manifest is a JSON list of contexts or a CSV file with one column per
+variable of cookiecutter.json; the variables missing from an entry keep their
+default. For example::
+
+    project_name,airflow_version,ci_tool,open_source_license,postgresql_version
+    sales-pipelines,2.10.0,Github,MIT,17
+    finance-pipelines,3.0.0,Gitlab,Not open source,16
+
+    python scripts/bake.py manifest.csv --output-dir projects --workers 8
+
+The projects are baked by a pool of processes. The templates are compiled once
+into a shared Jinja bytecode cache and every worker loads cookiecutter.json
+once, so a project only costs its rendering. The options are checked and the
+files pruned with the functions of the hooks in the worker, instead of
+rendering and running the hooks in a new interpreter for each project. Every
+project is then validated and a summary gives its time and status; the exit
+code is 1 if a project failed.
+"""
+
+import argparse
+import copy
+import csv
+import fnmatch
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import time
+import tomllib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+TEMPLATE = Path(__file__).resolve().parent.parent
+WORKERS = int(os.environ.get("BAKE_WORKERS", os.cpu_count() or 1))
+
+
+@dataclass(frozen=True)
+class Baked:
+    name: str
+    path: str
+    seconds: float
+    problems: tuple[str, ...] = ()
+
+    @property
+    def status(self) -> str:
+        return "; ".join(self.problems) if self.problems else "ok"
+
+
+def load_manifest(path, template=TEMPLATE) -> list[dict]:
+    """
+    Read the contexts of a JSON or CSV manifest, checking their variables
+    exist in the template and the project names are unique.
+    """
+    path = Path(path)
+    if path.suffix == ".csv":
+        with path.open(newline="") as manifest:
+            entries = [
+                {key: value for key, value in row.items() if value}
+                for row in csv.DictReader(manifest)
+            ]
+    else:
+        entries = json.loads(path.read_text())
+
+    variables = json.loads((Path(template) / "cookiecutter.json").read_text())
+    names = set()
+    for number, entry in enumerate(entries, start=1):
+        unknown = sorted(set(entry) - set(variables))
+        if unknown:
+            raise ValueError(f"Entry {number} has unknown variables {unknown}")
+        if "project_name" not in entry:
+            raise ValueError(f"Entry {number} has no project_name")
+        if entry["project_name"] in names:
+            raise ValueError(f"Project {entry['project_name']} is listed twice")
+        names.add(entry["project_name"])
+    return entries
+
+
+def _template_dir(template) -> Path:
+    return next(Path(template).glob("*cookiecutter*}}"))
+
+
+def warm_bytecode_cache(template, bytecode_dir):
+    """
+    Compile every rendered file of the template into ``bytecode_dir``, with
+    the template names and loader cookiecutter uses so that the workers hit it.
+    """
+    from cookiecutter.generate import generate_context
+    from cookiecutter.utils import create_env_with_context, work_in
+    from jinja2 import FileSystemBytecodeCache, FileSystemLoader
+    from jinja2.exceptions import TemplateSyntaxError
+
+    context = generate_context(Path(template) / "cookiecutter.json")
+    copy_only = context["cookiecutter"].get("_copy_without_render", [])
+    context["cookiecutter"]["_jinja2_env_vars"] = {
+        "bytecode_cache": FileSystemBytecodeCache(str(bytecode_dir))
+    }
+    env = create_env_with_context(context)
+    compiled = 0
+    with work_in(_template_dir(template)):
+        env.loader = FileSystemLoader([".", "../templates"])
+        for path in Path(".").rglob("*"):
+            name = path.as_posix()
+            if not path.is_file() or any(
+                fnmatch.fnmatch(name, pattern) for pattern in copy_only
+            ):
+                continue
+            try:
+                env.get_template(name)
+                compiled += 1
+            except (TemplateSyntaxError, UnicodeDecodeError):
+                # Binary files are copied, the errors surface when baking
+                continue
+    return compiled
+
+
+_worker: dict[str, Any] = {}
+
+
+def _init_worker(template, bytecode_dir):
+    from cookiecutter.generate import generate_context
+    from jinja2 import FileSystemBytecodeCache
+
+    pre_gen = _load_hook(template, "pre_gen_project")
+    post_gen = _load_hook(template, "post_gen_project")
+    _worker.update(
+        template=Path(template),
+        context=generate_context(Path(template) / "cookiecutter.json"),
+        bytecode_cache=FileSystemBytecodeCache(str(bytecode_dir)),
+        check_dag_processors=pre_gen.check_dag_processors,
+        prune=post_gen.prune,
+        create_dag_bundles=post_gen.create_dag_bundles,
+    )
+
+
+def _load_hook(template, name):
+    spec = importlib.util.spec_from_file_location(
+        name, Path(template) / "hooks" / f"{name}.py"
+    )
+    hook = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(hook)
+    return hook
+
+
+def metadata_problems(project_dir) -> list[str]:
+    """
+    Return the problems building the project metadata of pyproject.toml, with
+    hatchling when installed, otherwise checking the files it refers to exist.
+    """
+    project_dir = Path(project_dir)
+    try:
+        project = tomllib.loads((project_dir / "pyproject.toml").read_text())
+    except (OSError, tomllib.TOMLDecodeError) as error:
+        return [f"pyproject.toml: {type(error).__name__}"]
+
+    try:
+        from hatchling.metadata.core import ProjectMetadata
+    except ImportError:
+        pass
+    else:
+        try:
+            ProjectMetadata(str(project_dir), None).core.validate_fields()
+        except (OSError, TypeError, ValueError) as error:
+            return [f"pyproject.toml: {error}"]
+        return []
+
+    metadata = project.get("project", {})
+    files = [
+        value.get("file") if isinstance(value, dict) else value
+        for value in (metadata.get("license"), metadata.get("readme"))
+    ]
+    return [
+        f"pyproject.toml: {name} does not exist"
+        for name in files
+        if isinstance(name, str) and not (project_dir / name).is_file()
+    ]
+
+
+def validate(project_dir, options) -> list[str]:
+    """
+    Return the problems of a baked project: Python files that do not compile,
+    YAML files that do not parse, project metadata that does not build and
+    files left over by the pruning.
+    """
+    import yaml
+
+    project_dir = Path(project_dir)
+    problems = []
+    for path in project_dir.rglob("*"):
+        relative = path.relative_to(project_dir)
+        if relative.parts[0] == "dbt" or not path.is_file():
+            continue
+        try:
+            if path.suffix == ".py":
+                compile(path.read_bytes(), str(path), "exec")
+            elif path.suffix in (".yml", ".yaml"):
+                list(yaml.safe_load_all(path.read_text()))
+        except (SyntaxError, yaml.YAMLError) as error:
+            problems.append(f"{relative}: {type(error).__name__}")
+    problems.extend(metadata_problems(project_dir))
+
+    expected = {
+        ".github": options["ci_tool"] == "Github",
+        ".gitlab-ci.yml": options["ci_tool"] == "Gitlab",
+        "COPYING": options["open_source_license"] == "GPLv3",
+        "LICENSE.txt": options["open_source_license"] != "Not open source",
+    }
+    for name, wanted in expected.items():
+        if (project_dir / name).exists() != wanted:
+            problems.append(f"{name} {'missing' if wanted else 'not pruned'}")
+    return problems
+
+
+def bake_one(entry, output_dir, overwrite=False) -> Baked:
+    """
+    Bake, prune and validate the project of a manifest entry in a worker.
+    """
+    from cookiecutter.generate import apply_overwrites_to_context, generate_files
+    from cookiecutter.prompt import prompt_for_config
+    from cookiecutter.utils import work_in
+
+    start = time.perf_counter()
+    name = entry["project_name"]
+    try:
+        context = copy.deepcopy(_worker["context"])
+        apply_overwrites_to_context(context["cookiecutter"], entry)
+        options = prompt_for_config(context, no_input=True)
+        _worker["check_dag_processors"](
+            options["dag_processors"], options["dag_bundles"]
+        )
+        options.update(
+            _template=str(_worker["template"]),
+            _output_dir=os.path.abspath(output_dir),
+            _repo_dir=str(_worker["template"]),
+            _jinja2_env_vars={"bytecode_cache": _worker["bytecode_cache"]},
+        )
+        context = OrderedDict(cookiecutter=options)
+        project_dir = generate_files(
+            repo_dir=str(_worker["template"]),
+            context=context,
+            output_dir=output_dir,
+            overwrite_if_exists=overwrite,
+            accept_hooks=False,
+        )
+        with work_in(project_dir):
+            _worker["prune"](options["open_source_license"], options["ci_tool"])
+            _worker["create_dag_bundles"](options["dag_bundles"])
+        problems = validate(project_dir, options)
+    except Exception as error:
+        return Baked(name, "", time.perf_counter() - start, (f"failed: {error}",))
+    return Baked(name, project_dir, time.perf_counter() - start, tuple(problems))
+
+
+def bake(
+    entries, output_dir, template=TEMPLATE, workers=WORKERS, overwrite=False
+) -> list[Baked]:
+    """
+    Bake the projects of the manifest entries across ``workers`` processes,
+    in the order of the entries.
+    """
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="bake-bytecode-") as bytecode_dir:
+        warm_bytecode_cache(template, bytecode_dir)
+        with ProcessPoolExecutor(
+            max_workers=max(1, min(workers, len(entries))),
+            initializer=_init_worker,
+            initargs=(str(template), bytecode_dir),
+        ) as pool:
+            return list(
+                pool.map(
+                    bake_one,
+                    entries,
+                    [str(output_dir)] * len(entries),
+                    [overwrite] * len(entries),
+                )
+            )
+
+
+def summary(baked, seconds, out=print):
+    width = max([len(project.name) for project in baked] + [7])
+    out(f"{'project':<{width}} {'seconds':>8}  status")
+    for project in baked:
+        out(f"{project.name:<{width}} {project.seconds:>8.2f}  {project.status}")
+    failed = sum(1 for project in baked if project.problems)
+    out(
+        f"{len(baked)} projects in {seconds:.2f}s "
+        f"({sum(project.seconds for project in baked):.2f}s of baking), "
+        f"{failed} failed"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("manifest", help="JSON or CSV file of contexts")
+    parser.add_argument("--output-dir", default=".", help="where to bake them")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument(
+        "--overwrite", action="store_true", help="overwrite existing projects"
+    )
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    baked = bake(
+        load_manifest(args.manifest),
+        args.output_dir,
+        workers=args.workers,
+        overwrite=args.overwrite,
+    )
+    summary(baked, time.perf_counter() - start)
+    return 1 if any(project.problems for project in baked) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from scripts.bake import bake, load_manifest, metadata_problems, summary
+
+
+def test_load_manifest_rejects_unknown_variables(tmp_path, cookiecutter_template_path):
+    """Test that a manifest entry must only use variables of the template."""
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text("project_name,ci_tool\nsales,Github\nfinance,\n")
+    assert load_manifest(manifest, cookiecutter_template_path) == [
+        {"project_name": "sales", "ci_tool": "Github"},
+        {"project_name": "finance"},
+    ]
+
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps([{"project_name": "sales", "airflow": "3.0.0"}]))
+    with pytest.raises(ValueError, match="unknown variables"):
+        load_manifest(manifest, cookiecutter_template_path)
+
+
+def test_bake_prunes_and_validates_each_project(tmp_path, cookiecutter_template_path):
+    """Test that a batch bakes every entry with its own options."""
+    entries = [
+        {"project_name": "sales", "ci_tool": "Github"},
+        {
+            "project_name": "finance",
+            "airflow_version": "3.0.0",
+            "ci_tool": "Gitlab",
+            "open_source_license": "Not open source",
+            "postgresql_version": "16",
+        },
+        {"project_name": "ops", "ci_tool": "Jenkins"},
+    ]
+
+    baked = bake(entries, tmp_path, cookiecutter_template_path, workers=2)
+
+    assert [project.name for project in baked] == ["sales", "finance", "ops"]
+    sales, finance, ops = baked
+    assert sales.status == finance.status == "ok"
+    assert ops.status.startswith("failed: Jenkins provided for choice variable")
+    assert (tmp_path / "sales" / ".github").is_dir()
+    assert not (tmp_path / "sales" / ".gitlab-ci.yml").exists()
+    assert (tmp_path / "finance" / ".gitlab-ci.yml").is_file()
+    assert not (tmp_path / "finance" / "LICENSE.txt").exists()
+    assert "LICENSE.txt" not in (tmp_path / "finance" / "pyproject.toml").read_text()
+    assert (
+        "airflow-dag-processor"
+        in (tmp_path / "finance" / "docker-compose.local.yml").read_text()
+    )
+
+    lines = []
+    summary(baked, 1.0, lines.append)
+    assert lines[-1].startswith("3 projects in 1.00s")
+    assert lines[-1].endswith("1 failed")
+
+
+def test_metadata_problems_reports_missing_files(tmp_path):
+    """Test that the files pyproject.toml refers to must exist."""
+    (tmp_path / "pyproject.toml").write_text(
+        '[project]\nname = "sales"\nversion = "0.0.1"\n'
+        'readme = "README.md"\nlicense = { file = "LICENSE.txt" }\n'
+    )
+    (tmp_path / "README.md").write_text("# sales\n")
+
+    problems = metadata_problems(tmp_path)
+
+    assert len(problems) == 1
+    assert "LICENSE.txt" in problems[0]
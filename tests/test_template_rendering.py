@@ -1,9 +1,15 @@
+import json
+import os
 import re
+import subprocess
 from datetime import datetime
+from pathlib import Path
 
 import pytest
 import toml
 import yaml
+from cookiecutter.exceptions import FailedHookException
+from cookiecutter.main import cookiecutter
 
 
 class TestTemplateRendering:
@@ -251,6 +257,229 @@ class TestTemplateRendering:
                     or len(dockerfile_content.strip()) == 0
                 ), "Dockerfile should be empty or disabled when Docker is disabled"
 
+    @pytest.mark.parametrize(
+        "airflow_version,dag_processors,expected_services,unexpected_services",
+        [
+            (
+                "2.10.0",
+                "1",
+                {"airflow-webserver", "airflow-scheduler"},
+                {"airflow-apiserver", "airflow-dag-processor"},
+            ),
+            (
+                "3.0.0",
+                "1",
+                {"airflow-apiserver", "airflow-scheduler", "airflow-dag-processor"},
+                {"airflow-webserver"},
+            ),
+            (
+                "3.0.0",
+                "2",
+                {"airflow-dag-processor-1", "airflow-dag-processor-2"},
+                {"airflow-webserver", "airflow-dag-processor"},
+            ),
+        ],
+    )
+    def test_docker_compose_components(
+        self,
+        airflow_version,
+        dag_processors,
+        expected_services,
+        unexpected_services,
+        cookiecutter_template_path,
+        tmp_path,
+    ):
+        """Test that the compose services follow the major Airflow version."""
+        project = Path(
+            cookiecutter(
+                template=str(cookiecutter_template_path),
+                no_input=True,
+                output_dir=str(tmp_path),
+                extra_context={
+                    "airflow_version": airflow_version,
+                    "dag_processors": dag_processors,
+                },
+            )
+        )
+
+        with open(project / "docker-compose.local.yml", "r") as f:
+            compose = yaml.safe_load(f)
+
+        services = set(compose["services"])
+        assert expected_services <= services
+        assert not unexpected_services & services
+        environment = compose["x-airflow-common"]["environment"]
+        if airflow_version.startswith("2."):
+            assert "AIRFLOW__CORE__EXECUTION_API_SERVER_URL" not in environment
+            return
+
+        # Every bundle is parsed by exactly one dag-processor
+        bundles = json.loads(
+            environment["AIRFLOW__DAG_PROCESSOR__DAG_BUNDLE_CONFIG_LIST"]
+        )
+        names = [bundle["name"] for bundle in bundles]
+        for bundle in bundles:
+            assert (project / "airflow" / "dags" / bundle["name"]).is_dir()
+        commands = [
+            compose["services"][name]["command"].split()
+            for name in services
+            if name.startswith("airflow-dag-processor")
+        ]
+        if len(commands) == 1:
+            assert commands == [["dag-processor"]]
+        else:
+            assigned = [
+                command[i + 1]
+                for command in commands
+                for i, arg in enumerate(command)
+                if arg == "--bundle-name"
+            ]
+            assert sorted(assigned) == sorted(names)
+
+    def test_docker_compose_dag_bundles(self, cookiecutter_template_path, tmp_path):
+        """Test that the bundles option sets the bundles the dag-processors parse."""
+        project = Path(
+            cookiecutter(
+                template=str(cookiecutter_template_path),
+                no_input=True,
+                output_dir=str(tmp_path),
+                extra_context={
+                    "airflow_version": "3.0.0",
+                    "dag_bundles": "maintainance, elt, sales",
+                    "dag_processors": "3",
+                },
+            )
+        )
+
+        with open(project / "docker-compose.local.yml", "r") as f:
+            compose = yaml.safe_load(f)
+
+        bundles = json.loads(
+            compose["x-airflow-common"]["environment"][
+                "AIRFLOW__DAG_PROCESSOR__DAG_BUNDLE_CONFIG_LIST"
+            ]
+        )
+        assert [bundle["name"] for bundle in bundles] == [
+            "maintainance",
+            "elt",
+            "sales",
+        ]
+        assert (project / "airflow" / "dags" / "sales" / "__init__.py").is_file()
+        assert (
+            compose["services"]["airflow-dag-processor-3"]["command"]
+            == "dag-processor --bundle-name sales"
+        )
+
+    def test_more_dag_processors_than_bundles_fails(
+        self, cookiecutter_template_path, tmp_path
+    ):
+        """Test that asking for more dag-processors than bundles fails rendering."""
+        with pytest.raises(FailedHookException):
+            cookiecutter(
+                template=str(cookiecutter_template_path),
+                no_input=True,
+                output_dir=str(tmp_path),
+                extra_context={"airflow_version": "3.0.0", "dag_processors": "3"},
+            )
+        assert not list(tmp_path.iterdir())
+
+    def test_docker_compose_mounts_library_paths(
+        self, cookiecutter_template_path, tmp_path
+    ):
+        """Test that the paths the DAG library reads are mounted in the containers."""
+        project = Path(
+            cookiecutter(
+                template=str(cookiecutter_template_path),
+                no_input=True,
+                output_dir=str(tmp_path),
+            )
+        )
+
+        with open(project / "docker-compose.local.yml", "r") as f:
+            common = yaml.safe_load(f)["x-airflow-common"]
+
+        mounts = {}
+        for volume in common["volumes"]:
+            source, _, target = volume.removesuffix(":ro").rpartition(":")
+            mounts[target] = source
+        environment = common["environment"]
+        assert mounts[environment["DBT_PROJECT_DIR"]] == "./dbt"
+        assert (project / "dbt" / "dbt_project.yml").is_file()
+        settings_file = environment["AIRFLOW_SETTINGS_FILE"]
+        assert settings_file == "/opt/airflow/secrets/settings.yaml"
+        assert mounts["/opt/airflow/secrets"] == "${AIRFLOW_PROJ_DIR:-.}/secrets"
+        # Airflow loads airflow_local_settings.py from $AIRFLOW_HOME/config
+        assert mounts["/opt/airflow/config"] == "${AIRFLOW_PROJ_DIR:-.}/airflow/config"
+        assert (project / "airflow" / "config" / "airflow_local_settings.py").is_file()
+
+    def test_docker_compose_loads_secrets_backend(
+        self, cookiecutter_template_path, tmp_path
+    ):
+        """Test that the secrets backend loads from the mounted DAG folder."""
+        project = Path(
+            cookiecutter(
+                template=str(cookiecutter_template_path),
+                no_input=True,
+                output_dir=str(tmp_path),
+            )
+        )
+
+        with open(project / "docker-compose.local.yml", "r") as f:
+            common = yaml.safe_load(f)["x-airflow-common"]
+
+        mounts = {}
+        for volume in common["volumes"]:
+            source, _, target = volume.removesuffix(":ro").rpartition(":")
+            mounts[target] = project / source.replace("${AIRFLOW_PROJ_DIR:-.}", ".")
+        environment = common["environment"]
+        dags = mounts[environment["PYTHONPATH"]]
+        module = environment["AIRFLOW__SECRETS__BACKEND"].rpartition(".")[0]
+        assert (dags / (module.replace(".", "/") + ".py")).is_file()
+
+        # The first command of airflow-init, it fails when the backend is missing
+        pytest.importorskip("airflow")
+        env = {
+            key: value
+            for key, value in os.environ.items()
+            if not key.startswith("AIRFLOW")
+        }
+        env.update(
+            AIRFLOW_HOME=str(tmp_path / "airflow_home"),
+            PYTHONPATH=str(dags),
+            AIRFLOW__SECRETS__BACKEND=environment["AIRFLOW__SECRETS__BACKEND"],
+            AIRFLOW__SECRETS__BACKEND_KWARGS=environment[
+                "AIRFLOW__SECRETS__BACKEND_KWARGS"
+            ],
+        )
+        result = subprocess.run(
+            ["airflow", "version"], env=env, capture_output=True, text=True
+        )
+        assert result.returncode == 0, result.stderr
+
+    def test_docker_compose_elt_database(self, cookiecutter_template_path, tmp_path):
+        """Test that the ELT connections use a seeded database apart from Airflow's."""
+        project = Path(
+            cookiecutter(
+                template=str(cookiecutter_template_path),
+                no_input=True,
+                output_dir=str(tmp_path),
+            )
+        )
+
+        with open(project / "docker-compose.local.yml", "r") as f:
+            compose = yaml.safe_load(f)
+
+        environment = compose["x-airflow-common"]["environment"]
+        for conn in ("AIRFLOW_CONN_ELT_SOURCE", "AIRFLOW_CONN_ELT_TARGET"):
+            assert environment[conn].endswith("@postgres:5432/elt}")
+        assert (
+            "./scripts/elt_sample.sql:/docker-entrypoint-initdb.d/elt_sample.sql:ro"
+            in compose["services"]["postgres"]["volumes"]
+        )
+        sample = (project / "scripts" / "elt_sample.sql").read_text()
+        assert "CREATE DATABASE elt;" in sample
+        assert "CREATE TABLE orders" in sample
+
     @pytest.mark.skip()
     @pytest.mark.parametrize("airflow_version", ["2.10.0", "2.9.0", "2.8.0"])
     def test_airflow_version_rendering(
@@ -0,0 +1,32 @@
+"""
+Cluster policies applied to every DAG and task Airflow loads.
+
+Airflow imports this module from ``$AIRFLOW_HOME/config`` when it starts, the
+DAG library is imported by the policies so a broken DAG folder shows up as DAG
+import errors rather than stopping Airflow.
+"""
+
+
+def dag_policy(dag):
+    """
+    Reject the DAGs breaking the rules of ``guardrails.yaml``.
+    """
+    from common.guardrails import enforce_dag, load_guardrails
+
+    enforce_dag(dag, load_guardrails())
+
+
+def task_policy(task):
+    """
+    Fill in the defaults and reject the tasks breaking the rules of
+    ``guardrails.yaml``, apply the default priority weights declared in
+    ``resources.yaml`` and profile the tasks it is requested for, see
+    ``common.profiling``.
+    """
+    from common.guardrails import enforce_task, load_guardrails
+    from common.profiling import profile_if_requested
+    from common.resources import apply_priority_weight, load_spec
+
+    enforce_task(task, load_guardrails())
+    apply_priority_weight(task, load_spec())
+    profile_if_requested(task)
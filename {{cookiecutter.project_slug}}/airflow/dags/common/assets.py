@@ -0,0 +1,80 @@
+"""
+Cross-DAG dependencies declared as data instead of polled with sensors.
+
+A producer task lists the assets it updates in its ``outlets`` and the
+consumer DAG is scheduled on them. The scheduler starts the consumer as soon
+as the producer task succeeds, where an ``ExternalTaskSensor`` would hold a
+worker slot and only notice it on its next poke::
+
+    from common.assets import asset
+
+    orders = asset("warehouse.orders")
+
+    @task(outlets=[orders])
+    def load_orders(): ...
+
+    @dag(schedule=[orders], ...)
+    def orders_report(): ...
+
+Assets are Datasets on Airflow 2 and Assets on Airflow 3, following the
+installed version. The validation tests fail when a DAG is scheduled on an
+asset no DAG produces.
+"""
+
+from airflow.version import version as AIRFLOW_VERSION
+
+AIRFLOW_V3 = int(AIRFLOW_VERSION.split(".")[0]) >= 3
+
+if AIRFLOW_V3:
+    from airflow.sdk import Asset
+else:
+    from airflow.datasets import Dataset as Asset
+
+URI_SCHEME = "asset"
+
+
+def asset(name, uri=None, extra=None) -> Asset:
+    """
+    Return the asset named ``name``, at ``asset://<name>`` unless ``uri`` is
+    given.
+    """
+    uri = uri or f"{URI_SCHEME}://{name}"
+    if AIRFLOW_V3:
+        return Asset(name=name, uri=uri, extra=extra or {})
+    return Asset(uri=uri, extra=extra)
+
+
+def produced_uris(dag) -> set[str]:
+    """
+    Return the URIs of the assets the DAG's tasks update.
+    """
+    return {
+        outlet.uri
+        for task in dag.tasks
+        for outlet in task.outlets
+        if isinstance(outlet, Asset)
+    }
+
+
+def consumed_uris(dag) -> set[str]:
+    """
+    Return the URIs of the assets the DAG is scheduled on.
+    """
+    if AIRFLOW_V3:
+        condition = getattr(dag.timetable, "asset_condition", None)
+        assets = condition.iter_assets() if condition is not None else ()
+    else:
+        condition = getattr(dag.timetable, "dataset_condition", None)
+        assets = condition.iter_datasets() if condition is not None else ()
+    return {consumed.uri for _, consumed in assets}
+
+
+def unproduced_assets(dags) -> dict[str, set[str]]:
+    """
+    Return, by DAG id, the assets the DAGs are scheduled on that none of them
+    produce.
+    """
+    dags = list(dags)
+    produced = set().union(*(produced_uris(dag) for dag in dags))
+    missing = {dag.dag_id: consumed_uris(dag) - produced for dag in dags}
+    return {dag_id: uris for dag_id, uris in missing.items() if uris}
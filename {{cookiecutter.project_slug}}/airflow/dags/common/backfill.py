@@ -0,0 +1,264 @@
+"""
+Backfills of the past intervals of a DAG, a bounded number of runs at a time.
+
+``catchup`` is off for every DAG, see ``guardrails.yaml``, so history is loaded
+with::
+
+    PYTHONPATH=airflow/dags python -m common.backfill run etl \\
+        --start 2024-01-01 --end 2024-06-30 --max-active-runs 4
+
+The intervals of the DAG's schedule in the range are run newest first. A run
+is only created for the next interval when fewer than ``--max-active-runs``
+backfill runs are queued or running, so the scheduler never has more than that
+many to handle, and their tasks left in ``default_pool`` use ``--pool``. The
+scheduler runs them like manual runs, the DAG must be unpaused.
+
+Progress lives in the metadata database: running the same command again skips
+the intervals with a successful run and runs the failed tasks of the failed
+backfill runs again, so an interrupted or failed backfill resumes where it
+stopped. Airflow 3 backfills the same way with ``airflow backfill create
+--max-active-runs 4 --run-backwards``.
+"""
+
+import argparse
+import logging
+import os
+import time
+from dataclasses import dataclass
+
+from airflow.version import version as AIRFLOW_VERSION
+
+log = logging.getLogger(__name__)
+
+RUN_ID_PREFIX = "backfill_runner"
+POOL = os.environ.get("BACKFILL_POOL", "backfill")
+POLL_INTERVAL = float(os.environ.get("BACKFILL_POLL_INTERVAL", 30))
+# Task states of a failed run kept when it runs again
+DONE_STATES = {"success", "skipped"}
+
+
+@dataclass(frozen=True)
+class Status:
+    intervals: int
+    succeeded: int
+    failed: int
+    active: int
+    pending: int
+    created: int
+
+    @property
+    def finished(self) -> bool:
+        return not self.active and not self.pending
+
+
+def backfill_run_id(logical_date) -> str:
+    return f"{RUN_ID_PREFIX}__{logical_date.isoformat()}"
+
+
+def is_backfill_run(run) -> bool:
+    return bool(run.run_id.startswith(f"{RUN_ID_PREFIX}__"))
+
+
+def intervals(dag, start, end) -> list:
+    """
+    Return the ``DagRunInfo`` of the intervals of the DAG's schedule with a
+    logical date from ``start`` to ``end``, newest first.
+    """
+    infos = dag.iter_dagrun_infos_between(start, end)
+    return sorted(infos, key=lambda info: info.logical_date, reverse=True)
+
+
+class Backfill:
+    """
+    Runs of a DAG's intervals, at most ``max_active_runs`` queued or running.
+
+    :param dag: the DAG to backfill, as the scheduler loads it.
+    :param start: logical date of the first interval.
+    :param end: logical date of the last interval.
+    :param max_active_runs: backfill runs queued or running at once.
+    :param pool: pool of the tasks of the backfill runs left in ``default_pool``.
+    """
+
+    def __init__(self, dag, start, end, max_active_runs=4, pool=POOL, dag_hash=None):
+        self.dag = dag
+        self.intervals = intervals(dag, start, end)
+        self.max_active_runs = max_active_runs
+        self.pool = pool
+        self.dag_hash = dag_hash
+        # Failed runs are run again once per backfill
+        self.retried = set()
+
+    def _runs(self, session) -> dict:
+        from sqlalchemy import select
+
+        from airflow.models import DagRun
+
+        if not self.intervals:
+            return {}
+        runs = session.scalars(
+            select(DagRun).where(
+                DagRun.dag_id == self.dag.dag_id,
+                DagRun.execution_date >= self.intervals[-1].logical_date,
+                DagRun.execution_date <= self.intervals[0].logical_date,
+            )
+        )
+        return {run.execution_date: run for run in runs}
+
+    def _create(self, info, session):
+        from airflow.utils.state import DagRunState
+        from airflow.utils.types import DagRunType
+
+        run = self.dag.create_dagrun(
+            run_id=backfill_run_id(info.logical_date),
+            run_type=DagRunType.MANUAL,
+            execution_date=info.logical_date,
+            data_interval=info.data_interval,
+            state=DagRunState.QUEUED,
+            external_trigger=True,
+            dag_hash=self.dag_hash,
+            session=session,
+        )
+        self._use_pool(run.get_task_instances(session=session))
+        log.info("Queued %s", run.run_id)
+
+    def _use_pool(self, tis):
+        if self.pool:
+            for ti in tis:
+                if ti.pool == "default_pool":
+                    ti.pool = self.pool
+
+    def _rerun(self, run, session):
+        from airflow.models.taskinstance import clear_task_instances
+        from airflow.utils.state import DagRunState
+
+        tis = [
+            ti
+            for ti in run.get_task_instances(session=session)
+            if ti.state not in DONE_STATES
+        ]
+        clear_task_instances(
+            tis, session, dag=self.dag, dag_run_state=DagRunState.QUEUED
+        )
+        # Clearing refreshes the task instances from their tasks, pools included
+        self._use_pool(tis)
+        self.retried.add(run.execution_date)
+        log.info("Queued %s again, %d tasks to run", run.run_id, len(tis))
+
+    def step(self, session) -> Status:
+        """
+        Queue the next intervals up to ``max_active_runs`` active backfill runs
+        and return the progress.
+        """
+        runs = self._runs(session)
+        succeeded = failed = active = 0
+        pending = []
+        for info in self.intervals:
+            run = runs.get(info.logical_date)
+            if run is None:
+                pending.append((info, None))
+            elif run.state == "success":
+                succeeded += 1
+            elif not is_backfill_run(run):
+                # Runs of the interval not created here are left alone
+                continue
+            elif run.state in ("queued", "running"):
+                active += 1
+            elif run.execution_date not in self.retried:
+                pending.append((info, run))
+            else:
+                failed += 1
+
+        free = max(self.max_active_runs - active, 0)
+        for info, run in pending[:free]:
+            if run is None:
+                self._create(info, session)
+            else:
+                self._rerun(run, session)
+        created = min(free, len(pending))
+        return Status(
+            intervals=len(self.intervals),
+            succeeded=succeeded,
+            failed=failed,
+            active=active + created,
+            pending=len(pending) - created,
+            created=created,
+        )
+
+    def run(self, poll_interval=POLL_INTERVAL, report=print) -> Status:
+        """
+        Queue the intervals as the backfill runs finish until none is left,
+        reporting the progress when it changes.
+        """
+        from airflow.utils.session import create_session
+
+        start = time.monotonic()
+        first = last = None
+        while True:
+            with create_session() as session:
+                status = self.step(session)
+            first = first or status
+            if status != last:
+                hours = (time.monotonic() - start) / 3600
+                done = status.succeeded - first.succeeded
+                rate = done / hours if hours else 0.0
+                report(
+                    f"{status.succeeded}/{status.intervals} intervals succeeded, "
+                    f"{status.active} active, {status.pending} pending, "
+                    f"{status.failed} failed, {rate:,.1f} intervals/hour"
+                )
+                last = status
+            if status.finished:
+                return status
+            time.sleep(poll_interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill the intervals of a DAG.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="run the intervals of a range")
+    run_parser.add_argument("dag_id")
+    run_parser.add_argument("--start", required=True, help="first logical date")
+    run_parser.add_argument("--end", required=True, help="last logical date")
+    run_parser.add_argument("--max-active-runs", type=int, default=4)
+    run_parser.add_argument("--pool", default=POOL)
+    run_parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    args = parser.parse_args(argv)
+
+    if int(AIRFLOW_VERSION.split(".")[0]) >= 3:
+        raise SystemExit(
+            "Use `airflow backfill create --max-active-runs N --run-backwards` "
+            "on Airflow 3"
+        )
+
+    from airflow.models import DagBag, DagModel, Pool
+    from airflow.models.serialized_dag import SerializedDagModel
+    from airflow.utils import timezone
+
+    logging.basicConfig(level=logging.INFO)
+    dag_model = DagModel.get_dagmodel(args.dag_id)
+    if dag_model is None:
+        raise SystemExit(f"{args.dag_id} was not parsed by the scheduler yet")
+    if dag_model.is_paused:
+        raise SystemExit(f"{args.dag_id} is paused, unpause it to run the backfill")
+    if args.pool and Pool.get_pool(args.pool) is None:
+        raise SystemExit(
+            f"Pool {args.pool} does not exist, declare it in resources.yaml"
+        )
+
+    backfill = Backfill(
+        DagBag(read_dags_from_db=True).get_dag(args.dag_id),
+        timezone.parse(args.start),
+        timezone.parse(args.end),
+        max_active_runs=args.max_active_runs,
+        pool=args.pool,
+        dag_hash=SerializedDagModel.get_latest_version_hash(args.dag_id),
+    )
+    status = backfill.run(args.poll_interval)
+    if status.failed:
+        raise SystemExit(
+            f"{status.failed} intervals failed, run the same command to run them again"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+"""
+Critical path of the tasks landing a piece of data, across DAGs.
+
+The tasks of all the DAGs of the DagBag are joined in one dependency graph:
+the dependencies of the tasks of a DAG, the assets its tasks update to the
+first tasks of the DAGs scheduled on them, and the tasks an
+``ExternalTaskSensor`` waits for to the sensor. Each task weighs its p50 or
+p95 duration, from the ``task_duration_summary`` table kept by the
+``task_duration_regressions`` DAG, or from the task instances of the last
+``--days`` for the tasks it does not know yet. Sensors weigh nothing, their
+wait is the dependency.
+
+For the target, a task or an asset, the report lists its landing time from
+the start of the first runs, the critical path, the slack of every task
+upstream of it, how long it can take longer without delaying the target, and
+the tasks whose speedup would actually land it earlier, with by how much::
+
+    PYTHONPATH=airflow/dags python -m common.critical_path \\
+        --target asset://warehouse.stg_orders --weight p95 \\
+        --json critical_path.json --dot critical_path.dot
+    dot -Tsvg critical_path.dot -o critical_path.svg
+
+The schedules of the DAGs are not modelled, every DAG without upstream
+dependencies starts at 0.
+"""
+
+import argparse
+import graphlib
+import json
+from dataclasses import dataclass
+from datetime import timedelta
+
+from common.assets import Asset, asset, consumed_uris
+from common.task_durations import percentile
+
+LOOKBACK_DAYS = 30
+
+
+class DependencyCycleError(ValueError):
+    pass
+
+
+@dataclass
+class Node:
+    id: str
+    kind: str
+    dag_id: str | None = None
+    p50: float = 0.0
+    p95: float = 0.0
+    runs: int = 0
+    sensor: bool = False
+
+    def weight(self, quantile) -> float:
+        if self.kind != "task" or self.sensor:
+            return 0.0
+        return float(getattr(self, quantile))
+
+
+def task_node_id(dag_id, task_id) -> str:
+    return f"{dag_id}.{task_id}"
+
+
+def is_external_task_sensor(task) -> bool:
+    # ExternalTaskMarker has an external_dag_id too but does not wait
+    return hasattr(task, "external_dag_id") and hasattr(task, "poke")
+
+
+class DependencyGraph:
+    """
+    Tasks and assets, with the nodes each of them waits for.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.upstream = {}
+
+    def add_node(self, node):
+        self.nodes.setdefault(node.id, node)
+        self.upstream.setdefault(node.id, set())
+        return self.nodes[node.id]
+
+    def add_edge(self, upstream_id, downstream_id):
+        self.upstream[downstream_id].add(upstream_id)
+
+    @classmethod
+    def from_dags(cls, dags) -> "DependencyGraph":
+        graph = cls()
+        dags = list(dags)
+        for dag in dags:
+            for task in dag.tasks:
+                graph.add_node(
+                    Node(
+                        task_node_id(dag.dag_id, task.task_id),
+                        "task",
+                        dag.dag_id,
+                        sensor=hasattr(task, "poke"),
+                    )
+                )
+        for dag in dags:
+            roots = [task_node_id(dag.dag_id, task.task_id) for task in dag.roots]
+            for task in dag.tasks:
+                node_id = task_node_id(dag.dag_id, task.task_id)
+                for upstream_id in task.upstream_task_ids:
+                    graph.add_edge(task_node_id(dag.dag_id, upstream_id), node_id)
+                for outlet in task.outlets:
+                    if isinstance(outlet, Asset):
+                        graph.add_node(Node(outlet.uri, "asset"))
+                        graph.add_edge(node_id, outlet.uri)
+                if is_external_task_sensor(task):
+                    for upstream_id in graph._external_tasks(task, dags):
+                        graph.add_edge(upstream_id, node_id)
+            for uri in consumed_uris(dag):
+                graph.add_node(Node(uri, "asset"))
+                for root in roots:
+                    graph.add_edge(uri, root)
+        return graph
+
+    def _external_tasks(self, sensor, dags) -> list[str]:
+        external_dag_id = sensor.external_dag_id
+        task_ids = getattr(sensor, "external_task_ids", None) or []
+        dag = next((d for d in dags if d.dag_id == external_dag_id), None)
+        if dag is None:
+            return []
+        group_id = getattr(sensor, "external_task_group_id", None)
+        if group_id:
+            group = dag.task_group_dict.get(group_id)
+            task_ids = [task.task_id for task in group.leaves] if group else []
+        elif not task_ids:
+            # The sensor waits for the whole run
+            task_ids = [task.task_id for task in dag.leaves]
+        return [
+            task_node_id(external_dag_id, task_id)
+            for task_id in task_ids
+            if task_node_id(external_dag_id, task_id) in self.nodes
+        ]
+
+    def weigh(self, durations):
+        """
+        Set the durations of the tasks, a ``{(dag_id, task_id): (p50, p95,
+        runs)}`` mapping.
+        """
+        for node in self.nodes.values():
+            if node.kind == "task":
+                task_id = node.id[len(node.dag_id) + 1 :]
+                node.p50, node.p95, node.runs = durations.get(
+                    (node.dag_id, task_id), (0.0, 0.0, 0)
+                )
+
+    def ancestors(self, node_id) -> set[str]:
+        seen, pending = {node_id}, [node_id]
+        while pending:
+            for upstream_id in self.upstream[pending.pop()]:
+                if upstream_id not in seen:
+                    seen.add(upstream_id)
+                    pending.append(upstream_id)
+        return seen
+
+    def order(self, node_ids) -> list[str]:
+        sorter = graphlib.TopologicalSorter(
+            {n: self.upstream[n] & node_ids for n in node_ids}
+        )
+        try:
+            return list(sorter.static_order())
+        except graphlib.CycleError as error:
+            raise DependencyCycleError(
+                f"The dependencies form a cycle: {' -> '.join(error.args[1])}"
+            ) from error
+
+    def finish_times(self, order, weights) -> dict[str, float]:
+        finish: dict[str, float] = {}
+        for node_id in order:
+            start = max((finish[u] for u in self.upstream[node_id]), default=0.0)
+            finish[node_id] = start + weights[node_id]
+        return finish
+
+    def analyze(self, target=None, quantile="p50") -> dict:
+        """
+        Return the landing time of ``target``, or of the node finishing last
+        when None, its critical path, the slack of the tasks upstream and the
+        speedups moving the landing time.
+        """
+        if target is not None and target not in self.nodes:
+            raise KeyError(f"{target} is not a task or an asset of the DAGs")
+        weights = {n: node.weight(quantile) for n, node in self.nodes.items()}
+        if target is None:
+            order = self.order(set(self.nodes))
+            finish = self.finish_times(order, weights)
+            # Of the nodes finishing last, the most downstream one
+            target = max(reversed(order), key=lambda n: finish[n])
+        node_ids = self.ancestors(target)
+        order = self.order(node_ids)
+        finish = self.finish_times(order, weights)
+        landing = finish[target]
+
+        downstream: dict[str, set[str]] = {n: set() for n in node_ids}
+        for node_id in node_ids:
+            for upstream_id in self.upstream[node_id]:
+                downstream[upstream_id].add(node_id)
+        latest: dict[str, float] = {}
+        for node_id in reversed(order):
+            latest[node_id] = min(
+                (latest[d] - weights[d] for d in downstream[node_id]),
+                default=landing,
+            )
+        slack = {n: latest[n] - finish[n] for n in node_ids}
+
+        path = [target]
+        while self.upstream[path[-1]] & node_ids:
+            path.append(
+                max(
+                    self.upstream[path[-1]] & node_ids,
+                    key=lambda n: (finish[n], n),
+                )
+            )
+        path.reverse()
+
+        speedups = []
+        for node_id in path:
+            if not weights[node_id]:
+                continue
+            without = self.finish_times(order, {**weights, node_id: 0.0})
+            speedups.append(
+                {
+                    "task": node_id,
+                    "duration": round(weights[node_id], 3),
+                    "max_landing_gain": round(landing - without[target], 3),
+                }
+            )
+        speedups.sort(key=lambda s: -s["max_landing_gain"])
+
+        return {
+            "target": target,
+            "quantile": quantile,
+            "landing_seconds": round(landing, 3),
+            "critical_path": [
+                {
+                    "node": n,
+                    "kind": self.nodes[n].kind,
+                    "duration": round(weights[n], 3),
+                    "finish": round(finish[n], 3),
+                }
+                for n in path
+            ],
+            "tasks": {
+                n: {
+                    "p50": round(self.nodes[n].p50, 3),
+                    "p95": round(self.nodes[n].p95, 3),
+                    "runs": self.nodes[n].runs,
+                    "finish": round(finish[n], 3),
+                    "slack": round(slack[n], 3),
+                }
+                for n in sorted(node_ids)
+                if self.nodes[n].kind == "task"
+            },
+            "speedups": [s for s in speedups if s["max_landing_gain"] > 0],
+            "no_history": sorted(
+                n
+                for n in node_ids
+                if self.nodes[n].kind == "task"
+                and not self.nodes[n].sensor
+                and not self.nodes[n].runs
+            ),
+        }
+
+    def to_dot(self, report=None) -> str:
+        """
+        Return the graph in the DOT language, a cluster per DAG, the critical
+        path of ``report`` in red.
+        """
+        critical = [step["node"] for step in (report or {}).get("critical_path", [])]
+        critical_edges = set(zip(critical, critical[1:], strict=False))
+        tasks = (report or {}).get("tasks", {})
+
+        def label(node):
+            if node.kind == "asset":
+                return node.id
+            text = node.id[len(node.dag_id) + 1 :]
+            if node.runs:
+                text += f"\\np50 {node.p50:.0f}s p95 {node.p95:.0f}s"
+            if node.id in tasks:
+                text += f"\\nslack {tasks[node.id]['slack']:.0f}s"
+            return text
+
+        def node_line(node, indent):
+            shape = "note" if node.kind == "asset" else "box"
+            style = ", color=red, penwidth=2" if node.id in critical else ""
+            return (
+                f"{indent}{json.dumps(node.id)} "
+                f"[label={json.dumps(label(node))}, shape={shape}{style}];"
+            )
+
+        lines = ["digraph critical_path {", "  rankdir=LR;"]
+        by_dag: dict[str | None, list[Node]] = {}
+        for node in self.nodes.values():
+            by_dag.setdefault(node.dag_id, []).append(node)
+        for dag_id, nodes in sorted(by_dag.items(), key=lambda i: i[0] or ""):
+            if dag_id is None:
+                lines.extend(node_line(node, "  ") for node in nodes)
+                continue
+            lines.append("  subgraph " + json.dumps(f"cluster_{dag_id}") + " {")
+            lines.append(f"    label={json.dumps(dag_id)};")
+            lines.extend(node_line(node, "    ") for node in nodes)
+            lines.append("  }")
+        for node_id, upstream_ids in sorted(self.upstream.items()):
+            for upstream_id in sorted(upstream_ids):
+                style = (
+                    " [color=red, penwidth=2]"
+                    if (upstream_id, node_id) in critical_edges
+                    else ""
+                )
+                lines.append(
+                    f"  {json.dumps(upstream_id)} -> {json.dumps(node_id)}{style};"
+                )
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+
+def historical_durations(engine, since) -> dict:
+    """
+    Return the ``(p50, p95, runs)`` of the tasks, by ``(dag_id, task_id)``,
+    from the duration summaries, and from the successful task instances that
+    ended after ``since`` for the tasks without one.
+    """
+    from sqlalchemy import inspect, select
+
+    from common.task_durations import duration_summary, task_instance
+
+    durations = {}
+    with engine.connect() as conn:
+        if inspect(conn).has_table(duration_summary.name):
+            for row in conn.execute(
+                select(
+                    duration_summary.c.dag_id,
+                    duration_summary.c.task_id,
+                    duration_summary.c.p50,
+                    duration_summary.c.p95,
+                    duration_summary.c.runs,
+                )
+            ):
+                durations[(row.dag_id, row.task_id)] = (row.p50, row.p95, row.runs)
+
+        samples: dict[tuple[str, str], list[float]] = {}
+        for row in conn.execute(
+            select(
+                task_instance.c.dag_id,
+                task_instance.c.task_id,
+                task_instance.c.duration,
+            ).where(
+                task_instance.c.state == "success",
+                task_instance.c.duration.is_not(None),
+                task_instance.c.end_date > since,
+            )
+        ):
+            key = (row.dag_id, row.task_id)
+            if key not in durations:
+                samples.setdefault(key, []).append(row.duration)
+    for key, values in samples.items():
+        durations[key] = (percentile(values, 50), percentile(values, 95), len(values))
+    return durations
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target", help="task as dag_id.task_id, or asset URI")
+    parser.add_argument("--weight", choices=("p50", "p95"), default="p50")
+    parser.add_argument("--days", type=int, default=LOOKBACK_DAYS)
+    parser.add_argument("--dags-folder", help="defaults to core.dags_folder")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--dot", help="write the DOT graph to this file")
+    args = parser.parse_args(argv)
+
+    from airflow.models import DagBag
+    from airflow.utils import timezone
+    from common.task_durations import metadata_engine
+
+    dag_bag = DagBag(args.dags_folder, include_examples=False)
+    graph = DependencyGraph.from_dags(dag_bag.dags.values())
+    engine = metadata_engine()
+    try:
+        since = timezone.utcnow() - timedelta(days=args.days)
+        graph.weigh(historical_durations(engine, since))
+    finally:
+        engine.dispose()
+    target = args.target
+    if target and "://" in target:
+        # As Airflow normalizes the URIs of the assets
+        target = asset(target, target).uri
+    try:
+        report = graph.analyze(target, args.weight)
+    except (KeyError, DependencyCycleError) as error:
+        raise SystemExit(error.args[0]) from error
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.dot:
+        with open(args.dot, "w") as f:
+            f.write(graph.to_dot(report))
+
+    print(f"{report['target']} lands after {report['landing_seconds']:,.0f}s")
+    print(f"{'critical path':<60} {'duration':>9} {'finish':>9}")
+    for step in report["critical_path"]:
+        print(f"{step['node']:<60} {step['duration']:>9,.0f} {step['finish']:>9,.0f}")
+    print(f"{'speedup':<60} {'duration':>9} {'max gain':>9}")
+    for speedup in report["speedups"]:
+        print(
+            f"{speedup['task']:<60} {speedup['duration']:>9,.0f} "
+            f"{speedup['max_landing_gain']:>9,.0f}"
+        )
+    if report["no_history"]:
+        print(f"{len(report['no_history'])} tasks without history weigh 0s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+dbt integration built on a precompiled manifest.
+
+DAG files never parse the dbt project: tasks are built from
+``target/manifest.json``, which is rebuilt with ``dbt parse`` only when the
+files it is parsed from change::
+
+    PYTHONPATH=airflow/dags python -m common.dbt_project dbt
+
+Each task runs one model with ``dbtRunner`` in a scratch target path seeded
+with the project's ``partial_parse.msgpack``, so task runs reuse the parse
+artifacts without racing on the shared ``target`` folder.
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from collections.abc import Iterable
+from pathlib import Path
+
+from airflow.models import BaseOperator
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PROJECT_DIR = Path(
+    os.environ.get("DBT_PROJECT_DIR", Path(__file__).resolve().parents[3] / "dbt")
+)
+# Files and folders ``dbt parse`` reads, relative to the project dir.
+MANIFEST_SOURCES = (
+    "dbt_project.yml",
+    "packages.yml",
+    "dependencies.yml",
+    "profiles.yml",
+    "models",
+    "macros",
+    "seeds",
+    "snapshots",
+    "analyses",
+    "tests",
+)
+PARTIAL_PARSE_FILE = "partial_parse.msgpack"
+
+
+class DbtCommandError(RuntimeError):
+    """
+    A dbt command did not succeed.
+    """
+
+
+@functools.lru_cache(maxsize=8)
+def _read_manifest(path, mtime_ns):
+    with open(path, "rb") as f:
+        return json.load(f)
+
+
+class DbtProject:
+    """
+    A dbt project and the artifacts of its last parse.
+
+    :param project_dir: folder holding ``dbt_project.yml``.
+    :param profiles_dir: folder holding ``profiles.yml``, defaults to the
+        project dir.
+    :param target: dbt target to run against, defaults to the profile's.
+    :param target_path: folder the manifest is written to.
+    """
+
+    def __init__(
+        self,
+        project_dir=DEFAULT_PROJECT_DIR,
+        profiles_dir=None,
+        target=None,
+        target_path=None,
+    ):
+        self.project_dir = Path(project_dir).resolve()
+        self.profiles_dir = Path(profiles_dir or self.project_dir).resolve()
+        self.target = target
+        self.target_path = Path(target_path or self.project_dir / "target")
+
+    @property
+    def manifest_path(self) -> Path:
+        return Path(self.target_path, "manifest.json")
+
+    @property
+    def fingerprint_path(self) -> Path:
+        return Path(self.target_path, "manifest.fingerprint")
+
+    def fingerprint(self) -> str:
+        """
+        Hash the content of every file the manifest is parsed from.
+        """
+        digest = hashlib.sha256()
+        for source in MANIFEST_SOURCES:
+            root = self.project_dir / source
+            paths = sorted(root.rglob("*")) if root.is_dir() else [root]
+            for path in paths:
+                if path.is_file():
+                    digest.update(str(path.relative_to(self.project_dir)).encode())
+                    digest.update(path.read_bytes())
+        return digest.hexdigest()
+
+    def manifest_is_current(self) -> bool:
+        return (
+            self.manifest_path.exists()
+            and self.fingerprint_path.exists()
+            and self.fingerprint_path.read_text() == self.fingerprint()
+        )
+
+    def cli_args(self, command, target_path=None, select=None, dbt_vars=None):
+        args = [
+            command,
+            "--project-dir",
+            str(self.project_dir),
+            "--profiles-dir",
+            str(self.profiles_dir),
+            "--target-path",
+            str(target_path or self.target_path),
+        ]
+        if self.target:
+            args += ["--target", self.target]
+        if select:
+            args += ["--select", *([select] if isinstance(select, str) else select)]
+        if dbt_vars:
+            args += ["--vars", json.dumps(dbt_vars)]
+        return args
+
+    def invoke(self, args):
+        """
+        Run a dbt command in-process and return its result.
+        """
+        from dbt.cli.main import dbtRunner
+
+        log.info("Running dbt %s", " ".join(args))
+        result = dbtRunner().invoke(args)
+        if not result.success:
+            raise DbtCommandError(
+                f"dbt {args[0]} failed: {result.exception or result.result}"
+            )
+        return result
+
+    def build_manifest(self, force=False) -> bool:
+        """
+        Parse the project unless the manifest is up to date.
+
+        :return: whether the manifest was rebuilt.
+        """
+        if not force and self.manifest_is_current():
+            log.info("dbt manifest %s is up to date", self.manifest_path)
+            return False
+
+        fingerprint = self.fingerprint()
+        self.invoke(self.cli_args("parse"))
+        self.fingerprint_path.write_text(fingerprint)
+        return True
+
+    def load_manifest(self) -> dict:
+        """
+        Return the parsed manifest, read once per manifest file change.
+        """
+        try:
+            mtime_ns = self.manifest_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"No dbt manifest at {self.manifest_path}, run `make dbt-manifest`"
+            ) from None
+        manifest: dict = _read_manifest(str(self.manifest_path), mtime_ns)
+        return manifest
+
+    def seed_partial_parse(self, target_path):
+        """
+        Copy the partial parse artifacts to a scratch target path.
+        """
+        source = self.target_path / PARTIAL_PARSE_FILE
+        if source.exists():
+            shutil.copy2(source, Path(target_path) / PARTIAL_PARSE_FILE)
+
+
+def select_models(manifest, select=None, exclude=None):
+    """
+    Return the unique ids of the models matching the selectors.
+
+    Selectors are model names, ``tag:<tag>`` or ``path:<folder>`` relative to
+    the project dir, matched against the manifest without running dbt.
+    """
+
+    def matches(node, selector):
+        if selector.startswith("tag:"):
+            return selector[4:] in node.get("tags", [])
+        if selector.startswith("path:"):
+            folder = selector[5:].rstrip("/") + "/"
+            return node["original_file_path"].startswith(folder)
+        return node["name"] == selector
+
+    models = {
+        unique_id: node
+        for unique_id, node in manifest["nodes"].items()
+        if node["resource_type"] == "model"
+    }
+    return {
+        unique_id
+        for unique_id, node in models.items()
+        if (not select or any(matches(node, s) for s in select))
+        and not any(matches(node, s) for s in exclude or [])
+    }
+
+
+def model_dependencies(manifest, selected):
+    """
+    Map each selected model to the selected models it depends on, following
+    dependencies through models that were not selected.
+    """
+    nodes = manifest["nodes"]
+
+    @functools.cache
+    def nearest_selected(unique_id):
+        found = set()
+        for parent in nodes.get(unique_id, {}).get("depends_on", {}).get("nodes", []):
+            if parent in selected:
+                found.add(parent)
+            elif parent in nodes:
+                found |= nearest_selected(parent)
+        return frozenset(found)
+
+    return {unique_id: nearest_selected(unique_id) for unique_id in selected}
+
+
+class DbtModelOperator(BaseOperator):
+    """
+    Run a dbt command for a single model.
+
+    :param project: the dbt project.
+    :param model: model to select, its fully qualified name is unambiguous.
+    :param command: dbt command to run for the model, ``run`` or ``build``.
+    :param dbt_vars: variables passed to dbt with ``--vars``. (templated)
+    """
+
+    template_fields = ("dbt_vars",)
+    ui_color = "#ff694a"
+
+    def __init__(self, *, project, model, command="run", dbt_vars=None, **kwargs):
+        super().__init__(**kwargs)
+        self.project = project
+        self.model = model
+        self.command = command
+        self.dbt_vars = dbt_vars
+
+    def execute(self, context):
+        with tempfile.TemporaryDirectory(prefix="dbt-target-") as target_path:
+            self.project.seed_partial_parse(target_path)
+            self.project.invoke(
+                self.project.cli_args(
+                    self.command,
+                    target_path=target_path,
+                    select=self.model,
+                    dbt_vars=self.dbt_vars,
+                )
+            )
+
+
+def build_dbt_tasks(
+    project=None,
+    select: Iterable[str] | None = None,
+    exclude: Iterable[str] | None = None,
+    **operator_kwargs,
+):
+    """
+    Create one task per dbt model, wired like the models depend on each other.
+
+    Call it inside a DAG or task group context. Models with no dependency
+    between them become independent tasks that Airflow runs concurrently,
+    bounded by the ``pool`` passed in ``operator_kwargs``.
+
+    :return: the tasks keyed by model unique id.
+    """
+    project = project or DbtProject()
+    manifest = project.load_manifest()
+    selected = select_models(manifest, select, exclude)
+    names = [manifest["nodes"][unique_id]["name"] for unique_id in selected]
+
+    tasks = {}
+    for unique_id in sorted(selected):
+        node = manifest["nodes"][unique_id]
+        task_id = node["name"]
+        if names.count(task_id) > 1:
+            task_id = f"{node['package_name']}.{task_id}"
+        tasks[unique_id] = DbtModelOperator(
+            task_id=task_id,
+            project=project,
+            model=".".join(node["fqn"]),
+            **operator_kwargs,
+        )
+
+    for unique_id, parents in model_dependencies(manifest, selected).items():
+        for parent in parents:
+            tasks[parent] >> tasks[unique_id]
+    return tasks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Rebuild the dbt manifest when the project changed."
+    )
+    parser.add_argument("project_dir", nargs="?", default=str(DEFAULT_PROJECT_DIR))
+    parser.add_argument("--profiles-dir")
+    parser.add_argument("--target")
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    project = DbtProject(args.project_dir, args.profiles_dir, args.target)
+    if project.build_manifest(force=args.force):
+        print(f"Rebuilt {project.manifest_path}")
+    else:
+        print(f"{project.manifest_path} is up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Guardrails declared in ``guardrails.yaml``, shared by the validation tests and
+the cluster policies.
+
+``dag_policy`` and ``task_policy`` fill in the defaults the rules declare,
+like a task's execution timeout, then raise ``AirflowClusterPolicyViolation``
+listing every rule the DAG or task breaks, which Airflow reports as an import
+error of the DAG file. The validation tests check the same rules with
+``dag_violations`` and ``task_violations``.
+"""
+
+import functools
+import os
+from dataclasses import dataclass, field
+from datetime import timedelta
+from pathlib import Path
+
+import yaml
+
+from airflow.exceptions import AirflowClusterPolicyViolation
+
+GUARDRAILS_FILE = Path(
+    os.environ.get(
+        "AIRFLOW_GUARDRAILS_FILE",
+        Path(__file__).resolve().parents[1] / "guardrails.yaml",
+    )
+)
+DEFAULT_POOL = "default_pool"
+
+
+@dataclass(frozen=True)
+class Guardrails:
+    catchup: bool | None = None
+    max_active_runs: int | None = None
+    require_owner: bool = False
+    trigger_rules: frozenset[str] | None = None
+    default_execution_timeout: timedelta | None = None
+    max_execution_timeout: timedelta | None = None
+    max_mapped_tasks: int | None = None
+    max_active_tis_per_dagrun: int | None = None
+    pools_by_operator: dict[str, str] = field(default_factory=dict)
+
+
+def parse_guardrails(content: dict) -> Guardrails:
+    dags = content.get("dags") or {}
+    tasks = content.get("tasks") or {}
+    timeout = tasks.get("execution_timeout_minutes") or {}
+
+    def minutes(value):
+        return timedelta(minutes=value) if value is not None else None
+
+    trigger_rules = tasks.get("trigger_rules")
+    return Guardrails(
+        catchup=dags.get("catchup"),
+        max_active_runs=dags.get("max_active_runs"),
+        require_owner=tasks.get("require_owner", False),
+        trigger_rules=frozenset(trigger_rules) if trigger_rules else None,
+        default_execution_timeout=minutes(timeout.get("default")),
+        max_execution_timeout=minutes(timeout.get("max")),
+        max_mapped_tasks=tasks.get("max_mapped_tasks"),
+        max_active_tis_per_dagrun=tasks.get("max_active_tis_per_dagrun"),
+        pools_by_operator=tasks.get("pools_by_operator") or {},
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def _load_guardrails(path, mtime_ns):
+    with open(path) as f:
+        return parse_guardrails(yaml.safe_load(f) or {})
+
+
+def load_guardrails(path=GUARDRAILS_FILE) -> Guardrails:
+    """
+    Return the guardrails, parsed once per file change.
+    """
+    path = Path(path)
+    guardrails: Guardrails = _load_guardrails(str(path), path.stat().st_mtime_ns)
+    return guardrails
+
+
+def is_mapped(task) -> bool:
+    return hasattr(task, "expand_input")
+
+
+def dag_violations(dag, rules: Guardrails) -> list[str]:
+    violations = []
+    if rules.catchup is not None and dag.catchup != rules.catchup:
+        violations.append(f"catchup must be {rules.catchup}")
+    if rules.max_active_runs and dag.max_active_runs > rules.max_active_runs:
+        violations.append(
+            f"max_active_runs {dag.max_active_runs} is over {rules.max_active_runs}"
+        )
+    return violations
+
+
+def task_violations(task, rules: Guardrails) -> list[str]:
+    """
+    Return the rules the task breaks, the defaults it would get filled in are
+    not violations.
+    """
+    violations = []
+    if rules.require_owner and not task.owner:
+        violations.append("no owner set")
+    if rules.trigger_rules and task.trigger_rule not in rules.trigger_rules:
+        violations.append(
+            f"trigger rule {task.trigger_rule} is not one of "
+            f"{', '.join(sorted(rules.trigger_rules))}"
+        )
+    timeout, max_timeout = task.execution_timeout, rules.max_execution_timeout
+    if max_timeout and timeout and timeout > max_timeout:
+        violations.append(f"execution_timeout {timeout} is over {max_timeout}")
+    if rules.max_mapped_tasks and is_mapped(task):
+        try:
+            count = task.get_parse_time_mapped_ti_count()
+        except RuntimeError:
+            # Expanded from XComs, bounded by core.max_map_length at run time
+            count = None
+        if count and count > rules.max_mapped_tasks:
+            violations.append(
+                f"maps {count} task instances, over {rules.max_mapped_tasks}"
+            )
+    return violations
+
+
+def apply_task_defaults(task, rules: Guardrails):
+    if rules.default_execution_timeout and task.execution_timeout is None:
+        task.execution_timeout = rules.default_execution_timeout
+    if (
+        rules.max_active_tis_per_dagrun
+        and is_mapped(task)
+        and task.max_active_tis_per_dagrun is None
+    ):
+        task.max_active_tis_per_dagrun = rules.max_active_tis_per_dagrun
+    pool = rules.pools_by_operator.get(task.task_type)
+    if pool and task.pool == DEFAULT_POOL:
+        task.pool = pool
+
+
+def enforce_dag(dag, rules: Guardrails):
+    violations = dag_violations(dag, rules)
+    if violations:
+        raise AirflowClusterPolicyViolation(
+            f"DAG {dag.dag_id} breaks the guardrails: {'; '.join(violations)}"
+        )
+
+
+def enforce_task(task, rules: Guardrails):
+    apply_task_defaults(task, rules)
+    violations = task_violations(task, rules)
+    if violations:
+        raise AirflowClusterPolicyViolation(
+            f"Task {task.task_id} of DAG {task.dag_id} breaks the guardrails: "
+            f"{'; '.join(violations)}"
+        )
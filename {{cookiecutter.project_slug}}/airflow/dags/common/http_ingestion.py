@@ -0,0 +1,403 @@
+"""
+Concurrent ingestion of paginated HTTP APIs on one event loop.
+
+All the requests of a task share a pooled keep-alive ``aiohttp`` client and an
+adaptive concurrency limit: the limit grows by one request every ``limit``
+successful requests, and halves when the server answers 429 or 5xx or the
+connection fails, like TCP congestion control. The failed requests, responses
+cut mid-body included, are retried with an exponential backoff, honouring
+``Retry-After``.
+
+Each endpoint is paginated with a cursor, page after page, or with offsets,
+fetched concurrently until a page comes back empty. Response bodies are
+streamed to ``<output_dir>/<endpoint>/<page>.json`` as they arrive, never held
+in memory whole::
+
+    HttpIngestOperator(
+        task_id="ingest_orders",
+        http_conn_id="shop_api",
+        endpoints=["/v1/orders", "/v1/refunds"],
+        pagination=CursorPagination(next_cursor_path="meta.next"),
+        output_dir="/data/raw/shop",
+    )
+"""
+
+import asyncio
+import functools
+import itertools
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import aiohttp
+
+from airflow.models import BaseOperator
+
+log = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+CHUNK_SIZE = 64 * 1024
+BACKOFF_SECONDS = 0.05
+MAX_BACKOFF_SECONDS = 30.0
+
+
+class HttpIngestionError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class CursorPagination:
+    """
+    Pages following each other through a cursor of the response body.
+
+    :param cursor_param: query parameter of the cursor of the next page.
+    :param next_cursor_path: dotted path of the next cursor in the body, the
+        last page has none.
+    """
+
+    cursor_param: str = "cursor"
+    next_cursor_path: str = "next"
+
+
+@dataclass(frozen=True)
+class OffsetPagination:
+    """
+    Pages of ``page_size`` records at increasing offsets, up to the first
+    empty one.
+
+    :param records_path: dotted path of the records in the body.
+    """
+
+    offset_param: str = "offset"
+    limit_param: str = "limit"
+    page_size: int = 100
+    records_path: str = "data"
+
+
+def json_path(body, path):
+    for key in path.split(".") if path else ():
+        if not isinstance(body, dict):
+            return None
+        body = body.get(key)
+    return body
+
+
+class AdaptiveLimit:
+    """
+    Concurrency limit with additive increase and multiplicative decrease.
+
+    Requests started before the last decrease do not decrease it again, the
+    requests in flight when a server gets overloaded fail together.
+    """
+
+    def __init__(self, initial=4, maximum=32, minimum=1):
+        self.limit = min(initial, maximum)
+        self.maximum = maximum
+        self.minimum = minimum
+        self.in_flight = 0
+        self._successes = 0
+        self._decreased_at = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> float:
+        """
+        Wait for a free slot, return the time the request started.
+        """
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        return time.monotonic()
+
+    async def release(self, started, throttled=False):
+        async with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                if started >= self._decreased_at:
+                    self.limit = max(self.minimum, self.limit // 2)
+                    self._decreased_at = time.monotonic()
+                    self._successes = 0
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.maximum:
+                    self.limit += 1
+                    self._successes = 0
+            self._condition.notify_all()
+
+
+@dataclass
+class IngestionStats:
+    requests: int = 0
+    retries: int = 0
+    pages: int = 0
+    bytes: int = 0
+
+
+class Ingestion:
+    """
+    The requests of one ingestion, sharing a client, a concurrency limit and
+    their statistics.
+    """
+
+    def __init__(self, session, limit, output_dir, max_retries=5, url=None):
+        self.session = session
+        self.url = url or (lambda endpoint: endpoint)
+        self.limit = limit
+        self.output_dir = Path(output_dir)
+        self.max_retries = max_retries
+        self.stats = IngestionStats()
+
+    async def fetch(self, endpoint, params, path) -> Path:
+        """
+        Stream the response of ``endpoint`` to ``path``, retrying throttled
+        and failed requests.
+        """
+        for attempt in range(self.max_retries + 1):
+            started = await self.limit.acquire()
+            throttled, retry_after = False, None
+            try:
+                self.stats.requests += 1
+                url = self.url(endpoint)
+                async with self.session.get(url, params=params) as response:
+                    if response.status in RETRY_STATUSES:
+                        throttled = True
+                        retry_after = response.headers.get("Retry-After")
+                    else:
+                        response.raise_for_status()
+                        await self._stream(response, path)
+                        return Path(path)
+            except (
+                TimeoutError,
+                aiohttp.ClientConnectionError,
+                aiohttp.ClientPayloadError,
+            ) as error:
+                throttled = True
+                log.debug("%s failed: %r", endpoint, error)
+            finally:
+                await self.limit.release(started, throttled)
+            if attempt < self.max_retries:
+                self.stats.retries += 1
+                await asyncio.sleep(_backoff(attempt, retry_after))
+        raise HttpIngestionError(
+            f"{endpoint} {params} still failing after {self.max_retries} retries"
+        )
+
+    async def _stream(self, response, path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_suffix(".part")
+        size = 0
+        try:
+            with open(partial, "wb") as f:
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    f.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            partial.unlink(missing_ok=True)
+            raise
+        partial.replace(path)
+        self.stats.bytes += size
+        self.stats.pages += 1
+
+    def _page_path(self, endpoint, page) -> Path:
+        folder = endpoint.strip("/").replace("/", "_") or "root"
+        return Path(self.output_dir, folder, f"{page:06d}.json")
+
+    async def endpoint(self, endpoint, pagination=None, params=None):
+        params = dict(params or {})
+        if isinstance(pagination, CursorPagination):
+            await self._cursor_pages(endpoint, pagination, params)
+        elif isinstance(pagination, OffsetPagination):
+            await self._offset_pages(endpoint, pagination, params)
+        else:
+            await self.fetch(endpoint, params, self._page_path(endpoint, 0))
+
+    async def _cursor_pages(self, endpoint, pagination, params):
+        cursor = None
+        for page in itertools.count():
+            if cursor is not None:
+                params[pagination.cursor_param] = cursor
+            path = await self.fetch(endpoint, params, self._page_path(endpoint, page))
+            cursor = json_path(_read_json(path), pagination.next_cursor_path)
+            if cursor in (None, ""):
+                return
+
+    async def _offset_pages(self, endpoint, pagination, params):
+        offsets = itertools.count(0, pagination.page_size)
+        end = None
+
+        async def worker():
+            nonlocal end
+            for offset in offsets:
+                if end is not None and offset >= end:
+                    return
+                page_params = {
+                    **params,
+                    pagination.offset_param: offset,
+                    pagination.limit_param: pagination.page_size,
+                }
+                page = offset // pagination.page_size
+                path = await self.fetch(
+                    endpoint, page_params, self._page_path(endpoint, page)
+                )
+                if not json_path(_read_json(path), pagination.records_path):
+                    # Past the last records, the pages after it are empty too
+                    path.unlink()
+                    self.stats.pages -= 1
+                    end = offset if end is None else min(end, offset)
+
+        await asyncio.gather(*(worker() for _ in range(self.limit.maximum)))
+
+
+def _read_json(path):
+    with open(path, "rb") as f:
+        return json.load(f)
+
+
+def url_from_endpoint(base_url, endpoint) -> str:
+    """
+    Join an endpoint to the base URL like ``HttpHook`` does, keeping the path
+    of the base URL.
+    """
+    if base_url and not base_url.endswith("/") and not endpoint.startswith("/"):
+        return f"{base_url}/{endpoint}"
+    return f"{base_url}{endpoint}"
+
+
+def _backoff(attempt, retry_after=None) -> float:
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), MAX_BACKOFF_SECONDS)
+        except ValueError:
+            pass
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, BACKOFF_SECONDS * 2**attempt))
+
+
+async def ingest(
+    base_url,
+    endpoints,
+    output_dir,
+    pagination=None,
+    params=None,
+    headers=None,
+    auth=None,
+    max_concurrency=32,
+    initial_concurrency=4,
+    max_retries=5,
+    timeout=60,
+    url=None,
+) -> dict:
+    """
+    Fetch all the pages of ``endpoints`` concurrently into ``output_dir``.
+
+    :param url: returns the URL of an endpoint, by default joined to
+        ``base_url`` with ``url_from_endpoint``.
+    :return: a report with the requests, retries, pages and bytes fetched, the
+        requests per second and the final concurrency limit.
+    """
+    limit = AdaptiveLimit(initial_concurrency, max_concurrency)
+    connector = aiohttp.TCPConnector(limit=max_concurrency, keepalive_timeout=30)
+    start = time.perf_counter()
+    url = url or functools.partial(url_from_endpoint, base_url)
+    async with aiohttp.ClientSession(
+        connector=connector,
+        headers=headers,
+        auth=auth,
+        timeout=aiohttp.ClientTimeout(total=timeout),
+        raise_for_status=False,
+    ) as session:
+        ingestion = Ingestion(session, limit, output_dir, max_retries, url)
+        await asyncio.gather(
+            *(ingestion.endpoint(e, pagination, params) for e in endpoints)
+        )
+    seconds = time.perf_counter() - start
+    stats = ingestion.stats
+    return {
+        "requests": stats.requests,
+        "retries": stats.retries,
+        "pages": stats.pages,
+        "bytes": stats.bytes,
+        "seconds": round(seconds, 3),
+        "requests_per_second": round(stats.requests / seconds, 1),
+        "concurrency": limit.limit,
+    }
+
+
+class HttpIngestOperator(BaseOperator):
+    """
+    Fetch the pages of HTTP endpoints concurrently and write them to disk.
+
+    :param http_conn_id: connection of the API, its host, credentials and the
+        headers of its extra are used like ``HttpHook`` does.
+    :param endpoints: paths of the endpoints to fetch. (templated)
+    :param output_dir: folder the pages are written to. (templated)
+    :param pagination: a ``CursorPagination``, an ``OffsetPagination`` or None
+        for a single page per endpoint.
+    :param query: query parameters of every request. (templated)
+    :param max_concurrency: upper bound of the requests in flight.
+    """
+
+    template_fields = ("endpoints", "output_dir", "query")
+    ui_color = "#b3e5fc"
+
+    def __init__(
+        self,
+        *,
+        http_conn_id,
+        endpoints,
+        output_dir,
+        pagination=None,
+        query=None,
+        max_concurrency=32,
+        initial_concurrency=4,
+        max_retries=5,
+        request_timeout=60,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.http_conn_id = http_conn_id
+        self.endpoints = endpoints
+        self.output_dir = output_dir
+        self.pagination = pagination
+        self.query = query
+        self.max_concurrency = max_concurrency
+        self.initial_concurrency = initial_concurrency
+        self.max_retries = max_retries
+        self.request_timeout = request_timeout
+
+    def execute(self, context):
+        from requests.auth import HTTPBasicAuth
+
+        from airflow.providers.http.hooks.http import HttpHook
+
+        hook = HttpHook(method="GET", http_conn_id=self.http_conn_id)
+        session = hook.get_conn()
+        auth = None
+        if isinstance(session.auth, HTTPBasicAuth):
+            auth = aiohttp.BasicAuth(session.auth.username, session.auth.password)
+        report = asyncio.run(
+            ingest(
+                hook.base_url,
+                self.endpoints,
+                self.output_dir,
+                pagination=self.pagination,
+                params=self.query,
+                headers=dict(session.headers),
+                auth=auth,
+                max_concurrency=self.max_concurrency,
+                initial_concurrency=self.initial_concurrency,
+                max_retries=self.max_retries,
+                timeout=self.request_timeout,
+                url=hook.url_from_endpoint,
+            )
+        )
+        self.log.info(
+            "Fetched %d pages, %d bytes, in %d requests (%d retries), %.1f requests/s",
+            report["pages"],
+            report["bytes"],
+            report["requests"],
+            report["retries"],
+            report["requests_per_second"],
+        )
+        return report
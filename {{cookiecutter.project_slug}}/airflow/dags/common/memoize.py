@@ -0,0 +1,258 @@
+"""
+Content-addressed memoization of ``@task`` results.
+
+A memoized task is skipped when it already ran with the same inputs, the same
+code and the same upstream data, and its stored result is returned instead,
+so clearing or rerunning a DAG only recomputes what changed::
+
+    from common.assets import asset
+    from common.memoize import memoize
+
+    orders = asset("warehouse.orders")
+
+    @task(inlets=[orders])
+    @memoize()
+    def order_features(day): ...
+
+The key of a call is the SHA-256 of:
+
+* the resolved arguments of the call, the XComs of the upstream tasks,
+* the source of the task function,
+* the data version of each asset of the task's ``inlets``: its latest event,
+* the ``version`` given to ``memoize``, bumped to invalidate by hand.
+
+Results are stored serialized like XComs in ``MEMOIZE_STORE``, a folder of the
+worker by default. Point it to a folder shared by the workers, an NFS or EFS
+mount, for a hit on any of them. The least recently used results are evicted
+once the store holds more than ``MEMOIZE_MAX_BYTES`` or ``MEMOIZE_MAX_ENTRIES``.
+
+Hits, misses and evictions are counted in the ``memoize.hit``,
+``memoize.miss`` and ``memoize.eviction`` metrics, tagged with the DAG and the
+task when StatsD metrics are on.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from airflow.configuration import AIRFLOW_HOME
+from airflow.stats import Stats
+from common.assets import AIRFLOW_V3, Asset
+
+log = logging.getLogger(__name__)
+
+STORE = os.environ.get("MEMOIZE_STORE", os.path.join(AIRFLOW_HOME, "memoize"))
+MAX_BYTES = int(os.environ.get("MEMOIZE_MAX_BYTES", 1024**3))
+MAX_ENTRIES = int(os.environ.get("MEMOIZE_MAX_ENTRIES", 10_000))
+
+
+def _serialize(value):
+    from airflow.serialization.serde import serialize
+
+    return serialize(value)
+
+
+def _deserialize(value):
+    from airflow.serialization.serde import deserialize
+
+    return deserialize(value)
+
+
+class ResultStore:
+    """
+    Results in a folder, one file per key, evicted least recently used first.
+
+    A hit refreshes the modification time of its file, the eviction removes
+    the files modified the longest ago.
+    """
+
+    def __init__(self, location=STORE, max_bytes=MAX_BYTES, max_entries=MAX_ENTRIES):
+        self.location = Path(location)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = self.misses = self.evictions = 0
+
+    def _path(self, key) -> Path:
+        return Path(self.location, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """
+        Return ``(True, result)`` for a stored key, ``(False, None)`` otherwise.
+        """
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                stored = json.load(f)
+            os.utime(path)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        return True, _deserialize(stored)
+
+    def put(self, key, result):
+        """
+        Store the result of ``key``, then evict the least recently used ones
+        over the limits.
+        """
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(_serialize(result))
+        # Written aside and renamed, a concurrent get never reads half a result
+        fd, partial = tempfile.mkstemp(dir=path.parent, suffix=".part")
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+        os.replace(partial, path)
+        return self.evict()
+
+    def entries(self) -> list[tuple[float, int, Path]]:
+        """
+        Return the ``(mtime, size, path)`` of the stored results, the least
+        recently used first.
+        """
+        entries = []
+        for path in self.location.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def evict(self) -> int:
+        entries = self.entries()
+        size = sum(entry[1] for entry in entries)
+        evicted = 0
+        for _, entry_size, path in entries:
+            if size <= self.max_bytes and len(entries) - evicted <= self.max_entries:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def stats(self) -> dict:
+        entries = self.entries()
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(entries),
+            "bytes": sum(entry[1] for entry in entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def source_of(function) -> str:
+    function = inspect.unwrap(function)
+    try:
+        return inspect.getsource(function)
+    except (OSError, TypeError):
+        code = function.__code__
+        return repr((code.co_code, code.co_consts, code.co_names))
+
+
+def data_versions(context) -> dict:
+    """
+    Return the latest event of each asset of the running task's ``inlets``,
+    by URI.
+    """
+    if context is None:
+        return {}
+    versions: dict[str, list | None] = {}
+    for inlet in context["task"].inlets:
+        if not isinstance(inlet, Asset):
+            continue
+        try:
+            latest = context["inlet_events"][inlet][-1]
+        except IndexError:
+            versions[inlet.uri] = None
+            continue
+        versions[inlet.uri] = [
+            getattr(latest, "id", None),
+            latest.timestamp.isoformat(),
+        ]
+    return versions
+
+
+def memoize_key(function, args, kwargs, versions=None, version="") -> str:
+    payload = {
+        "function": f"{function.__module__}.{function.__qualname__}",
+        "source": source_of(function),
+        "args": _serialize(list(args)),
+        "kwargs": _serialize(dict(kwargs)),
+        "data_versions": versions or {},
+        "version": version,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=repr).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def _current_context():
+    if AIRFLOW_V3:
+        from airflow.sdk import get_current_context
+    else:
+        from airflow.operators.python import get_current_context
+
+    try:
+        return get_current_context()
+    except Exception:
+        # Called outside of a task run, e.g. in a test
+        return None
+
+
+def memoize(store=None, version=""):
+    """
+    Skip the decorated task function when a result is stored for its key and
+    return that result instead, see the module's documentation.
+
+    :param store: the ``ResultStore``, one in ``MEMOIZE_STORE`` by default.
+    :param version: part of the key, change it to invalidate the results.
+    """
+
+    def decorate(function):
+        @functools.wraps(function)
+        def memoized(*args, **kwargs):
+            result_store = store or ResultStore()
+            context = _current_context()
+            key = memoize_key(function, args, kwargs, data_versions(context), version)
+            tags = {}
+            if context is not None:
+                tags = {
+                    "dag_id": context["ti"].dag_id,
+                    "task_id": context["ti"].task_id,
+                }
+
+            hit, result = result_store.get(key)
+            if hit:
+                Stats.incr("memoize.hit", tags=tags)
+                log.info("Memoized result %s found, skipping the task", key)
+                return result
+            Stats.incr("memoize.miss", tags=tags)
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            try:
+                evicted = result_store.put(key, result)
+            except (TypeError, ValueError) as error:
+                log.warning("Result of %s not memoized: %s", key, error)
+                return result
+            if evicted:
+                Stats.incr("memoize.eviction", evicted, tags=tags)
+            log.info(
+                "Memoized result %s, computed in %.2fs",
+                key,
+                time.perf_counter() - start,
+            )
+            return result
+
+        return memoized
+
+    return decorate
@@ -0,0 +1,220 @@
+"""
+Opt-in cProfile and tracemalloc profiling of task runs.
+
+The ``task_policy`` in ``airflow_local_settings.py`` profiles a task when:
+
+* its DAG is tagged ``profile``,
+* its DAG or the task has a ``profile`` param, checked at run time so it can
+  be turned on when triggering a run,
+* it matches a pattern of ``AIRFLOW_PROFILE_TASKS`` in the worker
+  environment, e.g. ``etl.load_*,reports.*`` or ``*``.
+
+Other tasks are left untouched. A profiled run writes ``<task log>.pstats``
+and ``<task log>.allocations.txt`` next to the task log and logs the time
+spent, the number of calls, the peak traced memory and the estimated
+profiling overhead::
+
+    python -m pstats "logs/dag_id=etl/run_id=.../task_id=load/attempt=1.pstats"
+
+Runs that fail or time out are profiled too, the profile is written when
+``execute`` returns or raises.
+"""
+
+import cProfile
+import fnmatch
+import functools
+import itertools
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from pathlib import Path
+
+from airflow.configuration import conf
+
+log = logging.getLogger(__name__)
+
+PROFILE_TAG = "profile"
+PROFILE_PARAM = "profile"
+PROFILE_ENV = "AIRFLOW_PROFILE_TASKS"
+# The allocation sites are grouped by line, more frames would only make
+# tracing the profiler's own allocations slower
+TRACEMALLOC_FRAMES = 1
+TOP_ALLOCATIONS = 25
+
+_profilers: dict[object, "TaskProfiler"] = {}
+
+
+def profiling_mode(task):
+    """
+    Return ``"always"``, ``"param"`` when it depends on the run's params, or
+    ``None`` when the task is not profiled.
+    """
+    patterns = os.environ.get(PROFILE_ENV)
+    if patterns and any(
+        fnmatch.fnmatchcase(f"{task.dag_id}.{task.task_id}", pattern.strip())
+        for pattern in patterns.split(",")
+    ):
+        return "always"
+    dag = task.dag if task.has_dag() else None
+    if dag and PROFILE_TAG in (dag.tags or []):
+        return "always"
+    if PROFILE_PARAM in task.params or (dag and PROFILE_PARAM in dag.params):
+        return "param"
+    return None
+
+
+@functools.cache
+def call_overhead() -> float:
+    """
+    Measure the time cProfile and tracemalloc add to a Python function call.
+
+    Measured in the task process, the cost depends on the stack it runs in.
+    """
+
+    def noop():
+        pass
+
+    calls = 20_000
+
+    def timed():
+        # CPU time of this thread only, other threads of the task process
+        # would take a share of a longer loop; repeat() does not allocate
+        start = time.thread_time()
+        for _ in itertools.repeat(None, calls):
+            noop()
+        return time.thread_time() - start
+
+    baseline = timed()
+    profile = cProfile.Profile()
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    profile.enable()
+    profiled = timed()
+    profile.disable()
+    tracemalloc.stop()
+    return float(max(profiled - baseline, 0) / calls)
+
+
+def total_calls(profile) -> int:
+    """
+    Return the function calls of a profile.
+    """
+    # Stats.total_calls is missing from the typeshed stubs
+    return int(getattr(pstats.Stats(profile), "total_calls"))  # noqa: B009
+
+
+def task_log_path(context) -> Path:
+    """
+    Return the log file of the running task, or where it would be written.
+    """
+    for handler in logging.getLogger("airflow.task").handlers:
+        file_handler = getattr(handler, "handler", None)
+        if file_handler is not None and hasattr(file_handler, "baseFilename"):
+            return Path(file_handler.baseFilename)
+    ti = context["ti"]
+    return (
+        Path(conf.get("logging", "base_log_folder"))
+        / f"dag_id={ti.dag_id}"
+        / f"run_id={ti.run_id}"
+        / f"task_id={ti.task_id}"
+        / f"attempt={ti.try_number}.log"
+    )
+
+
+class TaskProfiler:
+    """
+    Profile the calls and the allocations of a task run.
+    """
+
+    def start(self):
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        self.profile = cProfile.Profile()
+        self.started = time.perf_counter()
+        self.profile.enable()
+        return self
+
+    def stop(self, log_path: Path) -> dict:
+        self.profile.disable()
+        elapsed = time.perf_counter() - self.started
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        stats_path = log_path.with_suffix(".pstats")
+        self.profile.dump_stats(stats_path)
+        allocations_path = log_path.with_suffix(".allocations.txt")
+        top = snapshot.statistics("lineno")[:TOP_ALLOCATIONS]
+        allocations_path.write_text("\n".join(str(stat) for stat in top) + "\n")
+
+        calls = total_calls(self.profile)
+        overhead = calls * call_overhead()
+        return {
+            "seconds": round(elapsed, 3),
+            "calls": calls,
+            "peak_traced_bytes": peak,
+            "estimated_overhead_seconds": round(overhead, 3),
+            "estimated_overhead_percent": round(100 * overhead / elapsed, 1)
+            if elapsed
+            else 0.0,
+            "pstats": str(stats_path),
+            "allocations": str(allocations_path),
+        }
+
+
+def profile_if_requested(task):
+    """
+    Profile the task's runs when it is requested, see ``profiling_mode``.
+    """
+    mode = profiling_mode(task)
+    if mode is None or not hasattr(task, "_pre_execute_hook"):
+        return
+    pre_execute, post_execute = task._pre_execute_hook, task._post_execute_hook
+
+    def stop(context):
+        profiler = _profilers.pop(context["ti"].key, None)
+        if profiler is None:
+            return
+        report = profiler.stop(task_log_path(context))
+        log.info(
+            "Profiled %s: %.2fs, %d calls, %.1f MiB peak, "
+            "~%.2fs (%.1f%%) profiling overhead, stats in %s",
+            context["ti"].task_id,
+            report["seconds"],
+            report["calls"],
+            report["peak_traced_bytes"] / 2**20,
+            report["estimated_overhead_seconds"],
+            report["estimated_overhead_percent"],
+            report["pstats"],
+        )
+
+    def start_profiling(context):
+        if pre_execute is not None:
+            pre_execute(context)
+        if mode == "param" and not context["params"].get(PROFILE_PARAM):
+            return
+        _profilers[context["ti"].key] = TaskProfiler().start()
+
+        # post_execute is skipped when execute raises or times out, stop in
+        # execute itself. The running task is a copy made for this run.
+        running = context["task"]
+        execute = running.execute
+
+        @functools.wraps(execute)
+        def profiled_execute(*args, **kwargs):
+            try:
+                return execute(*args, **kwargs)
+            finally:
+                stop(context)
+
+        running.execute = profiled_execute
+
+    def stop_profiling(context, result=None):
+        # A run resumed after a deferral calls resume_execution, not execute
+        stop(context)
+        if post_execute is not None:
+            post_execute(context, result)
+
+    task._pre_execute_hook = start_profiling
+    task._post_execute_hook = stop_profiling
@@ -0,0 +1,69 @@
+"""
+Remote task logging to the S3 compatible bucket of
+``logging.remote_base_log_folder``.
+
+The ``remote-logging`` profile of ``docker-compose.local.yml`` runs MinIO as
+that bucket, the ``airflow-init`` service creates it before the other services
+start::
+
+    python -m common.remote_logging create-bucket
+
+Needs the Amazon provider, installed with the ``remote-logging`` extra and in
+the Airflow images.
+"""
+
+import argparse
+import logging
+from urllib.parse import urlsplit
+
+from airflow.configuration import conf
+
+log = logging.getLogger(__name__)
+
+
+def log_location(base_log_folder=None) -> tuple[str, str]:
+    """
+    Return the bucket and the key prefix of the remote base log folder.
+    """
+    base_log_folder = base_log_folder or conf.get("logging", "remote_base_log_folder")
+    parts = urlsplit(base_log_folder)
+    if parts.scheme not in ("s3", "s3a") or not parts.netloc:
+        raise ValueError(f"{base_log_folder!r} is not an s3://bucket/prefix location")
+    return parts.netloc, parts.path.strip("/")
+
+
+def s3_hook(conn_id=None):
+    from airflow.providers.amazon.aws.hooks.s3 import S3Hook
+
+    return S3Hook(aws_conn_id=conn_id or conf.get("logging", "remote_log_conn_id"))
+
+
+def create_bucket(conn_id=None, base_log_folder=None) -> bool:
+    """
+    Create the log bucket, return whether it did not exist.
+    """
+    bucket, _ = log_location(base_log_folder)
+    hook = s3_hook(conn_id)
+    if hook.check_for_bucket(bucket):
+        return False
+    hook.create_bucket(bucket_name=bucket)
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the remote log bucket.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("create-bucket", help="create the bucket if missing")
+    parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if not conf.getboolean("logging", "remote_logging"):
+        print("Remote logging is off, no bucket to create")
+        return
+    bucket, _ = log_location()
+    created = create_bucket()
+    print(f"Bucket {bucket} {'created' if created else 'already exists'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Pools, Celery queues and default priority weights declared in ``resources.yaml``.
+
+Pools are synced to the metadata database, only the pools that differ from
+the spec are written::
+
+    PYTHONPATH=airflow/dags python -m common.resources sync [--dry-run] [--prune]
+
+Queues have no state in Airflow, they are declared so tasks and workers can
+be checked against them. Priority weight rules are applied to the tasks by the
+``task_policy`` in ``airflow_local_settings.py``.
+"""
+
+import argparse
+import fnmatch
+import functools
+import logging
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import yaml
+
+log = logging.getLogger(__name__)
+
+RESOURCES_FILE = Path(
+    os.environ.get(
+        "AIRFLOW_RESOURCES_FILE", Path(__file__).resolve().parents[1] / "resources.yaml"
+    )
+)
+DEFAULT_POOL = "default_pool"
+DEFAULT_PRIORITY_WEIGHT = 1
+RULE_MATCHERS = ("dag_id", "task_id", "tag", "pool", "queue")
+
+
+class ResourcesSpecError(ValueError):
+    """
+    The resources spec is invalid.
+    """
+
+
+@dataclass(frozen=True)
+class PoolSpec:
+    name: str
+    slots: int
+    description: str = ""
+    include_deferred: bool = False
+
+
+@dataclass(frozen=True)
+class PriorityRule:
+    priority_weight: int
+    weight_rule: str | None = None
+    match: dict = field(default_factory=dict)
+
+    def matches(self, task) -> bool:
+        values = {
+            "dag_id": task.dag_id,
+            "task_id": task.task_id,
+            "pool": task.pool,
+            "queue": task.queue,
+        }
+        for key, pattern in self.match.items():
+            if key == "tag":
+                if pattern not in (task.dag.tags if task.has_dag() else []):
+                    return False
+            elif not fnmatch.fnmatchcase(values[key] or "", pattern):
+                return False
+        return True
+
+
+@dataclass(frozen=True)
+class ResourcesSpec:
+    pools: dict[str, PoolSpec]
+    queues: dict[str, str]
+    priority_rules: list[PriorityRule]
+
+    def priority_for(self, task) -> PriorityRule | None:
+        return next((r for r in self.priority_rules if r.matches(task)), None)
+
+
+def parse_spec(content: dict) -> ResourcesSpec:
+    pools = {}
+    for name, pool in (content.get("pools") or {}).items():
+        if not isinstance(pool, dict) or not isinstance(pool.get("slots"), int):
+            raise ResourcesSpecError(f"Pool {name} must set an integer number of slots")
+        pools[name] = PoolSpec(
+            name,
+            pool["slots"],
+            pool.get("description", ""),
+            pool.get("include_deferred", False),
+        )
+    if DEFAULT_POOL not in pools:
+        raise ResourcesSpecError(f"{DEFAULT_POOL} must be declared")
+
+    queues = {
+        name: (queue or {}).get("description", "")
+        for name, queue in (content.get("queues") or {}).items()
+    }
+    if not queues:
+        raise ResourcesSpecError("At least one queue must be declared")
+
+    rules = []
+    for rule in content.get("priority_weights") or []:
+        match = {key: rule[key] for key in RULE_MATCHERS if key in rule}
+        unknown = set(rule) - set(RULE_MATCHERS) - {"priority_weight", "weight_rule"}
+        if unknown or "priority_weight" not in rule:
+            raise ResourcesSpecError(f"Invalid priority weight rule {rule}")
+        rules.append(
+            PriorityRule(rule["priority_weight"], rule.get("weight_rule"), match)
+        )
+    return ResourcesSpec(pools, queues, rules)
+
+
+@functools.lru_cache(maxsize=4)
+def _load_spec(path, mtime_ns):
+    with open(path) as f:
+        return parse_spec(yaml.safe_load(f) or {})
+
+
+def load_spec(path=RESOURCES_FILE) -> ResourcesSpec:
+    """
+    Return the resources spec, parsed once per file change.
+    """
+    path = Path(path)
+    spec: ResourcesSpec = _load_spec(str(path), path.stat().st_mtime_ns)
+    return spec
+
+
+def apply_priority_weight(task, spec: ResourcesSpec):
+    """
+    Set the priority weight of the first matching rule on a task that kept the
+    default one.
+    """
+    if task.priority_weight != DEFAULT_PRIORITY_WEIGHT:
+        return
+    rule = spec.priority_for(task)
+    if rule is None:
+        return
+    task.priority_weight = rule.priority_weight
+    if rule.weight_rule:
+        try:
+            from airflow.task.priority_strategy import (
+                validate_and_load_priority_weight_strategy,
+            )
+        except ImportError:
+            task.weight_rule = rule.weight_rule
+        else:
+            task.weight_rule = validate_and_load_priority_weight_strategy(
+                rule.weight_rule
+            )
+
+
+def diff_pools(spec: ResourcesSpec, current: dict[str, PoolSpec]):
+    """
+    Return the pools to create, to update and the undeclared ones.
+    """
+    create = [pool for name, pool in spec.pools.items() if name not in current]
+    update = [
+        pool
+        for name, pool in spec.pools.items()
+        if name in current and current[name] != pool
+    ]
+    undeclared = sorted(set(current) - set(spec.pools) - {DEFAULT_POOL})
+    return create, update, undeclared
+
+
+def sync_pools(spec: ResourcesSpec, dry_run=False, prune=False):
+    """
+    Write the pools that differ from the spec to the metadata database.
+    """
+    from airflow.models import Pool
+    from airflow.utils.session import create_session
+    from sqlalchemy import select
+
+    with create_session() as session:
+        existing = {pool.pool: pool for pool in session.scalars(select(Pool))}
+        current = {
+            name: PoolSpec(
+                name, pool.slots, pool.description or "", bool(pool.include_deferred)
+            )
+            for name, pool in existing.items()
+        }
+        create, update, undeclared = diff_pools(spec, current)
+
+        for pool in create:
+            log.info("Creating pool %s with %d slots", pool.name, pool.slots)
+        for pool in update:
+            log.info("Updating pool %s: %s -> %s", pool.name, current[pool.name], pool)
+        for name in undeclared:
+            log.warning(
+                "Pool %s is not declared%s", name, ", deleting it" if prune else ""
+            )
+        if dry_run:
+            session.rollback()
+            return create, update, undeclared
+
+        for pool in create + update:
+            row = existing.get(pool.name) or Pool(pool=pool.name)
+            row.slots = pool.slots
+            row.description = pool.description
+            row.include_deferred = pool.include_deferred
+            session.add(row)
+        if prune:
+            for name in undeclared:
+                session.delete(existing[name])
+    return create, update, undeclared
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync the declared Airflow pools.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    sync_parser = subparsers.add_parser("sync", help="apply the pools diff")
+    sync_parser.add_argument("--spec", default=str(RESOURCES_FILE))
+    sync_parser.add_argument("--dry-run", action="store_true")
+    sync_parser.add_argument(
+        "--prune", action="store_true", help="delete the undeclared pools"
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    create, update, undeclared = sync_pools(
+        load_spec(args.spec), dry_run=args.dry_run, prune=args.prune
+    )
+    print(
+        f"{len(create)} pools created, {len(update)} updated, "
+        f"{len(undeclared) if args.prune else 0} deleted"
+        + (" (dry run)" if args.dry_run else "")
+    )
+
+
+if __name__ == "__main__":
+    main()
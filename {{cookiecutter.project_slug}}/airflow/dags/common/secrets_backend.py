@@ -0,0 +1,115 @@
+"""
+Secrets backend reading Variables and Connections from mounted files.
+
+Airflow's ``LocalFilesystemBackend`` parses its files again on every lookup.
+This backend indexes them once in memory and only parses them again when a
+file changed, so lookups from tasks never reach the metadata DB for keys that
+are in the files. Keys missing from the files return ``None`` and Airflow
+falls back to the environment and the metadata DB. It is configured in
+``docker-compose.local.yml`` with ``AIRFLOW__SECRETS__BACKEND`` and
+``AIRFLOW__SECRETS__BACKEND_KWARGS``, for example::
+
+    {
+        "variables_file_path": "/opt/airflow/secrets/variables",
+        "connections_file_path": "/opt/airflow/secrets/connections"
+    }
+
+Each path is a JSON, YAML or ``.env`` file, or a folder of them merged in
+file name order.
+"""
+
+import logging
+import time
+from pathlib import Path
+
+from airflow.exceptions import AirflowException
+from airflow.secrets.local_filesystem import (
+    LocalFilesystemBackend,
+    load_connections_dict,
+    load_variables,
+)
+
+log = logging.getLogger(__name__)
+
+SECRET_FILE_SUFFIXES = {".json", ".yaml", ".yml", ".env"}
+# Seconds between two checks of the files modification time
+RELOAD_INTERVAL = 5
+
+
+def secret_files(path) -> list[Path]:
+    path = Path(path)
+    if path.is_dir():
+        return sorted(
+            p
+            for p in path.iterdir()
+            if p.suffix in SECRET_FILE_SUFFIXES and p.is_file()
+        )
+    return [path] if path.exists() else []
+
+
+class CachedLocalFilesystemBackend(LocalFilesystemBackend):
+    """
+    ``LocalFilesystemBackend`` keeping the parsed files in memory.
+
+    :param variables_file_path: file or folder of files with Variables.
+    :param connections_file_path: file or folder of files with Connections.
+    :param reload_interval: seconds between checks for changed files.
+    """
+
+    def __init__(
+        self,
+        variables_file_path=None,
+        connections_file_path=None,
+        reload_interval=RELOAD_INTERVAL,
+    ):
+        super().__init__(variables_file_path, connections_file_path)
+        self.reload_interval = float(reload_interval)
+        # path -> (files signature, parsed secrets)
+        self._indexes = {}
+        self._checked_at = {}
+
+    def _index(self, path, loader):
+        """
+        Return the secrets under ``path``, parsed again only when a file was
+        added, removed or modified since the last check.
+        """
+        if not path:
+            return {}
+        now = time.monotonic()
+        cached = self._indexes.get(path)
+        if cached and now - self._checked_at[path] < self.reload_interval:
+            return cached[1]
+        self._checked_at[path] = now
+
+        try:
+            files = secret_files(path)
+            signature = tuple((str(f), f.stat().st_mtime_ns) for f in files)
+        except FileNotFoundError:
+            # A file was removed while listing, check again on the next lookup
+            self._checked_at[path] = 0
+            return cached[1] if cached else {}
+        if cached and cached[0] == signature:
+            return cached[1]
+
+        secrets = {}
+        try:
+            for file in files:
+                secrets.update(loader(str(file)))
+        except AirflowException as e:
+            if not cached:
+                raise
+            log.warning("Keeping the previous secrets of %s: %s", path, e)
+            return cached[1]
+        log.info(
+            "Indexed %d secrets from %d files in %s", len(secrets), len(files), path
+        )
+        self._indexes[path] = (signature, secrets)
+        return secrets
+
+    @property
+    def _local_variables(self):
+        return self._index(self.variables_file, load_variables)
+
+    @property
+    def _local_connections(self):
+        return self._index(self.connections_file, load_connections_dict)
@@ -0,0 +1,155 @@
+"""
+Settings for DAG code that are safe to read at parse time.
+
+Reading ``Variable.get`` at the top level of a DAG file costs a metadata DB
+round trip per variable every time the file is parsed. ``settings`` resolves
+a key from, in order:
+
+1. the ``AIRFLOW_VAR_<KEY>`` environment variable,
+2. the local secrets file (``AIRFLOW_SETTINGS_FILE``, YAML or JSON),
+3. Airflow Variables, all fetched in one query and cached for
+   ``AIRFLOW_SETTINGS_TTL`` seconds, so parsing many DAGs in one process
+   costs a single query.
+
+Keys missing from the metadata DB fall back to ``Variable.get`` so custom
+secrets backends are still consulted::
+
+    from common.settings import settings
+
+    batch_size = settings.get_int("orders_batch_size", default=1000)
+"""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+import yaml
+
+log = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+SECRETS_FILE = Path(
+    os.environ.get("AIRFLOW_SETTINGS_FILE", PROJECT_ROOT / "secrets" / "settings.yaml")
+)
+DEFAULT_TTL = int(os.environ.get("AIRFLOW_SETTINGS_TTL", 300))
+ENV_PREFIX = "AIRFLOW_VAR_"
+TRUE_VALUES = {"1", "true", "yes", "y", "on"}
+FALSE_VALUES = {"0", "false", "no", "n", "off"}
+
+_MISSING = object()
+
+
+class SettingNotFound(KeyError):
+    """
+    A setting is not defined in any of the sources.
+    """
+
+
+class Settings:
+    """
+    Resolve settings from the environment, a secrets file and Variables.
+
+    :param secrets_file: local YAML or JSON file with a flat mapping of keys.
+    :param ttl: seconds the Variables are cached for.
+    """
+
+    def __init__(self, secrets_file=SECRETS_FILE, ttl=DEFAULT_TTL):
+        self.secrets_file = Path(secrets_file)
+        self.ttl = ttl
+        self._file = (None, {})
+        self._variables = {}
+        self._fetched_at = None
+
+    def clear(self):
+        self._file = (None, {})
+        self._variables = {}
+        self._fetched_at = None
+
+    def _file_settings(self):
+        """
+        Return the secrets file content, read again only when it changed.
+        """
+        try:
+            mtime = self.secrets_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if self._file[0] != mtime:
+            with open(self.secrets_file) as f:
+                self._file = (mtime, yaml.safe_load(f) or {})
+        return self._file[1]
+
+    def _fetch_variables(self):
+        """
+        Fetch every Variable from the metadata DB in a single query.
+        """
+        from airflow.models import Variable
+        from airflow.utils.session import create_session
+        from sqlalchemy import select
+
+        with create_session() as session:
+            return {var.key: var.val for var in session.scalars(select(Variable))}
+
+    def _variable(self, key):
+        now = time.monotonic()
+        if self._fetched_at is None or now - self._fetched_at > self.ttl:
+            try:
+                self._variables = self._fetch_variables()
+            except Exception as e:
+                log.warning("Could not prefetch Variables: %s", e)
+                self._variables = {}
+            self._fetched_at = now
+
+        if key not in self._variables:
+            from airflow.models import Variable
+
+            # Secrets backends are only looked up for keys missing from the DB,
+            # misses are cached as well until the next prefetch.
+            self._variables[key] = Variable.get(key, default_var=None)
+        return self._variables[key]
+
+    def get(self, key, default=_MISSING, cast=None):
+        """
+        Return a setting, converted with ``cast`` when given.
+
+        :raises SettingNotFound: if the key is not set and has no default.
+        """
+        value = os.environ.get(f"{ENV_PREFIX}{key.upper()}")
+        if value is None:
+            value = self._file_settings().get(key)
+        if value is None:
+            value = self._variable(key)
+        if value is None:
+            if default is _MISSING:
+                raise SettingNotFound(key)
+            return default
+        return cast(value) if cast else value
+
+    def get_int(self, key, default=_MISSING) -> int:
+        return int(self.get(key, default, cast=int))
+
+    def get_float(self, key, default=_MISSING) -> float:
+        return float(self.get(key, default, cast=float))
+
+    def get_bool(self, key, default=_MISSING) -> bool:
+        return bool(self.get(key, default, cast=to_bool))
+
+    def get_json(self, key, default=_MISSING):
+        return self.get(
+            key, default, cast=lambda v: json.loads(v) if isinstance(v, str) else v
+        )
+
+
+def to_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    normalized = str(value).strip().lower()
+    if normalized in TRUE_VALUES:
+        return True
+    if normalized in FALSE_VALUES:
+        return False
+    raise ValueError(f"{value!r} is not a boolean")
+
+
+settings = Settings()
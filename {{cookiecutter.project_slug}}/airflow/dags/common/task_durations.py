@@ -0,0 +1,326 @@
+"""
+Rolling task duration summaries and regression detection.
+
+Each run reads the successful task instances that ended since the watermark
+of the previous run, in batches of ``TASK_DURATION_BATCH_SIZE`` rows, and
+folds their durations into ``task_duration_summary``: one row per task with
+its last ``TASK_DURATION_WINDOW`` durations and their p50/p95. The work done
+per run is bounded by the new rows, not by the size of ``task_instance``.
+
+A task instance committed after the watermark passed its ``end_date``, by a
+long transaction or a worker with a late clock, is caught by reading again
+the ``TASK_DURATION_LATE_MINUTES`` before the watermark. The task instances
+of that window already folded are kept in ``task_duration_seen`` and skipped,
+so reading one twice does not count its duration twice.
+
+A task is flagged when its last ``RECENT_RUNS`` durations are significantly
+longer than the previous ones, by a one-sided Mann-Whitney U test, and their
+median is at least ``MIN_SLOWDOWN`` times the baseline one.
+
+On a large metadata database an index on ``task_instance (state, end_date)``
+keeps the incremental read an index range scan.
+"""
+
+import json
+import logging
+import math
+import os
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from itertools import groupby
+
+from sqlalchemy import (
+    Column,
+    Float,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    create_engine,
+    select,
+)
+
+from airflow.configuration import conf
+from airflow.utils import timezone
+from airflow.utils.sqlalchemy import UtcDateTime
+
+log = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.environ.get("TASK_DURATION_BATCH_SIZE", 10_000))
+WINDOW = int(os.environ.get("TASK_DURATION_WINDOW", 200))
+INITIAL_LOOKBACK = timedelta(
+    days=int(os.environ.get("TASK_DURATION_LOOKBACK_DAYS", 30))
+)
+LOOKBACK = timedelta(minutes=int(os.environ.get("TASK_DURATION_LATE_MINUTES", 15)))
+RECENT_RUNS = 5
+MIN_BASELINE_RUNS = 20
+MIN_SLOWDOWN = 1.5
+SIGNIFICANCE = 0.01
+WATERMARK = "task_instance"
+
+# Only the task_instance columns read here, so the query does not depend on
+# the Airflow version's ORM model
+task_instance = Table(
+    "task_instance",
+    MetaData(),
+    Column("dag_id", String(250)),
+    Column("task_id", String(250)),
+    Column("run_id", String(250)),
+    Column("map_index", Integer),
+    Column("state", String(20)),
+    Column("duration", Float),
+    Column("end_date", UtcDateTime),
+)
+
+summary_metadata = MetaData()
+duration_summary = Table(
+    "task_duration_summary",
+    summary_metadata,
+    Column("dag_id", String(250), primary_key=True),
+    Column("task_id", String(250), primary_key=True),
+    # JSON list of the last durations, oldest first
+    Column("samples", Text, nullable=False),
+    Column("p50", Float),
+    Column("p95", Float),
+    Column("runs", Integer, nullable=False),
+    Column("updated_at", UtcDateTime, nullable=False),
+)
+duration_watermark = Table(
+    "task_duration_watermark",
+    summary_metadata,
+    Column("name", String(50), primary_key=True),
+    Column("end_date", UtcDateTime, nullable=False),
+)
+# The task instances folded in the lookback before the watermark; a cleared
+# and run again task instance has a new end_date, so it is folded again.
+duration_seen = Table(
+    "task_duration_seen",
+    summary_metadata,
+    Column("dag_id", String(250), primary_key=True),
+    Column("task_id", String(250), primary_key=True),
+    Column("run_id", String(250), primary_key=True),
+    Column("map_index", Integer, primary_key=True),
+    Column("end_date", UtcDateTime, primary_key=True),
+)
+
+
+@dataclass
+class Regression:
+    dag_id: str
+    task_id: str
+    baseline_p50: float
+    baseline_p95: float
+    recent_p50: float
+    slowdown: float
+    p_value: float
+
+
+def percentile(values, q) -> float:
+    """
+    Return the ``q`` percentile of ``values``, interpolating between ranks.
+    """
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return float(ordered[low] + (ordered[high] - ordered[low]) * (rank - low))
+
+
+def mann_whitney_p(recent, baseline) -> float:
+    """
+    One-sided p-value of ``recent`` being longer than ``baseline``, with the
+    normal approximation of the U statistic corrected for ties.
+    """
+    n1, n2 = len(recent), len(baseline)
+    ranked = sorted([(v, 0) for v in recent] + [(v, 1) for v in baseline])
+    rank_sum, ties, position = 0.0, 0.0, 1
+    for _, tied in groupby(ranked, key=lambda x: x[0]):
+        group = list(tied)
+        size = len(group)
+        average_rank = position + (size - 1) / 2
+        rank_sum += average_rank * sum(1 for _, sample in group if sample == 0)
+        ties += size**3 - size
+        position += size
+
+    u = rank_sum - n1 * (n1 + 1) / 2
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+
+def detect_regression(dag_id, task_id, samples) -> Regression | None:
+    """
+    Compare the last ``RECENT_RUNS`` durations to the ones before them.
+    """
+    recent, baseline = samples[-RECENT_RUNS:], samples[:-RECENT_RUNS]
+    if len(recent) < RECENT_RUNS or len(baseline) < MIN_BASELINE_RUNS:
+        return None
+    baseline_p50 = percentile(baseline, 50)
+    recent_p50 = percentile(recent, 50)
+    slowdown = recent_p50 / baseline_p50 if baseline_p50 > 0 else math.inf
+    if slowdown < MIN_SLOWDOWN:
+        return None
+    p_value = mann_whitney_p(recent, baseline)
+    if p_value >= SIGNIFICANCE:
+        return None
+    return Regression(
+        dag_id,
+        task_id,
+        round(baseline_p50, 3),
+        round(percentile(baseline, 95), 3),
+        round(recent_p50, 3),
+        round(slowdown, 2),
+        p_value,
+    )
+
+
+def read_new_durations(conn, since, until, batch_size=BATCH_SIZE):
+    """
+    Yield batches of ``(dag_id, task_id, run_id, map_index, duration,
+    end_date)`` of the task instances that succeeded after ``since`` and until
+    ``until``.
+
+    Batches end on a change of ``end_date`` so that resuming from the last
+    ``end_date`` of a batch neither skips nor repeats a row.
+    """
+    query = (
+        select(
+            task_instance.c.dag_id,
+            task_instance.c.task_id,
+            task_instance.c.run_id,
+            task_instance.c.map_index,
+            task_instance.c.duration,
+            task_instance.c.end_date,
+        )
+        .where(
+            task_instance.c.state == "success",
+            task_instance.c.duration.is_not(None),
+        )
+        .order_by(task_instance.c.end_date)
+    )
+    while True:
+        fetched = conn.execute(
+            query.where(
+                task_instance.c.end_date > since, task_instance.c.end_date <= until
+            ).limit(batch_size)
+        ).all()
+        rows = fetched
+        if len(fetched) == batch_size:
+            last = fetched[-1].end_date
+            rows = [row for row in fetched if row.end_date != last]
+            if not rows:
+                # More rows ended at the same time than fit in a batch
+                rows = conn.execute(query.where(task_instance.c.end_date == last)).all()
+        if not rows:
+            return
+        yield rows
+        if len(fetched) < batch_size:
+            return
+        since = rows[-1].end_date
+
+
+def update_summaries(engine, now=None, batch_size=BATCH_SIZE):
+    """
+    Fold the task instances that ended since the last run into the summaries.
+
+    :return: a report with the new rows read and the regressions found.
+    """
+    now = now or timezone.utcnow()
+    summary_metadata.create_all(engine, checkfirst=True)
+
+    with engine.begin() as conn:
+        watermark = conn.execute(
+            select(duration_watermark.c.end_date).where(
+                duration_watermark.c.name == WATERMARK
+            )
+        ).scalar()
+        since = (
+            watermark - LOOKBACK if watermark is not None else now - INITIAL_LOOKBACK
+        )
+        seen = {
+            tuple(row)
+            for row in conn.execute(
+                select(duration_seen).where(duration_seen.c.end_date > since)
+            )
+        }
+
+        new_durations = {}
+        new_rows = []
+        high = watermark if watermark is not None else since
+        for rows in read_new_durations(conn, since, now, batch_size):
+            for row in rows:
+                key = (row.dag_id, row.task_id, row.run_id, row.map_index, row.end_date)
+                if key in seen:
+                    continue
+                new_rows.append(dict(zip(duration_seen.c.keys(), key, strict=True)))
+                new_durations.setdefault(key[:2], []).append(row.duration)
+            high = max(high, rows[-1].end_date)
+
+        dag_ids = {dag_id for dag_id, _ in new_durations}
+        summaries = {
+            (row.dag_id, row.task_id): row
+            for row in conn.execute(
+                select(duration_summary).where(duration_summary.c.dag_id.in_(dag_ids))
+            )
+        }
+
+        regressions = []
+        for (dag_id, task_id), durations in new_durations.items():
+            summary = summaries.get((dag_id, task_id))
+            samples = json.loads(summary.samples) if summary else []
+            samples = (samples + durations)[-WINDOW:]
+            values = {
+                "samples": json.dumps([round(s, 3) for s in samples]),
+                "p50": percentile(samples, 50),
+                "p95": percentile(samples, 95),
+                "runs": (summary.runs if summary else 0) + len(durations),
+                "updated_at": now,
+            }
+            if summary:
+                conn.execute(
+                    duration_summary.update()
+                    .where(
+                        duration_summary.c.dag_id == dag_id,
+                        duration_summary.c.task_id == task_id,
+                    )
+                    .values(**values)
+                )
+            else:
+                conn.execute(
+                    duration_summary.insert().values(
+                        dag_id=dag_id, task_id=task_id, **values
+                    )
+                )
+            regression = detect_regression(dag_id, task_id, samples)
+            if regression:
+                regressions.append(regression)
+
+        if new_rows:
+            conn.execute(duration_seen.insert(), new_rows)
+        conn.execute(
+            duration_seen.delete().where(duration_seen.c.end_date <= high - LOOKBACK)
+        )
+        if watermark is None:
+            conn.execute(
+                duration_watermark.insert().values(name=WATERMARK, end_date=high)
+            )
+        elif high != watermark:
+            conn.execute(
+                duration_watermark.update()
+                .where(duration_watermark.c.name == WATERMARK)
+                .values(end_date=high)
+            )
+
+    return {
+        "rows_read": len(new_rows),
+        "tasks_updated": len(new_durations),
+        "watermark": high.isoformat(),
+        "regressions": [asdict(r) for r in regressions],
+    }
+
+
+def metadata_engine():
+    return create_engine(conf.get("database", "sql_alchemy_conn"))
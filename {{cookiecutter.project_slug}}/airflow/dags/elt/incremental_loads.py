@@ -0,0 +1,59 @@
+"""
+This DAG loads the rows of the source tables changed since its previous run
+into the warehouse, instead of reloading the whole tables.
+"""
+
+from datetime import timedelta
+
+import pendulum
+
+from airflow.decorators import dag
+from common.assets import asset
+from common.incremental import IncrementalLoadOperator, IncrementalSource
+
+SOURCE_CONN_ID = "elt_source"
+TARGET_CONN_ID = "elt_target"
+
+# Add a source per table to load, its cursor column must be updated with the rows
+SOURCES = [
+    IncrementalSource(
+        name="shop.orders",
+        source_table="orders",
+        target_table="stg_orders",
+        key=("order_id",),
+        cursor="updated_at",
+    ),
+]
+
+
+@dag(
+    dag_id="incremental_loads",
+    default_args={
+        "owner": "airflow",
+        "retries": 2,
+        "retry_delay": timedelta(minutes=1),
+    },
+    schedule=timedelta(minutes=15),
+    start_date=pendulum.datetime(2023, 1, 1, tz="UTC"),
+    dagrun_timeout=timedelta(minutes=60),
+    # Runs share the watermarks, they must not overlap
+    max_active_runs=1,
+    catchup=False,
+    tags=["elt"],
+)
+def incremental_loads() -> None:
+    """
+    Upsert the rows of each source changed since its watermark into its
+    target table.
+    """
+    for source in SOURCES:
+        IncrementalLoadOperator(
+            task_id=f"load_{source.target_table}",
+            source=source,
+            source_conn_id=SOURCE_CONN_ID,
+            target_conn_id=TARGET_CONN_ID,
+            outlets=[asset(f"warehouse.{source.target_table}")],
+        )
+
+
+incremental_loads_dag = incremental_loads()
@@ -0,0 +1,76 @@
+"""
+This DAG keeps rolling task duration summaries and flags the tasks that got
+significantly slower.
+"""
+
+from datetime import timedelta
+
+import pendulum
+
+from airflow.decorators import dag, task
+
+
+@dag(
+    dag_id="task_duration_regressions",
+    default_args={
+        "owner": "airflow",
+    },
+    schedule=timedelta(hours=1),
+    start_date=pendulum.datetime(2023, 1, 1, tz="UTC"),
+    dagrun_timeout=timedelta(minutes=30),
+    max_active_runs=1,
+    catchup=False,
+    tags=["maintainance"],
+)
+def task_duration_regressions() -> None:
+    """
+    Read the task instances that ended since the last run from the metadata
+    database, update the p50/p95 summaries and report the regressions.
+    """
+
+    @task
+    def detect_regressions() -> dict:
+        """
+        Update the summaries and emit a metric per regressed task
+        """
+        import logging
+
+        from airflow.stats import Stats
+        from common.task_durations import metadata_engine, update_summaries
+
+        log = logging.getLogger(__name__)
+        engine = metadata_engine()
+        try:
+            report: dict = update_summaries(engine)
+        finally:
+            engine.dispose()
+
+        log.info(
+            "Read %d task instances of %d tasks up to %s",
+            report["rows_read"],
+            report["tasks_updated"],
+            report["watermark"],
+        )
+        Stats.gauge("task_duration.regressions", len(report["regressions"]))
+        for regression in report["regressions"]:
+            Stats.gauge(
+                f"task_duration.slowdown.{regression['dag_id']}."
+                f"{regression['task_id']}",
+                regression["slowdown"],
+            )
+            log.warning(
+                "%s.%s is %.1fx slower: p50 %.1fs, was %.1fs (p95 %.1fs), p=%.2g",
+                regression["dag_id"],
+                regression["task_id"],
+                regression["slowdown"],
+                regression["recent_p50"],
+                regression["baseline_p50"],
+                regression["baseline_p95"],
+                regression["p_value"],
+            )
+        return report
+
+    detect_regressions()
+
+
+task_duration_regressions_dag = task_duration_regressions()
@@ -0,0 +1,64 @@
+"""
+Benchmarks of the DAG library, run with ``make bench``.
+
+The runs are stored in ``benchmarks/baselines/<machine class>``, the machine
+class being ``BENCH_MACHINE_CLASS`` or the system, the architecture and the
+number of CPUs, e.g. ``linux-x86_64-8cpu``. ``make bench-baseline`` saves a
+run there, to be committed, and ``make bench`` compares a run to the last one
+saved for the machine class, failing the benchmarks slower than
+``BENCH_THRESHOLD`` percent.
+"""
+
+import os
+import platform
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BASELINES = PROJECT_ROOT / "benchmarks" / "baselines"
+MACHINE_CLASS = os.environ.get(
+    "BENCH_MACHINE_CLASS",
+    f"{platform.system()}-{platform.machine()}-{os.cpu_count()}cpu".lower(),
+)
+DEFAULT_STORAGE = "file://./.benchmarks"
+PAYLOAD_SIZES = {"small": 10, "medium": 1_000, "large": 10_000}
+
+sys.path.insert(0, str(PROJECT_ROOT / "airflow" / "dags"))
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    # Before pytest-benchmark opens its storage
+    if config.getoption("benchmark_storage") == DEFAULT_STORAGE:
+        config.option.benchmark_storage = f"file://{BASELINES / MACHINE_CLASS}"
+
+
+def pytest_benchmark_update_machine_info(config, machine_info):
+    machine_info["machine_class"] = MACHINE_CLASS
+
+
+@pytest.fixture(params=list(PAYLOAD_SIZES))
+def payload_size(request):
+    """
+    Number of records of the payloads, small, medium and large.
+    """
+    return PAYLOAD_SIZES[request.param]
+
+
+@pytest.fixture
+def records(payload_size):
+    """
+    Rows like the ones extracted from a source table.
+    """
+    return [
+        {
+            "id": i,
+            "name": f"item {i}",
+            "price": i % 1000 / 10,
+            "updated_at": f"2024-01-{i % 28 + 1:02d}T00:00:00+00:00",
+            "tags": ["sale"] if i % 3 else [],
+        }
+        for i in range(payload_size)
+    ]
@@ -0,0 +1,26 @@
+from common.critical_path import DependencyGraph, Node
+
+
+def layered_graph(tasks) -> DependencyGraph:
+    """
+    Square grid of ``tasks`` tasks, each waiting for two tasks of the layer
+    before.
+    """
+    width = max(1, int(tasks**0.5))
+    graph = DependencyGraph()
+    for i in range(tasks):
+        graph.add_node(Node(f"dag.task_{i}", "task", "dag", p50=i * 7 % 13 + 1))
+        if i >= width:
+            layer_start = i - i % width - width
+            graph.add_edge(f"dag.task_{i - width}", f"dag.task_{i}")
+            graph.add_edge(f"dag.task_{layer_start + (i + 1) % width}", f"dag.task_{i}")
+    return graph
+
+
+def test_analyze(benchmark, payload_size):
+    """
+    Benchmark the critical path, slack and speedups of the last task to land
+    """
+    graph = layered_graph(payload_size)
+    report = benchmark(graph.analyze)
+    assert report["critical_path"]
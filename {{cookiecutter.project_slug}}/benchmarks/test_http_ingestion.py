@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+from common.http_ingestion import CursorPagination, OffsetPagination, ingest
+from scripts.http_ingestion_benchmark import StandInServer
+
+
+@pytest.fixture
+def server(payload_size):
+    with StandInServer(records=payload_size, latency=0) as server:
+        yield server
+
+
+@pytest.mark.parametrize(
+    "pagination",
+    [CursorPagination(), OffsetPagination(page_size=100)],
+    ids=["cursor", "offset"],
+)
+def test_ingest(benchmark, server, pagination, tmp_path):
+    """
+    Benchmark fetching and writing all the pages of an endpoint, the overhead
+    of the client on an API without latency
+    """
+
+    def run():
+        return asyncio.run(
+            ingest(
+                server.url,
+                ["/items"],
+                tmp_path,
+                pagination=pagination,
+                params={"limit": 100},
+            )
+        )
+
+    report = benchmark.pedantic(run, rounds=5, warmup_rounds=1)
+    assert report["pages"] == max(1, -(-server.records // 100))
@@ -0,0 +1,30 @@
+from common.memoize import ResultStore, memoize_key
+
+
+def extract(rows):
+    return rows
+
+
+def test_memoize_key(benchmark, records):
+    """
+    Benchmark hashing the serialized arguments of a call
+    """
+    key = benchmark(memoize_key, extract, (records,), {})
+    assert len(key) == 64
+
+
+def test_result_store_put(benchmark, records, tmp_path):
+    """
+    Benchmark serializing and writing a result
+    """
+    store = ResultStore(tmp_path)
+    assert benchmark(store.put, "ab12", records) == 0
+
+
+def test_result_store_get(benchmark, records, tmp_path):
+    """
+    Benchmark reading and deserializing a result
+    """
+    store = ResultStore(tmp_path)
+    store.put("ab12", records)
+    assert benchmark(store.get, "ab12") == (True, records)
@@ -0,0 +1,9 @@
+select
+    customers.customer_id,
+    customers.first_name,
+    count(orders.order_id) as order_count,
+    coalesce(sum(orders.amount), 0) as lifetime_value
+from {{ ref('stg_customers') }} as customers
+left join {{ ref('stg_orders') }} as orders
+    on customers.customer_id = orders.customer_id
+group by 1, 2
@@ -0,0 +1,6 @@
+select
+    order_date,
+    sum(amount) as revenue
+from {{ ref('stg_orders') }}
+where status = 'completed'
+group by 1
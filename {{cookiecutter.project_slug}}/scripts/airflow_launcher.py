@@ -0,0 +1,344 @@
+"""
+Start the local Airflow components in parallel and supervise them.
+
+Every component is started at once, then the launcher waits on its health
+check and reports how long each one took to become ready. Crashed components
+are restarted with a backoff and all of them are stopped gracefully on
+SIGINT/SIGTERM or ``down``::
+
+    python scripts/airflow_launcher.py up
+    python scripts/airflow_launcher.py down
+
+The component set follows the installed Airflow: ``webserver`` on 2.x and
+``api-server`` plus ``dag-processor`` on 3.x, like ``docker-compose.local.yml``.
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+LOG_DIR = PROJECT_ROOT / "logs" / "launcher"
+PID_FILE = LOG_DIR / "launcher.pid"
+
+HEALTH_CHECK_INTERVAL = 1.0
+HEALTH_CHECK_TIMEOUT = 10
+READY_TIMEOUT = 300
+GRACE_PERIOD = 30
+MAX_RESTARTS = 5
+MAX_BACKOFF = 30
+
+
+@dataclass
+class Component:
+    """
+    A long running Airflow process and how to tell it is ready.
+    """
+
+    name: str
+    command: list[str]
+    health_url: str | None = None
+    health_command: list[str] | None = None
+    env: dict[str, str] = field(default_factory=dict)
+
+
+def airflow_major_version():
+    try:
+        return int(version("apache-airflow").split(".")[0])
+    except PackageNotFoundError:
+        sys.exit("apache-airflow is not installed, run `make init` first")
+
+
+def job_check(job_type):
+    return ["airflow", "jobs", "check", "--job-type", job_type, "--local"]
+
+
+def airflow_components(major_version, port=8080, standalone_dag_processor=False):
+    """
+    Return the components to run for an Airflow major version.
+    """
+    scheduler = Component(
+        "scheduler",
+        ["airflow", "scheduler"],
+        health_url="http://localhost:8974/health",
+        env={"AIRFLOW__SCHEDULER__ENABLE_HEALTH_CHECK": "True"},
+    )
+    triggerer = Component(
+        "triggerer", ["airflow", "triggerer"], health_command=job_check("TriggererJob")
+    )
+    dag_processor = Component(
+        "dag-processor",
+        ["airflow", "dag-processor"],
+        health_command=job_check("DagProcessorJob"),
+    )
+
+    if major_version >= 3:
+        api_server = Component(
+            "api-server",
+            ["airflow", "api-server", "--port", str(port)],
+            health_url=f"http://localhost:{port}/api/v2/version",
+        )
+        return [api_server, scheduler, dag_processor, triggerer]
+
+    webserver = Component(
+        "webserver",
+        ["airflow", "webserver", "--port", str(port)],
+        health_url=f"http://localhost:{port}/health",
+    )
+    if not standalone_dag_processor:
+        return [webserver, scheduler, triggerer]
+
+    scheduler.env["AIRFLOW__SCHEDULER__STANDALONE_DAG_PROCESSOR"] = "True"
+    dag_processor.env["AIRFLOW__SCHEDULER__STANDALONE_DAG_PROCESSOR"] = "True"
+    return [webserver, scheduler, dag_processor, triggerer]
+
+
+class Supervisor:
+    """
+    Run components in parallel, wait until they are healthy and keep them up.
+    """
+
+    def __init__(
+        self,
+        components,
+        log_dir=LOG_DIR,
+        ready_timeout=READY_TIMEOUT,
+        grace_period=GRACE_PERIOD,
+        max_restarts=MAX_RESTARTS,
+    ):
+        self.components = {component.name: component for component in components}
+        self.log_dir = Path(log_dir)
+        self.ready_timeout = ready_timeout
+        self.grace_period = grace_period
+        self.max_restarts = max_restarts
+        self.processes = {}
+        self.started_at = {}
+        self.ready_after = {}
+        self.restarts = dict.fromkeys(self.components, 0)
+        self.next_restart = {}
+        self.stopping = False
+
+    def start(self, name):
+        component = self.components[name]
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.log_dir / f"{name}.log", "ab") as log_file:
+            self.processes[name] = subprocess.Popen(
+                component.command,
+                env={**os.environ, **component.env},
+                stdin=subprocess.DEVNULL,
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+        self.started_at[name] = time.monotonic()
+        self.ready_after.pop(name, None)
+
+    def is_healthy(self, name):
+        component = self.components[name]
+        if component.health_url:
+            try:
+                with urllib.request.urlopen(
+                    component.health_url, timeout=HEALTH_CHECK_TIMEOUT
+                ) as response:
+                    return response.status == 200
+            except (urllib.error.URLError, OSError):
+                return False
+        if component.health_command:
+            try:
+                result = subprocess.run(
+                    component.health_command,
+                    env={**os.environ, **component.env},
+                    capture_output=True,
+                    timeout=HEALTH_CHECK_TIMEOUT,
+                )
+            except subprocess.TimeoutExpired:
+                return False
+            return result.returncode == 0
+        return self.processes[name].poll() is None
+
+    def restart_crashed(self):
+        """
+        Restart the components that exited, backing off on repeated crashes.
+        """
+        now = time.monotonic()
+        for name, process in list(self.processes.items()):
+            if process.poll() is None:
+                continue
+            if name not in self.next_restart:
+                self.restarts[name] += 1
+                if self.restarts[name] > self.max_restarts:
+                    raise RuntimeError(
+                        f"{name} crashed {self.max_restarts} times, "
+                        f"see {self.log_dir / name}.log"
+                    )
+                backoff = min(2 ** (self.restarts[name] - 1), MAX_BACKOFF)
+                print(
+                    f"{name} exited with {process.returncode}, "
+                    f"restarting in {backoff}s",
+                    flush=True,
+                )
+                self.next_restart[name] = now + backoff
+            elif now >= self.next_restart[name]:
+                del self.next_restart[name]
+                self.start(name)
+
+    def check_readiness(self, executor):
+        """
+        Run the health checks of the components not ready yet, in parallel.
+        """
+        pending = [
+            name
+            for name in self.components
+            if name not in self.ready_after and self.processes[name].poll() is None
+        ]
+        for name, healthy in zip(
+            pending, executor.map(self.is_healthy, pending), strict=True
+        ):
+            if healthy:
+                self.ready_after[name] = time.monotonic() - self.started_at[name]
+                print(f"{name} ready after {self.ready_after[name]:.1f}s", flush=True)
+
+    def report(self, cold_start):
+        report = {
+            "cold_start_seconds": round(cold_start, 2),
+            "components": {
+                name: round(seconds, 2) for name, seconds in self.ready_after.items()
+            },
+        }
+        (self.log_dir / "startup.json").write_text(json.dumps(report, indent=2))
+        print(f"All components ready, cold start took {cold_start:.1f}s")
+        for name, seconds in sorted(self.ready_after.items(), key=lambda x: x[1]):
+            print(f"  {name:<15} {seconds:6.1f}s")
+        sys.stdout.flush()
+        return report
+
+    def run(self, until_ready=False):
+        """
+        Start every component and supervise them until asked to stop.
+
+        :param until_ready: return once every component is ready instead of
+            supervising them.
+        """
+        start = time.monotonic()
+        for name in self.components:
+            self.start(name)
+
+        all_ready = False
+        with ThreadPoolExecutor(max_workers=len(self.components)) as executor:
+            while not self.stopping:
+                self.restart_crashed()
+                if not all_ready:
+                    self.check_readiness(executor)
+                    if len(self.ready_after) == len(self.components):
+                        all_ready = True
+                        report = self.report(time.monotonic() - start)
+                        if until_ready:
+                            return report
+                    elif time.monotonic() - start > self.ready_timeout:
+                        waiting = sorted(set(self.components) - set(self.ready_after))
+                        raise TimeoutError(
+                            f"{', '.join(waiting)} not ready "
+                            f"after {self.ready_timeout}s"
+                        )
+                time.sleep(HEALTH_CHECK_INTERVAL)
+
+    def stop(self, *_):
+        self.stopping = True
+
+    def shutdown(self):
+        """
+        Send SIGTERM to every component and SIGKILL what is left after the
+        grace period.
+        """
+        for name, process in self.processes.items():
+            if process.poll() is None:
+                print(f"Stopping {name}", flush=True)
+                os.killpg(process.pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + self.grace_period
+        for process in self.processes.values():
+            try:
+                process.wait(timeout=max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+                process.wait()
+
+
+def up(args):
+    components = airflow_components(
+        args.airflow_version or airflow_major_version(),
+        port=args.port,
+        standalone_dag_processor=args.standalone_dag_processor,
+    )
+    supervisor = Supervisor(
+        components, ready_timeout=args.ready_timeout, max_restarts=args.max_restarts
+    )
+    signal.signal(signal.SIGINT, supervisor.stop)
+    signal.signal(signal.SIGTERM, supervisor.stop)
+
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    PID_FILE.write_text(str(os.getpid()))
+    try:
+        supervisor.run()
+    finally:
+        supervisor.shutdown()
+        PID_FILE.unlink(missing_ok=True)
+
+
+def down(args):
+    try:
+        pid = int(PID_FILE.read_text())
+    except FileNotFoundError:
+        print("Airflow launcher is not running")
+        return
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except ProcessLookupError:
+        PID_FILE.unlink(missing_ok=True)
+        print("Airflow launcher is not running")
+        return
+
+    deadline = time.monotonic() + GRACE_PERIOD + 10
+    while PID_FILE.exists() and time.monotonic() < deadline:
+        time.sleep(0.5)
+    print("Airflow stopped")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    up_parser = subparsers.add_parser("up", help="start and supervise Airflow")
+    up_parser.add_argument("--port", type=int, default=8080)
+    up_parser.add_argument(
+        "--airflow-version",
+        type=int,
+        help="Airflow major version, defaults to the installed one",
+    )
+    up_parser.add_argument(
+        "--standalone-dag-processor",
+        action="store_true",
+        help="run the dag-processor on its own on Airflow 2",
+    )
+    up_parser.add_argument("--ready-timeout", type=int, default=READY_TIMEOUT)
+    up_parser.add_argument("--max-restarts", type=int, default=MAX_RESTARTS)
+    subparsers.add_parser("down", help="stop a running launcher")
+    args = parser.parse_args(argv)
+
+    if args.command == "up":
+        up(args)
+    else:
+        down(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Show the delay between a producer task finishing and its consumer starting,
+with an ``ExternalTaskSensor`` and with an asset schedule.
+
+A throwaway Airflow with a SQLite database runs three DAGs: a producer task
+updating an asset, a consumer scheduled on that asset and a consumer waiting
+on the producer task with a sensor in reschedule mode, started before the
+producer like consumers usually are. The scheduler, plus the
+API server and the DAG processor on Airflow 3, are started with the launcher
+and stopped once both consumers ran::
+
+    python -m scripts.asset_latency_demo --poke-interval 30
+"""
+
+import argparse
+import os
+import socket
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from string import Template
+
+from scripts.airflow_launcher import (
+    PROJECT_ROOT,
+    Supervisor,
+    airflow_components,
+    airflow_major_version,
+)
+
+DEMO_DAGS = Template(
+    """
+import time
+
+import pendulum
+
+from airflow.decorators import dag, task
+from airflow.sensors.external_task import ExternalTaskSensor
+from common.assets import asset
+
+START = pendulum.datetime(2024, 1, 1, tz="UTC")
+ORDERS = asset("demo.orders")
+DEFAULT_ARGS = {"owner": "airflow"}
+
+
+@dag(schedule=None, start_date=START, catchup=False, default_args=DEFAULT_ARGS)
+def demo_producer():
+    @task(outlets=[ORDERS])
+    def produce():
+        time.sleep($task_seconds)
+
+    produce()
+
+
+@dag(schedule=[ORDERS], start_date=START, catchup=False, default_args=DEFAULT_ARGS)
+def demo_asset_consumer():
+    @task
+    def consume():
+        pass
+
+    consume()
+
+
+@dag(schedule=None, start_date=START, catchup=False, default_args=DEFAULT_ARGS)
+def demo_sensor_consumer():
+    @task
+    def consume():
+        pass
+
+    ExternalTaskSensor(
+        task_id="wait_for_producer",
+        external_dag_id="demo_producer",
+        external_task_id="produce",
+        poke_interval=$poke_interval,
+        mode="reschedule",
+    ) >> consume()
+
+
+demo_producer()
+demo_asset_consumer()
+demo_sensor_consumer()
+"""
+)
+DAG_IDS = ["demo_producer", "demo_asset_consumer", "demo_sensor_consumer"]
+LOGICAL_DATE = "2024-06-01T00:00:00+00:00"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def demo_environment(home: Path) -> dict:
+    return {
+        **os.environ,
+        "AIRFLOW_HOME": str(home),
+        "AIRFLOW__CORE__DAGS_FOLDER": str(home / "dags"),
+        "AIRFLOW__DATABASE__SQL_ALCHEMY_CONN": f"sqlite:///{home / 'airflow.db'}",
+        "AIRFLOW__CORE__LOAD_EXAMPLES": "False",
+        "AIRFLOW__CORE__DAGS_ARE_PAUSED_AT_CREATION": "False",
+        "AIRFLOW__CORE__UNIT_TEST_MODE": "False",
+        "AIRFLOW__SCHEDULER__SCHEDULER_HEALTH_CHECK_SERVER_PORT": str(free_port()),
+        "PYTHONPATH": os.pathsep.join(
+            filter(
+                None,
+                [str(PROJECT_ROOT / "airflow" / "dags"), os.environ.get("PYTHONPATH")],
+            )
+        ),
+    }
+
+
+def query(database, sql):
+    with sqlite3.connect(database) as conn:
+        return conn.execute(sql).fetchall()
+
+
+def wait_for(predicate, timeout, message):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise TimeoutError(message)
+        time.sleep(1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--poke-interval", type=int, default=30)
+    parser.add_argument("--task-seconds", type=int, default=5)
+    parser.add_argument("--timeout", type=int, default=300)
+    args = parser.parse_args(argv)
+
+    major_version = airflow_major_version()
+    with tempfile.TemporaryDirectory(prefix="asset-demo-") as home:
+        home = Path(home)
+        (home / "dags").mkdir()
+        (home / "dags" / "demo_dags.py").write_text(
+            DEMO_DAGS.substitute(
+                task_seconds=args.task_seconds, poke_interval=args.poke_interval
+            )
+        )
+        env = demo_environment(home)
+        database = home / "airflow.db"
+        os.environ.update(env)
+        subprocess.run(["airflow", "db", "migrate"], check=True, capture_output=True)
+
+        components = [
+            component
+            for component in airflow_components(major_version, port=free_port())
+            if component.name not in ("webserver", "triggerer")
+        ]
+        for component in components:
+            if component.name == "scheduler":
+                port = env["AIRFLOW__SCHEDULER__SCHEDULER_HEALTH_CHECK_SERVER_PORT"]
+                component.health_url = f"http://localhost:{port}/health"
+        supervisor = Supervisor(components, log_dir=home / "logs" / "launcher")
+        try:
+            supervisor.run(until_ready=True)
+            wait_for(
+                lambda: len(query(database, "SELECT dag_id FROM dag")) == len(DAG_IDS),
+                args.timeout,
+                "the demo DAGs were not parsed",
+            )
+            date_flag = "--logical-date" if major_version >= 3 else "--exec-date"
+
+            def trigger(dag_id):
+                subprocess.run(
+                    ["airflow", "dags", "trigger", dag_id, date_flag, LOGICAL_DATE],
+                    check=True,
+                    capture_output=True,
+                )
+
+            # The producer starts once the sensor is waiting for it, like a
+            # consumer scheduled at the same time as its producer
+            trigger("demo_sensor_consumer")
+            wait_for(
+                lambda: query(
+                    database,
+                    "SELECT 1 FROM task_instance WHERE task_id = 'wait_for_producer' "
+                    "AND state = 'up_for_reschedule'",
+                ),
+                args.timeout,
+                "the sensor did not poke",
+            )
+            trigger("demo_producer")
+            finished = (
+                "SELECT dag_id, start_date, end_date FROM task_instance "
+                "WHERE task_id IN ('produce', 'consume') AND state = 'success'"
+            )
+            wait_for(
+                lambda: len(query(database, finished)) == len(DAG_IDS),
+                args.timeout,
+                f"the demo DAGs did not finish in {args.timeout}s, "
+                f"see the logs in {supervisor.log_dir}",
+            )
+            runs = {
+                dag_id: (start, end) for dag_id, start, end in query(database, finished)
+            }
+        finally:
+            supervisor.shutdown()
+
+    produced = datetime.fromisoformat(runs["demo_producer"][1])
+    print("Delay between the producer task finishing and the consumer starting:")
+    for label, dag_id in (
+        (f"sensor, {args.poke_interval}s poke interval", "demo_sensor_consumer"),
+        ("asset schedule", "demo_asset_consumer"),
+    ):
+        delay = (datetime.fromisoformat(runs[dag_id][0]) - produced).total_seconds()
+        print(f"  {label:<32} {delay:6.1f}s")
+
+
+if __name__ == "__main__":
+    main()
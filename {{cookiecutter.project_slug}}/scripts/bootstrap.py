@@ -0,0 +1,315 @@
+"""
+Build the development virtualenv from the committed lock file, cached.
+
+``requirements.lock`` pins every package of the ``airflow`` and ``test``
+extras, resolved once against the Airflow constraints of the project's
+Airflow and Python versions. Update it after changing the dependencies in
+``pyproject.toml`` and commit it::
+
+    python scripts/bootstrap.py lock
+
+``make init`` runs ``sync``: the virtualenv is built in
+``<cache>/venvs/<key>``, the key being the hash of the lock file, of the
+Python version and of the project folder, and ``.venv`` links to it. As long
+as the lock does not change the cached virtualenv is reused right away.
+Packages are installed from the wheels of ``<cache>/wheels`` without reaching
+the package index, only the wheels missing from it are downloaded or built.
+An existing virtualenv, ``VIRTUAL_ENV_PATH``, is synced in place instead.
+
+The cache is ``BOOTSTRAP_CACHE``, ``~/.cache/airflow-bootstrap`` by default,
+and keeps the last ``BOOTSTRAP_KEEP_VENVS`` virtualenvs. The time of every
+step is reported.
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+LOCK_FILE = PROJECT_ROOT / "requirements.lock"
+EXTRAS = "airflow,test"
+CACHE = Path(
+    os.environ.get(
+        "BOOTSTRAP_CACHE",
+        Path(os.environ.get("XDG_CACHE_HOME", "~/.cache")).expanduser()
+        / "airflow-bootstrap",
+    )
+)
+KEEP_VENVS = int(os.environ.get("BOOTSTRAP_KEEP_VENVS", 3))
+CONSTRAINTS_URL = (
+    "https://raw.githubusercontent.com/apache/airflow/"
+    "constraints-{airflow}/constraints-{python}.txt"
+)
+COMPLETE_MARKER = ".bootstrap-complete"
+
+
+class Steps:
+    """
+    Time the steps of a run and report them.
+    """
+
+    def __init__(self):
+        self.timings = []
+
+    def run(self, name, function, *args, **kwargs):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        self.timings.append((name, time.perf_counter() - start))
+        return result
+
+    def report(self, out=print):
+        width = max((len(name) for name, _ in self.timings), default=4)
+        out(f"{'step':<{width}} {'seconds':>8}")
+        for name, seconds in self.timings:
+            out(f"{name:<{width}} {seconds:>8.2f}")
+        total = sum(seconds for _, seconds in self.timings)
+        out(f"{'total':<{width}} {total:>8.2f}")
+
+
+def python_version() -> str:
+    return f"{sys.version_info.major}.{sys.version_info.minor}"
+
+
+def venv_python(venv) -> Path:
+    return Path(venv) / "bin" / "python"
+
+
+def airflow_version(pyproject=PROJECT_ROOT / "pyproject.toml") -> str:
+    match = re.search(r'"apache-airflow==([^"]+)"', Path(pyproject).read_text())
+    if match is None:
+        raise SystemExit(f"apache-airflow is not pinned in {pyproject}")
+    return match.group(1)
+
+
+def _normalize(name) -> str:
+    return re.sub(r"[-_.]+", "_", name).lower()
+
+
+def pins(lock_file) -> list[tuple[str, str]]:
+    """
+    Return the ``(name, version)`` pinned by the lock file.
+    """
+    pinned = []
+    for line in Path(lock_file).read_text().splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            name, _, version = line.partition("==")
+            pinned.append((name.strip(), version.split(";")[0].strip()))
+    return pinned
+
+
+def lock_key(lock_file, project_root=PROJECT_ROOT) -> str:
+    digest = hashlib.sha256(Path(lock_file).read_bytes())
+    digest.update(f"{python_version()}:{sys.platform}:{project_root}".encode())
+    return digest.hexdigest()[:16]
+
+
+def missing_wheels(lock_file, wheelhouse) -> list[str]:
+    """
+    Return the requirements of the lock file without a wheel in
+    ``wheelhouse``.
+    """
+    available = set()
+    for wheel in Path(wheelhouse).glob("*.whl"):
+        name, version = wheel.name.split("-")[:2]
+        available.add((_normalize(name), version))
+    return [
+        f"{name}=={version}"
+        for name, version in pins(lock_file)
+        if (_normalize(name), version) not in available
+    ]
+
+
+def _pip(python, *args):
+    subprocess.run([str(python), "-m", "pip", *args], check=True)
+
+
+def fill_wheelhouse(lock_file, wheelhouse) -> int:
+    """
+    Download or build the wheels of the lock file missing from ``wheelhouse``.
+    """
+    Path(wheelhouse).mkdir(parents=True, exist_ok=True)
+    missing = missing_wheels(lock_file, wheelhouse)
+    if missing:
+        _pip(
+            sys.executable, "wheel", "--quiet", "--no-deps", "-w", wheelhouse, *missing
+        )
+    return len(missing)
+
+
+def install(venv, lock_file, wheelhouse, project_root=None):
+    """
+    Install the locked packages from the wheelhouse only, then the project
+    itself without its dependencies.
+    """
+    python = venv_python(venv)
+    if pins(lock_file):
+        _pip(
+            python,
+            "install",
+            "--quiet",
+            "--no-index",
+            "--find-links",
+            str(wheelhouse),
+            "-r",
+            str(lock_file),
+        )
+    if project_root is not None:
+        _pip(python, "install", "--quiet", "--no-deps", "-e", str(project_root))
+
+
+def link(target, venv_link):
+    """
+    Point ``venv_link`` to ``target``, replacing the previous link atomically.
+    """
+    venv_link = Path(venv_link)
+    temporary = venv_link.with_name(f"{venv_link.name}.{os.getpid()}")
+    temporary.symlink_to(target, target_is_directory=True)
+    os.replace(temporary, venv_link)
+
+
+def prune(venvs, keep, current) -> list[Path]:
+    """
+    Remove the cached virtualenvs used the longest ago, but the ``keep`` last
+    and the current one.
+    """
+    complete = sorted(
+        (path for path in Path(venvs).iterdir() if (path / COMPLETE_MARKER).exists()),
+        key=lambda path: (path / COMPLETE_MARKER).stat().st_mtime,
+        reverse=True,
+    )
+    removed = [path for path in complete[keep:] if path != Path(current)]
+    for path in removed:
+        shutil.rmtree(path)
+    return removed
+
+
+def install_pre_commit(venv, project_root):
+    pre_commit = Path(venv) / "bin" / "pre-commit"
+    hook = Path(project_root) / ".git" / "hooks" / "pre-commit"
+    if pre_commit.exists() and hook.parent.is_dir() and not hook.exists():
+        subprocess.run([str(pre_commit), "install"], cwd=project_root, check=True)
+
+
+def lock(lock_file=LOCK_FILE, project_root=PROJECT_ROOT, steps=None):
+    """
+    Resolve the extras of the project against the Airflow constraints in a
+    scratch virtualenv and write the pins to the lock file.
+    """
+    steps = steps or Steps()
+    airflow = airflow_version(Path(project_root) / "pyproject.toml")
+    constraints = CONSTRAINTS_URL.format(airflow=airflow, python=python_version())
+    with tempfile.TemporaryDirectory(prefix="bootstrap-lock-") as scratch:
+        steps.run(
+            "create scratch venv",
+            subprocess.run,
+            [sys.executable, "-m", "venv", scratch],
+            check=True,
+        )
+        steps.run(
+            "resolve",
+            _pip,
+            venv_python(scratch),
+            "install",
+            "--quiet",
+            "-e",
+            f"{project_root}[{EXTRAS}]",
+            "-c",
+            constraints,
+        )
+        frozen = steps.run(
+            "freeze",
+            subprocess.run,
+            [str(venv_python(scratch)), "-m", "pip", "freeze", "--exclude-editable"],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+    Path(lock_file).write_text(
+        "# Generated by scripts/bootstrap.py lock, do not edit\n"
+        f"# extras: {EXTRAS}, python {python_version()}, constraints {constraints}\n"
+        + frozen
+    )
+    print(f"Wrote {lock_file}, commit it")
+
+
+def sync(
+    venv_link,
+    lock_file=LOCK_FILE,
+    cache=CACHE,
+    project_root=PROJECT_ROOT,
+    keep=KEEP_VENVS,
+    install_project=True,
+    steps=None,
+) -> Path:
+    """
+    Make ``venv_link`` a virtualenv with the packages of the lock file and
+    return the virtualenv.
+    """
+    steps = steps or Steps()
+    cache, venv_link = Path(cache), Path(venv_link)
+    wheelhouse = cache / "wheels"
+    editable = project_root if install_project else None
+    if not Path(lock_file).exists():
+        steps.run("lock", lock, lock_file, project_root, steps=Steps())
+
+    if venv_link.is_dir() and not venv_link.is_symlink():
+        # A virtualenv of the user, synced in place
+        steps.run("wheels", fill_wheelhouse, lock_file, wheelhouse)
+        steps.run("install", install, venv_link, lock_file, wheelhouse, editable)
+        return venv_link
+
+    key = steps.run("hash lock", lock_key, lock_file, project_root)
+    venv = cache / "venvs" / key
+    if (venv / COMPLETE_MARKER).exists():
+        steps.run("reuse cached venv", link, venv, venv_link)
+        (venv / COMPLETE_MARKER).touch()
+        return venv
+
+    # Virtualenvs are not relocatable, the venv is built where it is cached
+    shutil.rmtree(venv, ignore_errors=True)
+    steps.run("wheels", fill_wheelhouse, lock_file, wheelhouse)
+    steps.run(
+        "create venv",
+        subprocess.run,
+        [sys.executable, "-m", "venv", str(venv)],
+        check=True,
+    )
+    steps.run("install", install, venv, lock_file, wheelhouse, editable)
+    steps.run("pre-commit", install_pre_commit, venv, project_root)
+    (venv / COMPLETE_MARKER).touch()
+    steps.run("link", link, venv, venv_link)
+    steps.run("prune", prune, venv.parent, keep, venv)
+    return venv
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("lock", help="resolve the dependencies into the lock file")
+    sync_parser = subparsers.add_parser("sync", help="build or reuse the virtualenv")
+    sync_parser.add_argument(
+        "--venv",
+        default=os.environ.get("VIRTUAL_ENV_PATH") or PROJECT_ROOT / ".venv",
+        help="virtualenv to sync, a link to the cached one unless it exists",
+    )
+    args = parser.parse_args(argv)
+
+    steps = Steps()
+    if args.command == "lock":
+        lock(steps=steps)
+    else:
+        venv = sync(args.venv, steps=steps)
+        print(f"{args.venv} -> {venv}")
+    steps.report()
+
+
+if __name__ == "__main__":
+    main()
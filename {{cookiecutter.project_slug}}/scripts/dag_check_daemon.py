@@ -0,0 +1,301 @@
+"""
+Warm DAG import checks for pre-commit.
+
+Importing Airflow takes seconds, so checking that a DAG imports on every
+commit is slow. The daemon imports Airflow and the project's common modules
+once, listens on a Unix socket and parses every requested DAG file in a
+forked child, so each check starts from the warm interpreter and nothing a
+DAG file does leaks into the next check.
+
+The ``check`` client starts the daemon on first use::
+
+    python scripts/dag_check_daemon.py check airflow/dags/maintainance/canary.py
+    python scripts/dag_check_daemon.py stop
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DAGS_FOLDER = PROJECT_ROOT / "airflow" / "dags"
+# Packages under the DAG folder imported up front so DAG files share them warm.
+PRELOAD_PACKAGES = ("common",)
+IDLE_TIMEOUT = 30 * 60
+START_TIMEOUT = 120
+
+
+def default_socket_path():
+    """
+    Return a socket path unique to this project checkout.
+    """
+    digest = hashlib.sha1(str(PROJECT_ROOT).encode()).hexdigest()[:12]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR", tempfile.gettempdir())
+    return str(Path(runtime_dir) / f"dag-check-{digest}.sock")
+
+
+def send(sock_path, request, timeout=None):
+    """
+    Send a request to the daemon and return its decoded response.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(timeout)
+        client.connect(sock_path)
+        client.sendall(json.dumps(request).encode() + b"\n")
+        with client.makefile("rb") as stream:
+            return json.loads(stream.readline())
+
+
+class DagCheckDaemon:
+    """
+    Keep Airflow imported and check DAG files in forked children.
+    """
+
+    def __init__(self, sock_path, dags_folder=DAGS_FOLDER, idle_timeout=IDLE_TIMEOUT):
+        self.sock_path = sock_path
+        self.dags_folder = Path(dags_folder).resolve()
+        self.idle_timeout = idle_timeout
+        self.module_mtimes = {}
+
+    def preload(self):
+        """
+        Import Airflow and the project's common modules.
+        """
+        if str(self.dags_folder) not in sys.path:
+            sys.path.insert(0, str(self.dags_folder))
+
+        import airflow.decorators  # noqa: F401
+        import airflow.models  # noqa: F401
+        import airflow.operators.bash  # noqa: F401
+        import airflow.operators.python  # noqa: F401
+
+        for package in PRELOAD_PACKAGES:
+            package_dir = self.dags_folder / package
+            for path in sorted(package_dir.rglob("*.py")):
+                parts = path.relative_to(self.dags_folder).with_suffix("").parts
+                if parts[-1] == "__init__":
+                    parts = parts[:-1]
+                try:
+                    importlib.import_module(".".join(parts))
+                except Exception as e:
+                    # The DAG files importing it report the error on check.
+                    print(f"Could not preload {path}: {e}", file=sys.stderr)
+        self.module_mtimes = self.project_module_mtimes()
+
+    def project_module_mtimes(self):
+        """
+        Return the modification time of every imported module of the project.
+        """
+        mtimes = {}
+        for name, module in list(sys.modules.items()):
+            path = getattr(module, "__file__", None)
+            if path and Path(path).resolve().is_relative_to(self.dags_folder):
+                try:
+                    mtimes[name] = os.stat(path).st_mtime
+                except OSError:
+                    mtimes[name] = None
+        return mtimes
+
+    def stale_modules(self):
+        """
+        Return the preloaded modules whose source changed since they were imported.
+        """
+        current = self.project_module_mtimes()
+        return [
+            name
+            for name, mtime in self.module_mtimes.items()
+            if current.get(name) != mtime
+        ]
+
+    def evict(self, names):
+        """
+        Drop every project module once one of ``names`` is stale: a preloaded
+        module importing a stale one holds on to its old names, e.g. through
+        ``from common.names import DAG_ID``, so it is re-imported too.
+        """
+        if not names:
+            return
+        for name in self.project_module_mtimes():
+            sys.modules.pop(name, None)
+
+    def check_file(self, path, write_fd):
+        """
+        Parse one DAG file; runs in the forked child.
+        """
+        from airflow.models import DagBag
+
+        self.evict(self.stale_modules())
+        dag_bag = DagBag(dag_folder=path, include_examples=False)
+        result = {
+            "dag_ids": sorted(dag_bag.dag_ids),
+            "errors": {str(k): str(v) for k, v in dag_bag.import_errors.items()},
+        }
+        with os.fdopen(write_fd, "wb") as stream:
+            stream.write(json.dumps(result).encode())
+
+    def check(self, files):
+        """
+        Check every file in its own forked child and collect the results.
+        """
+        children = {}
+        for path in files:
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                os.close(read_fd)
+                try:
+                    self.check_file(path, write_fd)
+                except BaseException as e:
+                    result = {"dag_ids": [], "errors": {path: repr(e)}}
+                    os.write(write_fd, json.dumps(result).encode())
+                finally:
+                    os._exit(0)
+            os.close(write_fd)
+            children[path] = (pid, read_fd)
+
+        results = {}
+        for path, (pid, read_fd) in children.items():
+            with os.fdopen(read_fd, "rb") as stream:
+                payload = stream.read()
+            os.waitpid(pid, 0)
+            results[path] = (
+                json.loads(payload)
+                if payload
+                else {"dag_ids": [], "errors": {path: "checker exited unexpectedly"}}
+            )
+        return results
+
+    def refresh(self):
+        """
+        Re-import changed project modules so the next check starts warm again.
+        """
+        stale = self.stale_modules()
+        if stale:
+            self.evict(stale)
+            self.preload()
+
+    def handle(self, connection):
+        with connection, connection.makefile("rb") as stream:
+            request = json.loads(stream.readline())
+            if request.get("command") == "stop":
+                connection.sendall(b'{"stopped": true}\n')
+                return False
+
+            start = time.perf_counter()
+            results = self.check(request.get("files", []))
+            response = {"results": results, "duration": time.perf_counter() - start}
+            connection.sendall(json.dumps(response).encode() + b"\n")
+        self.refresh()
+        return True
+
+    def serve(self):
+        self.preload()
+        if os.path.exists(self.sock_path):
+            os.unlink(self.sock_path)
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            server.bind(self.sock_path)
+            server.listen()
+            server.settimeout(self.idle_timeout)
+            try:
+                while True:
+                    try:
+                        connection, _ = server.accept()
+                    except TimeoutError:
+                        break
+                    connection.settimeout(None)
+                    if not self.handle(connection):
+                        break
+            finally:
+                os.unlink(self.sock_path)
+
+
+def start_daemon(sock_path, dags_folder):
+    """
+    Start the daemon in the background and wait until it accepts checks.
+    """
+    log_path = Path(sock_path).with_suffix(".log")
+    subprocess.Popen(
+        [
+            sys.executable,
+            __file__,
+            "--socket",
+            sock_path,
+            "--dags-folder",
+            str(dags_folder),
+            "serve",
+        ],
+        cwd=PROJECT_ROOT,
+        stdin=subprocess.DEVNULL,
+        stdout=log_path.open("ab"),
+        stderr=subprocess.STDOUT,
+        start_new_session=True,
+    )
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        if os.path.exists(sock_path):
+            try:
+                return send(sock_path, {"files": []})
+            except OSError:
+                pass
+        time.sleep(0.1)
+    raise TimeoutError(
+        f"DAG check daemon did not start within {START_TIMEOUT}s, see {log_path}"
+    )
+
+
+def run_check(sock_path, dags_folder, files):
+    """
+    Ask the daemon to check the given files, starting it if needed.
+    """
+    files = [str(Path(f).resolve()) for f in files if f.endswith(".py")]
+    try:
+        response = send(sock_path, {"files": files})
+    except (FileNotFoundError, ConnectionRefusedError):
+        start_daemon(sock_path, dags_folder)
+        response = send(sock_path, {"files": files})
+
+    failed = False
+    for path, result in response["results"].items():
+        for error_path, error in result["errors"].items():
+            failed = True
+            print(f"{os.path.relpath(error_path)}:\n{error}", file=sys.stderr)
+        if result["dag_ids"]:
+            print(f"{os.path.relpath(path)}: {', '.join(result['dag_ids'])}")
+    print(f"Checked {len(files)} DAG files in {response['duration']:.2f}s")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--socket", default=default_socket_path())
+    parser.add_argument("--dags-folder", default=str(DAGS_FOLDER))
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("serve", help="run the daemon in the foreground")
+    subparsers.add_parser("stop", help="stop a running daemon")
+    check = subparsers.add_parser("check", help="check that DAG files import")
+    check.add_argument("files", nargs="*")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        DagCheckDaemon(args.socket, args.dags_folder).serve()
+    elif args.command == "stop":
+        try:
+            send(args.socket, {"command": "stop"})
+        except (FileNotFoundError, ConnectionRefusedError):
+            print("DAG check daemon is not running")
+    else:
+        return run_check(args.socket, args.dags_folder, args.files)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+Compare an incremental load to a full reload of a table once a share of its
+rows changed.
+
+A source table of ``--rows`` orders is created and loaded once into two target
+tables. Then ``--change-rate`` of the orders are updated, as many new ones
+inserted, and a tenth of the updates written with a timestamp before the
+watermark, like late-arriving rows. One target is reloaded in full, the other
+loaded incrementally with ``common.incremental``, and both are checked against
+the source.
+
+Postgres only, run it in a container of the compose stack to use its
+database::
+
+    docker compose run --rm -v "$PWD/scripts:/opt/airflow/scripts:ro" \\
+        airflow-cli python /opt/airflow/scripts/elt_benchmark.py --rows 10000000
+"""
+
+import argparse
+import dataclasses
+import time
+from datetime import timedelta
+
+from sqlalchemy import MetaData, Table, create_engine, text
+
+from common.incremental import (
+    IncrementalSource,
+    elt_watermark,
+    load_increment,
+    read_changes,
+    target_table,
+    watermark_metadata,
+)
+
+SOURCE = IncrementalSource(
+    name="elt_benchmark",
+    source_table="elt_benchmark_orders",
+    target_table="elt_benchmark_incremental",
+    key=("order_id",),
+    cursor="updated_at",
+    lookback=timedelta(minutes=15),
+)
+FULL_TARGET = "elt_benchmark_full"
+
+
+def create_source(engine, rows):
+    """
+    Create the source table with ``rows`` orders updated over the last 30 days.
+    """
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                f"CREATE TABLE {SOURCE.source_table} ("
+                "order_id bigint PRIMARY KEY, customer_id integer NOT NULL, "
+                "status text NOT NULL, amount numeric(12, 2) NOT NULL, "
+                "updated_at timestamptz NOT NULL)"
+            )
+        )
+        conn.execute(
+            text(
+                f"INSERT INTO {SOURCE.source_table} "
+                "SELECT g, g % 100000, 'new', (g % 10000) / 100.0, "
+                "now() - interval '1 hour' - interval '30 days' * (:rows - g) / :rows "
+                "FROM generate_series(1, :rows) AS g"
+            ),
+            {"rows": rows},
+        )
+        # The incremental reads range scan the cursor
+        conn.execute(
+            text(
+                f"CREATE INDEX {SOURCE.source_table}_updated_at "
+                f"ON {SOURCE.source_table} (updated_at, order_id)"
+            )
+        )
+        conn.execute(text(f"ANALYZE {SOURCE.source_table}"))
+
+
+def change_source(engine, rows, change_rate):
+    """
+    Update and insert ``change_rate`` of ``rows`` orders, a tenth of the
+    updates with a timestamp 5 minutes before the latest one.
+    """
+    every = max(1, round(1 / change_rate))
+    with engine.begin() as conn:
+        latest = conn.execute(
+            text(f"SELECT max(updated_at) FROM {SOURCE.source_table}")
+        ).scalar()
+        conn.execute(
+            text(
+                f"UPDATE {SOURCE.source_table} SET status = 'paid', "
+                "updated_at = CASE WHEN order_id % (:every * 10) = 0 "
+                "THEN :late ELSE now() END WHERE order_id % :every = 0"
+            ),
+            {"every": every, "late": latest - timedelta(minutes=5)},
+        )
+        conn.execute(
+            text(
+                f"INSERT INTO {SOURCE.source_table} "
+                "SELECT g, g % 100000, 'new', (g % 10000) / 100.0, now() "
+                "FROM generate_series(:first, :last) AS g"
+            ),
+            {"first": rows + 1, "last": rows + rows // every},
+        )
+
+
+def full_reload(engine, source) -> int:
+    """
+    Replace the target table with all the rows of the source, in a single
+    transaction so that readers never see it empty.
+    """
+    table = Table(source.source_table, MetaData(), autoload_with=engine)
+    target = target_table(engine, table, source)
+    loaded = 0
+    with engine.connect() as read, engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {target}"))
+        until = read.execute(text(f"SELECT max(updated_at) FROM {table}")).scalar()
+        for rows in read_changes(read, table, source, None, until):
+            conn.execute(target.insert(), rows)
+            loaded += len(rows)
+    return loaded
+
+
+def differences(engine, target) -> int:
+    with engine.connect() as conn:
+        return conn.execute(
+            text(
+                f"SELECT count(*) FROM (SELECT * FROM {SOURCE.source_table} "
+                f"EXCEPT SELECT * FROM {target}) AS missing"
+            )
+        ).scalar()
+
+
+def drop_tables(engine):
+    watermark_metadata.create_all(engine, checkfirst=True)
+    with engine.begin() as conn:
+        for table in (SOURCE.source_table, SOURCE.target_table, FULL_TARGET):
+            conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        conn.execute(
+            elt_watermark.delete().where(elt_watermark.c.source == SOURCE.name)
+        )
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--conn", help="defaults to database.sql_alchemy_conn")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--change-rate", type=float, default=0.01)
+    parser.add_argument("--keep", action="store_true", help="keep the tables")
+    args = parser.parse_args(argv)
+
+    url = args.conn
+    if url is None:
+        from airflow.configuration import conf
+
+        url = conf.get("database", "sql_alchemy_conn")
+    engine = create_engine(url)
+    if engine.dialect.name != "postgresql":
+        raise SystemExit(f"{engine.url!r} is not a Postgres database")
+    full = dataclasses.replace(SOURCE, target_table=FULL_TARGET)
+
+    drop_tables(engine)
+    try:
+        _, seconds = _timed(create_source, engine, args.rows)
+        print(f"Created {args.rows:,} source rows in {seconds:.1f}s")
+        full_reload(engine, full)
+        load_increment(engine, engine, SOURCE)
+        change_source(engine, args.rows, args.change_rate)
+
+        print(f"{'load':<12} {'seconds':>9} {'rows moved':>12} {'differences':>12}")
+        for name, (moved, seconds), target in (
+            ("full", _timed(full_reload, engine, full), FULL_TARGET),
+            (
+                "incremental",
+                _timed(lambda: load_increment(engine, engine, SOURCE)["rows_loaded"]),
+                SOURCE.target_table,
+            ),
+        ):
+            print(
+                f"{name:<12} {seconds:>9,.1f} {moved:>12,} "
+                f"{differences(engine, target):>12,}"
+            )
+    finally:
+        if not args.keep:
+            drop_tables(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+-- SAMPLE SOURCE OF THE incremental_loads DAG
+-- Creates the elt database, apart from the airflow one, with an orders table
+-- the DAG loads into stg_orders of the same database.
+-- The postgres container of docker-compose.local.yml runs it when its volume is
+-- created, on your own postgres instance run it with psql
+-- e.g psql < elt_sample.sql
+
+CREATE DATABASE elt;
+
+\connect elt
+
+CREATE TABLE orders (
+    order_id integer PRIMARY KEY,
+    customer_id integer NOT NULL,
+    order_date date NOT NULL,
+    status varchar(20) NOT NULL,
+    amount numeric(10, 2) NOT NULL,
+    updated_at timestamp with time zone NOT NULL DEFAULT now()
+);
+
+-- The cursor of the incremental loads, bump it with the rows
+CREATE INDEX orders_updated_at ON orders (updated_at, order_id);
+
+INSERT INTO orders (order_id, customer_id, order_date, status, amount, updated_at)
+SELECT
+    n,
+    1 + n % 100,
+    current_date - n % 365,
+    (ARRAY['placed', 'shipped', 'completed', 'returned'])[1 + n % 4],
+    round((10 + random() * 490)::numeric, 2),
+    now() - (n % 365) * interval '1 day'
+FROM generate_series(1, 1000) AS n;
@@ -0,0 +1,219 @@
+"""
+Compare sequential blocking requests to ``common.http_ingestion`` on a local
+stand-in API.
+
+The stand-in serves ``--records`` records on ``/items``, paginated with a
+cursor or with offsets, after ``--latency`` milliseconds like a remote API,
+and answers 429 once more than ``--max-in-flight`` requests are in flight
+like a rate limited one. The same pages are fetched one request after the
+other with ``requests``, then concurrently with ``ingest``::
+
+    PYTHONPATH=airflow/dags python scripts/http_ingestion_benchmark.py \\
+        --records 20000 --latency 50 --max-in-flight 24
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from common.http_ingestion import CursorPagination, OffsetPagination, ingest
+
+
+class StandInServer:
+    """
+    Paginated JSON API served from a background thread, usable as a context
+    manager.
+
+    :param records: records of each endpoint.
+    :param latency: seconds before each response.
+    :param max_in_flight: requests in flight above which the server answers 429.
+    :param cut_every: every how many requests a response is cut mid-body.
+    """
+
+    def __init__(self, records=1000, latency=0.01, max_in_flight=None, cut_every=None):
+        self.records = records
+        self.latency = latency
+        self.max_in_flight = max_in_flight
+        self.cut_every = cut_every
+        self.cut = 0
+        self.paths = set()
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self.url = None
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def _page(self, query):
+        limit = int(query.get("limit", 100))
+        if "offset" in query:
+            start = int(query["offset"])
+            next_cursor = None
+        else:
+            start = int(query.get("cursor", 0))
+            end = start + limit
+            next_cursor = str(end) if end < self.records else None
+        items = [
+            {"id": i, "name": f"item {i}", "price": i % 1000 / 10}
+            for i in range(start, min(start + limit, self.records))
+        ]
+        return {"data": items, "next": next_cursor}
+
+    async def _items(self, request):
+        from aiohttp import web
+
+        self.requests += 1
+        self.paths.add(request.path)
+        self.in_flight += 1
+        try:
+            if self.max_in_flight and self.in_flight > self.max_in_flight:
+                self.throttled += 1
+                return web.json_response({"error": "rate limited"}, status=429)
+            await asyncio.sleep(self.latency)
+            if self.cut_every and self.requests % self.cut_every == 0:
+                return await self._cut(request)
+            return web.json_response(self._page(request.query))
+        finally:
+            self.in_flight -= 1
+
+    async def _cut(self, request):
+        from aiohttp import web
+
+        self.cut += 1
+        body = json.dumps(self._page(request.query)).encode()
+        response = web.StreamResponse(headers={"Content-Type": "application/json"})
+        response.content_length = len(body)
+        await response.prepare(request)
+        await response.write(body[: len(body) // 2])
+        request.transport.close()
+        return response
+
+    def _serve(self):
+        from aiohttp import web
+
+        asyncio.set_event_loop(self._loop)
+        app = web.Application()
+        # Endpoints under any base path
+        app.router.add_get("/{path:.*}", self._items)
+        self._runner = web.AppRunner(app, access_log=None)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        self._loop.run_until_complete(site.start())
+        port = self._runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}"
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(self._runner.cleanup())
+        self._loop.close()
+
+    def __enter__(self):
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def __exit__(self, *exc):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+def sequential(base_url, endpoints, page_size, output_dir) -> dict:
+    """
+    Fetch the cursor pages of ``endpoints`` one request after the other on a
+    keep-alive ``requests`` session.
+    """
+    import requests
+
+    start = time.perf_counter()
+    requests_made = pages = 0
+    with requests.Session() as session:
+        for endpoint in endpoints:
+            cursor = None
+            for page in itertools.count():
+                params = {"limit": page_size}
+                if cursor is not None:
+                    params["cursor"] = cursor
+                while True:
+                    requests_made += 1
+                    response = session.get(f"{base_url}{endpoint}", params=params)
+                    if response.status_code != 429:
+                        break
+                    time.sleep(0.05)
+                response.raise_for_status()
+                path = Path(output_dir) / endpoint.strip("/") / f"{page:06d}.json"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(response.content)
+                pages += 1
+                cursor = json.loads(response.content)["next"]
+                if cursor is None:
+                    break
+    seconds = time.perf_counter() - start
+    return {
+        "requests": requests_made,
+        "pages": pages,
+        "seconds": seconds,
+        "requests_per_second": requests_made / seconds,
+    }
+
+
+def measure(server, endpoints, page_size, max_concurrency=32) -> dict:
+    """
+    Return the reports of the sequential fetch and of the concurrent ones of
+    the pages of ``endpoints``.
+    """
+    reports = {}
+    with tempfile.TemporaryDirectory(prefix="http-benchmark-") as output_dir:
+        reports["sequential"] = sequential(
+            server.url, endpoints, page_size, Path(output_dir) / "sequential"
+        )
+        for name, pagination in (
+            ("cursor", CursorPagination()),
+            ("offset", OffsetPagination(page_size=page_size)),
+        ):
+            reports[name] = asyncio.run(
+                ingest(
+                    server.url,
+                    endpoints,
+                    Path(output_dir) / name,
+                    pagination=pagination,
+                    params={"limit": page_size},
+                    max_concurrency=max_concurrency,
+                )
+            )
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--endpoints", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=50, help="milliseconds")
+    parser.add_argument("--max-in-flight", type=int, default=24)
+    parser.add_argument("--max-concurrency", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    endpoints = [f"/items{i}" for i in range(args.endpoints)]
+    with StandInServer(args.records, args.latency / 1000, args.max_in_flight) as server:
+        reports = measure(server, endpoints, args.page_size, args.max_concurrency)
+
+    print(
+        f"{'fetch':<12} {'requests':>9} {'pages':>7} {'seconds':>8} "
+        f"{'requests/s':>11} {'concurrency':>12}"
+    )
+    for name, report in reports.items():
+        print(
+            f"{name:<12} {report['requests']:>9,} {report['pages']:>7,} "
+            f"{report['seconds']:>8.2f} {report['requests_per_second']:>11,.1f} "
+            f"{report.get('concurrency', 1):>12}"
+        )
+    print(f"The stand-in answered 429 to {server.throttled:,} requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Compare task log write and read latency on the logs folder and on the remote
+log bucket.
+
+Logs are written the way tasks write them, one flushed line per record:
+
+* folder: straight into the logs folder, the bind mount shared by the compose
+  services, and read back from it like the API server does,
+* remote: into a scratch folder of the local disk, uploaded to the bucket and
+  deleted once the log is closed, then read back from the bucket.
+
+Run it in a worker container to measure the compose setup::
+
+    docker compose --profile remote-logging run --rm \\
+        -v "$PWD/scripts:/opt/airflow/scripts:ro" airflow-cli \\
+        python /opt/airflow/scripts/log_latency_benchmark.py \\
+        --folder /opt/airflow/logs/benchmark --remote s3://airflow-logs/benchmark
+"""
+
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+LINE = "[2024-01-01T00:00:00.000+0000] {taskinstance.py:1} INFO - " + "x" * 80 + "\n"
+
+
+class FolderStore:
+    """
+    Task logs in a folder.
+    """
+
+    def __init__(self, folder):
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+    def write(self, key, lines):
+        path = self.folder / key
+        with open(path, "w") as f:
+            for _ in range(lines):
+                f.write(LINE)
+                f.flush()
+
+    def read(self, key) -> str:
+        return (self.folder / key).read_text()
+
+    def delete(self, keys):
+        for key in keys:
+            (self.folder / key).unlink(missing_ok=True)
+
+
+class RemoteStore:
+    """
+    Task logs uploaded to an S3 compatible bucket once written.
+    """
+
+    def __init__(self, location, conn_id=None):
+        from common.remote_logging import log_location, s3_hook
+
+        self.bucket, self.prefix = log_location(location)
+        self.hook = s3_hook(conn_id)
+        self.scratch = FolderStore(tempfile.mkdtemp(prefix="log-benchmark-"))
+
+    def _key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def write(self, key, lines):
+        self.scratch.write(key, lines)
+        path = self.scratch.folder / key
+        self.hook.load_file(str(path), self._key(key), self.bucket, replace=True)
+        path.unlink()
+
+    def read(self, key) -> str:
+        return self.hook.read_key(self._key(key), self.bucket)
+
+    def delete(self, keys):
+        self.hook.delete_objects(self.bucket, [self._key(key) for key in keys])
+        shutil.rmtree(self.scratch.folder, ignore_errors=True)
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def _summary(latencies, elapsed) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(1000 * statistics.median(latencies), 2),
+        "p95_ms": round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 2),
+    }
+
+
+def measure(store, logs=200, lines=500, concurrency=8) -> dict:
+    """
+    Write then read ``logs`` logs of ``lines`` lines from ``concurrency``
+    threads, like as many tasks and log viewers.
+    """
+    keys = [f"{uuid.uuid4().hex}.log" for _ in range(logs)]
+    report = {}
+    try:
+        with ThreadPoolExecutor(concurrency) as pool:
+            start = time.perf_counter()
+            writes = list(pool.map(lambda key: _timed(store.write, key, lines), keys))
+            report["write"] = _summary(writes, time.perf_counter() - start)
+
+            start = time.perf_counter()
+            reads = list(pool.map(lambda key: _timed(store.read, key), keys))
+            report["read"] = _summary(reads, time.perf_counter() - start)
+    finally:
+        store.delete(keys)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--folder", default="logs/benchmark")
+    parser.add_argument("--remote", help="s3://bucket/prefix to compare with")
+    parser.add_argument("--conn-id", help="defaults to logging.remote_log_conn_id")
+    parser.add_argument("--logs", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    stores = {"folder": FolderStore(args.folder)}
+    if args.remote:
+        stores["remote"] = RemoteStore(args.remote, args.conn_id)
+    print(f"{'store':<8} {'op':<6} {'logs/s':>9} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+    for name, store in stores.items():
+        report = measure(store, args.logs, args.lines, args.concurrency)
+        for op, stats in report.items():
+            print(
+                f"{name:<8} {op:<6} {stats['per_second']:>9,.1f} "
+                f"{stats['p50_ms']:>10,.2f} {stats['p95_ms']:>10,.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,621 @@
+"""
+Load synthetic run history into a Postgres metadata database and replay the
+scheduler's and the UI's hot queries against it.
+
+``seed`` bulk loads DAGs, DAG runs and task instances with ``COPY``, the way
+years of history would look: mostly successful runs, a few failed ones and the
+latest run of some DAGs still running. ``replay`` runs every hot query
+``--repeat`` times, prints its latencies and what its ``EXPLAIN ANALYZE`` plan
+got wrong, and writes the indexes worth adding to an SQL file that
+``setup.sql`` applies::
+
+    python scripts/metadata_db_benchmark.py seed --dags 1000 --runs 2000 --tasks 20
+    python scripts/metadata_db_benchmark.py replay --output scripts/metadata_indexes.sql
+    psql -U postgres -v indexes=scripts/metadata_indexes.sql < scripts/setup.sql
+    python scripts/metadata_db_benchmark.py clean
+
+The rows are written to the ``airflow`` database of ``setup.sql`` by default,
+run it on a local database only. Seeded DAG ids start with ``bench_``.
+"""
+
+import argparse
+import io
+import json
+import random
+import statistics
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+
+SEED_PREFIX = "bench_"
+COPY_BATCH_ROWS = 50_000
+# Rows a sequential scan or a filter can go through before it is reported
+SCAN_ROWS = 10_000
+# Task instances above which old history should be deleted
+RETENTION_ROWS = 10_000_000
+SCHEDULES = [
+    ("@hourly", timedelta(hours=1)),
+    ("@daily", timedelta(days=1)),
+    ("*/15 * * * *", timedelta(minutes=15)),
+]
+TABLES = ["dag", "dag_run", "task_instance"]
+
+
+@dataclass(frozen=True)
+class Index:
+    """
+    An index a hot query could use.
+    """
+
+    table: str
+    columns: tuple[str, ...]
+    where: str | None = None
+
+    @property
+    def name(self) -> str:
+        name = f"idx_{self.table}_{'_'.join(self.columns)}"
+        return f"{name}_partial" if self.where else name
+
+    def create_sql(self) -> str:
+        where = f" WHERE {self.where}" if self.where else ""
+        return (
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {self.name} "
+            f"ON {self.table} ({', '.join(self.columns)}){where};"
+        )
+
+
+@dataclass(frozen=True)
+class HotQuery:
+    name: str
+    component: str
+    sql: str
+    indexes: tuple[Index, ...] = ()
+
+
+def hot_queries(date_column="execution_date") -> list[HotQuery]:
+    """
+    Return the queries the scheduler and the UI run the most, as of Airflow 2.10,
+    with the run date column of the installed version.
+    """
+    date = date_column
+    return [
+        HotQuery(
+            "running_dag_runs",
+            "scheduler",
+            "SELECT dag_run.* FROM dag_run JOIN dag ON dag.dag_id = dag_run.dag_id "
+            "WHERE dag_run.state = 'running' AND dag_run.run_type != 'backfill' "
+            "AND NOT dag.is_paused "
+            f"ORDER BY dag_run.last_scheduling_decision NULLS FIRST, dag_run.{date} "
+            "LIMIT 20 FOR UPDATE OF dag_run SKIP LOCKED",
+        ),
+        HotQuery(
+            "queued_dag_runs",
+            "scheduler",
+            "SELECT dag_run.* FROM dag_run JOIN dag ON dag.dag_id = dag_run.dag_id "
+            "WHERE dag_run.state = 'queued' AND NOT dag.is_paused "
+            f"ORDER BY dag_run.{date} LIMIT 20 FOR UPDATE OF dag_run SKIP LOCKED",
+        ),
+        HotQuery(
+            "active_runs_per_dag",
+            "scheduler",
+            "SELECT dag_id, count(*) FROM dag_run "
+            "WHERE state IN ('running', 'queued') GROUP BY dag_id",
+        ),
+        HotQuery(
+            "executable_task_instances",
+            "scheduler",
+            "SELECT ti.* FROM task_instance ti "
+            "JOIN dag_run dr ON dr.dag_id = ti.dag_id AND dr.run_id = ti.run_id "
+            "JOIN dag ON dag.dag_id = ti.dag_id "
+            "WHERE ti.state = 'scheduled' AND dr.state = 'running' "
+            "AND NOT dag.is_paused "
+            f"ORDER BY ti.priority_weight DESC, dr.{date}, ti.map_index LIMIT 32",
+            (Index("task_instance", ("priority_weight",), "state = 'scheduled'"),),
+        ),
+        HotQuery(
+            "pool_slots",
+            "scheduler",
+            "SELECT pool, state, sum(pool_slots) FROM task_instance "
+            "WHERE state IN ('queued', 'running', 'deferred') GROUP BY pool, state",
+        ),
+        HotQuery(
+            "dag_run_stats",
+            "ui",
+            "SELECT dag_id, state, count(*) FROM dag_run GROUP BY dag_id, state",
+        ),
+        HotQuery(
+            "last_dag_runs",
+            "ui",
+            f"SELECT dag_id, max({date}) FROM dag_run GROUP BY dag_id",
+            (Index("dag_run", ("dag_id", date)),),
+        ),
+        HotQuery(
+            "grid_dag_runs",
+            "ui",
+            f"SELECT * FROM dag_run WHERE dag_id = :dag_id ORDER BY {date} DESC "
+            "LIMIT 25",
+            (Index("dag_run", ("dag_id", date)),),
+        ),
+        HotQuery(
+            "grid_task_instances",
+            "ui",
+            "SELECT task_id, run_id, state, start_date, end_date FROM task_instance "
+            "WHERE dag_id = :dag_id AND run_id IN (SELECT run_id FROM dag_run "
+            f"WHERE dag_id = :dag_id ORDER BY {date} DESC LIMIT 25)",
+        ),
+        HotQuery(
+            "task_duration_chart",
+            "ui",
+            "SELECT run_id, duration FROM task_instance "
+            "WHERE dag_id = :dag_id AND task_id = :task_id AND state = 'success' "
+            "ORDER BY start_date DESC LIMIT 100",
+            (Index("task_instance", ("dag_id", "task_id", "start_date")),),
+        ),
+        HotQuery(
+            "failed_task_instances",
+            "ui",
+            "SELECT * FROM task_instance WHERE state = 'failed' "
+            "ORDER BY end_date DESC LIMIT 25",
+            (Index("task_instance", ("state", "end_date")),),
+        ),
+        HotQuery(
+            "task_duration_batch",
+            "maintenance",
+            "SELECT dag_id, task_id, end_date, duration FROM task_instance "
+            "WHERE state = 'success' AND end_date > :since "
+            "ORDER BY end_date LIMIT 10000",
+            (Index("task_instance", ("state", "end_date")),),
+        ),
+    ]
+
+
+def history(dags, runs, tasks, now=None, seed=0):
+    """
+    Yield ``(table, row)`` pairs of ``dags`` DAGs with ``runs`` runs of ``tasks``
+    chained tasks each, every DAG run after its DAG and before its task
+    instances. The latest run of one DAG in 20 is running.
+    """
+    rng = random.Random(seed)
+    now = (now or datetime.now(UTC)).replace(minute=0, second=0, microsecond=0)
+    for d in range(dags):
+        dag_id = f"{SEED_PREFIX}{d:05d}"
+        schedule, interval = SCHEDULES[d % len(SCHEDULES)]
+        yield (
+            "dag",
+            {
+                "dag_id": dag_id,
+                "is_paused": d % 10 == 9,
+                "is_active": True,
+                "is_subdag": False,
+                "fileloc": f"/opt/airflow/dags/{dag_id}.py",
+                "owners": "airflow",
+                "timetable_description": schedule,
+                "max_active_tasks": 16,
+                "max_active_runs": 16,
+                "max_consecutive_failed_dag_runs": 0,
+                "has_task_concurrency_limits": False,
+                "has_import_errors": False,
+                "last_parsed_time": now,
+                "next_dagrun": now,
+                "next_dagrun_create_after": now + interval,
+            },
+        )
+        durations = [rng.lognormvariate(3, 1) for _ in range(tasks)]
+        for r in range(runs):
+            interval_start = now - (runs - r + 1) * interval
+            if r == runs - 1 and d % 20 == 0:
+                state, stop = "running", tasks // 2
+            elif rng.random() < 0.03:
+                state, stop = "failed", rng.randrange(tasks)
+            else:
+                state, stop = "success", tasks
+            run_id = f"scheduled__{interval_start.isoformat()}"
+            queued = interval_start + interval
+            start = end = queued + timedelta(seconds=2)
+            task_instances = []
+            for t in range(tasks):
+                row = {
+                    "dag_id": dag_id,
+                    "task_id": f"task_{t:03d}",
+                    "task_display_name": f"task_{t:03d}",
+                    "run_id": run_id,
+                    "map_index": -1,
+                    "try_number": 1,
+                    "max_tries": 0,
+                    "unixname": "airflow",
+                    "pool": "default_pool",
+                    "pool_slots": 1,
+                    "queue": "default",
+                    "priority_weight": tasks - t,
+                    "operator": "_PythonDecoratedOperator",
+                    "custom_operator_name": "@task",
+                    "updated_at": end,
+                }
+                if t < stop or (t == stop and state == "running"):
+                    duration = durations[t] * rng.lognormvariate(0, 0.25)
+                    row.update(
+                        state="success" if t < stop else "running",
+                        queued_dttm=end,
+                        start_date=end + timedelta(seconds=1),
+                        hostname=f"worker-{rng.randrange(4)}",
+                    )
+                    if t < stop:
+                        end = row["start_date"] + timedelta(seconds=duration)
+                        row.update(end_date=end, duration=duration, updated_at=end)
+                elif state == "failed":
+                    row["state"] = "failed" if t == stop else "upstream_failed"
+                    if t == stop:
+                        row.update(start_date=end, end_date=end, duration=0.0)
+                elif t == stop + 1:
+                    row["state"] = "scheduled"
+                task_instances.append(row)
+            yield (
+                "dag_run",
+                {
+                    "dag_id": dag_id,
+                    "run_id": run_id,
+                    "run_type": "scheduled",
+                    "state": state,
+                    "execution_date": interval_start,
+                    "logical_date": interval_start,
+                    "data_interval_start": interval_start,
+                    "data_interval_end": queued,
+                    "run_after": queued,
+                    "queued_at": queued,
+                    "start_date": start,
+                    "end_date": None if state == "running" else end,
+                    "last_scheduling_decision": end,
+                    "updated_at": end,
+                    "external_trigger": False,
+                    "clear_number": 0,
+                },
+            )
+            for row in task_instances:
+                yield "task_instance", row
+
+
+def _fallback(column):
+    """
+    Return a callable filling a required column the seed rows do not set.
+    """
+    column_type = column["type"]
+    if "UUID" in type(column_type).__name__.upper():
+        return lambda: str(uuid.uuid4())
+    try:
+        python_type = column_type.python_type
+    except NotImplementedError:
+        python_type = None
+    values = {
+        int: 0,
+        float: 0.0,
+        bool: False,
+        str: "",
+        datetime: datetime.now(UTC),
+        dict: "{}",
+    }
+    if python_type not in values:
+        raise ValueError(f"cannot fill required column {column['name']}")
+    return lambda: values[python_type]
+
+
+def copy_columns(columns, row) -> tuple[list[str], dict]:
+    """
+    Return the columns to copy among the reflected ``columns`` of a table,
+    those the seed ``row`` sets and the required ones it does not, with the
+    fallback values of the latter.
+    """
+    names = [column["name"] for column in columns if column["name"] in row]
+    fallbacks = {
+        column["name"]: _fallback(column)
+        for column in columns
+        if column["name"] not in row
+        and not column["nullable"]
+        and column.get("default") is None
+        and not column.get("identity")
+    }
+    return names + list(fallbacks), fallbacks
+
+
+def copy_value(value) -> str:
+    """
+    Return ``value`` in the text format of ``COPY``.
+    """
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_line(columns, fallbacks, row) -> str:
+    values = (
+        fallbacks[name]() if name in fallbacks else row.get(name) for name in columns
+    )
+    return "\t".join(copy_value(value) for value in values) + "\n"
+
+
+def seed(engine, rows) -> dict[str, int]:
+    """
+    Copy the ``(table, row)`` pairs into the database by batches of
+    ``COPY_BATCH_ROWS`` rows and analyze the tables, return the rows copied
+    per table.
+    """
+    from sqlalchemy import inspect
+
+    inspector = inspect(engine)
+    reflected = {table: inspector.get_columns(table) for table in TABLES}
+    layouts, buffers = {}, {table: io.StringIO() for table in TABLES}
+    counts = dict.fromkeys(TABLES, 0)
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+
+        def flush():
+            # Parents first so that the foreign keys hold
+            for table in TABLES:
+                buffer = buffers[table]
+                if buffer.tell():
+                    buffer.seek(0)
+                    columns = ", ".join(layouts[table][0])
+                    cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN", buffer)
+                    buffers[table] = io.StringIO()
+            connection.commit()
+
+        pending = 0
+        for table, row in rows:
+            if table not in layouts:
+                layouts[table] = copy_columns(reflected[table], row)
+            buffers[table].write(copy_line(*layouts[table], row))
+            counts[table] += 1
+            pending += 1
+            if pending >= COPY_BATCH_ROWS:
+                flush()
+                pending = 0
+        flush()
+        connection.autocommit = True
+        cursor.execute(f"ANALYZE {', '.join(TABLES)}")
+    finally:
+        connection.close()
+    return counts
+
+
+def clean(engine) -> None:
+    from sqlalchemy import text
+
+    with engine.begin() as conn:
+        for table in reversed(TABLES):
+            conn.execute(
+                text(f"DELETE FROM {table} WHERE dag_id LIKE :prefix"),
+                {"prefix": f"{SEED_PREFIX}%"},
+            )
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def plan_findings(plan) -> list[str]:
+    """
+    Return what a JSON ``EXPLAIN ANALYZE`` plan does that an index or more
+    memory would avoid: sequential scans and filters going through more than
+    ``SCAN_ROWS`` rows, and sorts spilling to disk.
+    """
+    findings = []
+    for node in _plan_nodes(plan["Plan"]):
+        loops = node.get("Actual Loops", 1)
+        removed = node.get("Rows Removed by Filter", 0) * loops
+        scanned = node.get("Actual Rows", 0) * loops + removed
+        relation = node.get("Relation Name")
+        if node["Node Type"] == "Seq Scan" and scanned >= SCAN_ROWS:
+            findings.append(f"seq scan on {relation} ({scanned:,} rows)")
+        elif relation and removed >= SCAN_ROWS:
+            findings.append(f"filter on {relation} ({removed:,} rows removed)")
+        if node.get("Sort Space Type") == "Disk":
+            findings.append(f"sort spilled to disk ({node['Sort Space Used']} kB)")
+    return findings
+
+
+def _covered(index, existing) -> bool:
+    """
+    Return whether one of the ``existing`` ``(columns, partial)`` indexes
+    serves the lookups of ``index``.
+    """
+    return any(
+        tuple(columns[: len(index.columns)]) == index.columns
+        and (index.where or not partial)
+        for columns, partial in existing.get(index.table, [])
+    )
+
+
+def recommend(results, existing, task_instances, budget_ms) -> str:
+    """
+    Return the SQL creating the indexes of the queries slower than
+    ``budget_ms`` or with plan findings that no ``existing`` index covers,
+    and a note on deleting old history above ``RETENTION_ROWS`` task
+    instances.
+    """
+    lines = [
+        "-- Indexes recommended by scripts/metadata_db_benchmark.py replay for",
+        f"-- {task_instances:,} task instances. Apply them to the migrated database:",
+        "-- psql -U postgres -v indexes=scripts/metadata_indexes.sql "
+        "< scripts/setup.sql",
+        "",
+    ]
+    seen = set()
+    for result in results:
+        if not result["findings"] and result["p95_ms"] <= budget_ms:
+            continue
+        for index in result["query"].indexes:
+            if index in seen or _covered(index, existing):
+                continue
+            seen.add(index)
+            lines += [f"-- {result['query'].name}: {result['p95_ms']} ms p95"]
+            lines += [f"--   {finding}" for finding in result["findings"]]
+            lines += [index.create_sql(), ""]
+    if not seen:
+        lines += ["-- The existing indexes serve every hot query.", ""]
+    if task_instances > RETENTION_ROWS:
+        # Airflow's migrations alter these tables, they cannot be partitioned
+        lines += [
+            f"-- task_instance holds more than {RETENTION_ROWS:,} rows. Airflow's",
+            "-- migrations do not support partitioned tables, delete the old runs",
+            "-- instead, e.g. keeping 90 days:",
+            "-- airflow db clean --clean-before-timestamp <90 days ago> --yes",
+            "",
+        ]
+    return "\n".join(lines)
+
+
+def existing_indexes(engine) -> dict[str, list[tuple[list[str], bool]]]:
+    from sqlalchemy import inspect
+
+    inspector = inspect(engine)
+    existing = {}
+    for table in TABLES:
+        indexes = existing.setdefault(table, [])
+        indexes.append(
+            (inspector.get_pk_constraint(table)["constrained_columns"], False)
+        )
+        for unique in inspector.get_unique_constraints(table):
+            indexes.append((unique["column_names"], False))
+        for index in inspector.get_indexes(table):
+            partial = index.get("dialect_options", {}).get("postgresql_where")
+            indexes.append((index["column_names"], bool(partial)))
+    return existing
+
+
+def replay(engine, repeat=20, now=None) -> list[dict]:
+    """
+    Run every hot query ``repeat`` times against the seeded history, then once
+    with ``EXPLAIN (ANALYZE, BUFFERS)``, each in a rolled back transaction.
+    """
+    from sqlalchemy import inspect, text
+
+    columns = {column["name"] for column in inspect(engine).get_columns("dag_run")}
+    date_column = "logical_date" if "logical_date" in columns else "execution_date"
+    now = now or datetime.now(UTC)
+    params = {
+        "dag_id": f"{SEED_PREFIX}00000",
+        "task_id": "task_000",
+        "since": now - timedelta(hours=1),
+    }
+    results = []
+    for query in hot_queries(date_column):
+        latencies = []
+        with engine.connect() as conn:
+            for _ in range(repeat):
+                with conn.begin() as transaction:
+                    start = time.perf_counter()
+                    conn.execute(text(query.sql), params).fetchall()
+                    latencies.append(time.perf_counter() - start)
+                    transaction.rollback()
+            with conn.begin() as transaction:
+                explain = f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query.sql}"
+                plan = conn.execute(text(explain), params).scalar()
+                transaction.rollback()
+        plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]
+        latencies.sort()
+        results.append(
+            {
+                "query": query,
+                "p50_ms": round(1000 * statistics.median(latencies), 2),
+                "p95_ms": round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 2),
+                "findings": plan_findings(plan),
+                "plan": plan,
+            }
+        )
+    return results
+
+
+def _engine(url):
+    from sqlalchemy import create_engine
+
+    if url is None:
+        from airflow.configuration import conf
+
+        url = conf.get("database", "sql_alchemy_conn")
+    engine = create_engine(url)
+    if engine.dialect.name != "postgresql":
+        raise SystemExit(f"{engine.url!r} is not a Postgres database")
+    return engine
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--conn", help="defaults to database.sql_alchemy_conn")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    seed_parser = subparsers.add_parser("seed", help="load synthetic run history")
+    seed_parser.add_argument("--dags", type=int, default=1000)
+    seed_parser.add_argument("--runs", type=int, default=500)
+    seed_parser.add_argument("--tasks", type=int, default=20)
+    seed_parser.add_argument("--seed", type=int, default=0)
+    replay_parser = subparsers.add_parser("replay", help="time the hot queries")
+    replay_parser.add_argument("--repeat", type=int, default=20)
+    replay_parser.add_argument("--budget-ms", type=float, default=100)
+    replay_parser.add_argument("--output", help="SQL file of recommended indexes")
+    replay_parser.add_argument("--report", help="JSON file of the latencies and plans")
+    subparsers.add_parser("clean", help="delete the synthetic history")
+    args = parser.parse_args(argv)
+
+    engine = _engine(args.conn)
+    if args.command == "seed":
+        start = time.perf_counter()
+        counts = seed(engine, history(args.dags, args.runs, args.tasks, seed=args.seed))
+        elapsed = time.perf_counter() - start
+        for table, count in counts.items():
+            print(f"{table:<14} {count:>14,} rows")
+        print(f"{sum(counts.values()) / elapsed:,.0f} rows/s in {elapsed:.1f}s")
+    elif args.command == "replay":
+        results = replay(engine, args.repeat)
+        print(f"{'query':<26} {'component':<12} {'p50 (ms)':>10} {'p95 (ms)':>10}")
+        for result in results:
+            print(
+                f"{result['query'].name:<26} {result['query'].component:<12} "
+                f"{result['p50_ms']:>10,.2f} {result['p95_ms']:>10,.2f}"
+            )
+            for finding in result["findings"]:
+                print(f"  {finding}")
+        if args.report:
+            with open(args.report, "w") as f:
+                report = [
+                    {**result, "query": result["query"].name} for result in results
+                ]
+                json.dump(report, f, indent=2)
+        if args.output:
+            from sqlalchemy import text
+
+            # The planner's estimate, counting the rows would take minutes
+            with engine.connect() as conn:
+                task_instances = conn.execute(
+                    text(
+                        "SELECT CAST(reltuples AS bigint) FROM pg_class "
+                        "WHERE relname = 'task_instance'"
+                    )
+                ).scalar()
+            with open(args.output, "w") as f:
+                f.write(
+                    recommend(
+                        results,
+                        existing_indexes(engine),
+                        task_instances,
+                        args.budget_ms,
+                    )
+                )
+            print(f"Recommendations written to {args.output}")
+    else:
+        clean(engine)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Measure Variable and Connection lookups per second for each secrets backend.
+
+The same secrets are written to the metadata DB and to temporary files, then
+looked up through the metadata DB, Airflow's ``LocalFilesystemBackend`` and
+``CachedLocalFilesystemBackend``::
+
+    PYTHONPATH=airflow/dags python scripts/secrets_benchmark.py --secrets 200
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from airflow.models import Connection, Variable
+from airflow.secrets.local_filesystem import LocalFilesystemBackend
+from airflow.secrets.metastore import MetastoreBackend
+from airflow.utils.session import create_session
+from common.secrets_backend import CachedLocalFilesystemBackend
+
+KEY_PREFIX = "secrets_benchmark_"
+
+
+def write_secrets(folder, count):
+    variables = {f"{KEY_PREFIX}{i}": f"value-{i}" for i in range(count)}
+    connections = {
+        f"{KEY_PREFIX}{i}": {"conn_type": "postgres", "host": f"db-{i}", "port": 5432}
+        for i in range(count)
+    }
+    (folder / "variables.json").write_text(json.dumps(variables))
+    (folder / "connections.json").write_text(json.dumps(connections))
+
+    with create_session() as session:
+        for key, value in variables.items():
+            Variable.set(key, value, session=session)
+        for conn_id, params in connections.items():
+            session.merge(Connection(conn_id=conn_id, **params))
+    return list(variables)
+
+
+def delete_secrets():
+    with create_session() as session:
+        session.query(Variable).filter(Variable.key.like(f"{KEY_PREFIX}%")).delete(
+            synchronize_session=False
+        )
+        session.query(Connection).filter(
+            Connection.conn_id.like(f"{KEY_PREFIX}%")
+        ).delete(synchronize_session=False)
+
+
+def lookups_per_second(lookup, keys, duration):
+    lookups = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < duration:
+        for key in random.sample(keys, min(len(keys), 50)):
+            lookup(key)
+            lookups += 1
+    return lookups / elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--secrets", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as folder:
+        folder = Path(folder)
+        keys = write_secrets(folder, args.secrets)
+        try:
+            backends = {
+                "metadata DB": MetastoreBackend(),
+                "LocalFilesystemBackend": LocalFilesystemBackend(
+                    str(folder / "variables.json"), str(folder / "connections.json")
+                ),
+                "CachedLocalFilesystemBackend": CachedLocalFilesystemBackend(
+                    str(folder / "variables.json"), str(folder / "connections.json")
+                ),
+            }
+            print(f"{'backend':<30} {'variables/s':>12} {'connections/s':>14}")
+            for name, backend in backends.items():
+                variables = lookups_per_second(
+                    backend.get_variable, keys, args.duration
+                )
+                connections = lookups_per_second(
+                    backend.get_connection, keys, args.duration
+                )
+                print(f"{name:<30} {variables:>12,.0f} {connections:>14,.0f}")
+        finally:
+            delete_secrets()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,15 @@
 -- RUN THIS ON YOUR POSTGRES INSTANCE WITH psql
 -- e.g psql < setup.sql
 
+-- Or apply the indexes recommended by scripts/metadata_db_benchmark.py to the
+-- migrated airflow database, leaving it in place
+-- e.g psql -v indexes=scripts/metadata_indexes.sql < setup.sql
+\if :{?indexes}
+\connect airflow
+\include :indexes
+\quit
+\endif
+
 DROP USER IF EXISTS airflow_user;
 
 CREATE USER airflow_user WITH CREATEDB CREATEROLE SUPERUSER LOGIN PASSWORD 'airflow_pass';
@@ -0,0 +1,267 @@
+"""
+Model the throughput of the per-queue Celery workers against a single pool.
+
+The worker services of ``docker-compose.local.yml`` are read with their
+queues, autoscale maximum, prefetch multiplier, replicas and memory limit. A
+burst of short tasks on the default queue and long, memory heavy tasks on the
+heavy queue then runs, in simulated time, through:
+
+* the single pool: one worker consuming every queue, with the same memory as
+  all the workers and only as many processes as heavy tasks fit in it,
+* the per-queue workers of the compose file.
+
+Workers reserve up to ``concurrency * prefetch multiplier`` tasks and run them
+in the order they reserved them, like Celery's prefork pool does::
+
+    python scripts/worker_sizing_model.py --light-tasks 2000 --heavy-tasks 20
+
+This is a sizing model, not a load benchmark: the task durations are the
+modelled ones and nothing runs on the workers. The broker round trips, the
+process start up, the autoscale ramp up and the memory the tasks really use
+are left out, so it compares layouts but does not measure the settings.
+Check them on the running stack, e.g. with the queue and task times of
+Flower, before relying on them.
+"""
+
+import argparse
+import heapq
+import os
+import random
+import re
+import shlex
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+
+import yaml
+
+COMPOSE_FILE = Path(__file__).resolve().parents[1] / "docker-compose.local.yml"
+DEFAULT_QUEUE = "default"
+# Airflow's celery.worker_concurrency and celery.worker_prefetch_multiplier
+DEFAULT_CONCURRENCY = 16
+DEFAULT_PREFETCH_MULTIPLIER = 1
+UNITS = {"": 1, "b": 1, "k": 2**10, "m": 2**20, "g": 2**30}
+
+
+@dataclass(frozen=True)
+class WorkerPool:
+    name: str
+    queues: tuple[str, ...]
+    concurrency: int
+    prefetch_multiplier: int = DEFAULT_PREFETCH_MULTIPLIER
+    replicas: int = 1
+    memory: int | None = None
+
+
+def parse_memory(value) -> int:
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([bkmg]?)i?b?", str(value).lower())
+    if not match:
+        raise ValueError(f"Invalid memory size {value!r}")
+    return int(float(match[1]) * UNITS[match[2]])
+
+
+def interpolate(value):
+    """
+    Resolve the ``${VAR:-default}`` references of a compose value.
+    """
+    return re.sub(
+        r"\$\{(\w+)(?::?-([^}]*))?\}",
+        lambda m: os.environ.get(m[1]) or m[2] or "",
+        str(value),
+    )
+
+
+def worker_pools(compose_file=COMPOSE_FILE) -> list[WorkerPool]:
+    """
+    Return the Celery worker services of the compose file.
+    """
+    with open(compose_file) as f:
+        services = yaml.safe_load(f)["services"]
+    pools = []
+    for name, service in services.items():
+        command = service.get("command")
+        args = shlex.split(command) if isinstance(command, str) else command or []
+        if args[:2] != ["celery", "worker"]:
+            continue
+        environment = service.get("environment") or {}
+        options = dict(zip(args[2::2], args[3::2], strict=False))
+        queues = options.get("--queues") or options.get("-q") or DEFAULT_QUEUE
+        autoscale = options.get("--autoscale") or environment.get(
+            "AIRFLOW__CELERY__WORKER_AUTOSCALE"
+        )
+        concurrency = options.get("--concurrency") or environment.get(
+            "AIRFLOW__CELERY__WORKER_CONCURRENCY", DEFAULT_CONCURRENCY
+        )
+        if autoscale:
+            # Under a burst the pool grows to its maximum
+            concurrency = str(autoscale).split(",")[0]
+        deploy = service.get("deploy") or {}
+        memory = (deploy.get("resources") or {}).get("limits", {}).get("memory")
+        pools.append(
+            WorkerPool(
+                name=name,
+                queues=tuple(queues.split(",")),
+                concurrency=int(interpolate(concurrency)),
+                prefetch_multiplier=int(
+                    environment.get(
+                        "AIRFLOW__CELERY__WORKER_PREFETCH_MULTIPLIER",
+                        DEFAULT_PREFETCH_MULTIPLIER,
+                    )
+                ),
+                replicas=int(interpolate(deploy.get("replicas", 1))),
+                memory=parse_memory(interpolate(memory)) if memory else None,
+            )
+        )
+    return pools
+
+
+def single_pool(pools, task_memory) -> WorkerPool:
+    """
+    Return one worker consuming all the queues of ``pools`` within their
+    memory, with only as many processes as tasks of ``task_memory`` fit in it.
+    """
+    if any(pool.memory is None for pool in pools):
+        raise ValueError("Every worker needs a memory limit to size the single pool")
+    memory = sum(pool.memory * pool.replicas for pool in pools)
+    queues = dict.fromkeys(queue for pool in pools for queue in pool.queues)
+    return WorkerPool(
+        name="single pool",
+        queues=tuple(queues),
+        concurrency=max(memory // task_memory, 1),
+        memory=memory,
+    )
+
+
+def workload(light_tasks, heavy_tasks, light_seconds, heavy_seconds, seed=0):
+    """
+    Return ``(queue, seconds)`` tasks in the order they are queued.
+    """
+    rng = random.Random(seed)
+    tasks = [
+        (DEFAULT_QUEUE, light_seconds * rng.uniform(0.5, 1.5))
+        for _ in range(light_tasks)
+    ] + [("heavy", heavy_seconds * rng.uniform(0.5, 1.5)) for _ in range(heavy_tasks)]
+    rng.shuffle(tasks)
+    return tasks
+
+
+def simulate(pools, tasks) -> dict:
+    """
+    Run ``tasks``, all queued at once, on the workers of ``pools``.
+
+    :return: per queue, the tasks run, when the last one finished, the
+        throughput per minute and the p95 of the time spent waiting to start.
+    """
+    consumed = {queue for pool in pools for queue in pool.queues}
+    missing = {queue for queue, _ in tasks} - consumed
+    if missing:
+        raise ValueError(f"No worker consumes the queues {sorted(missing)}")
+
+    broker = {}
+    for index, (queue, _) in enumerate(tasks):
+        broker.setdefault(queue, deque()).append(index)
+    workers = [
+        {"pool": pool, "reserved": deque(), "running": 0}
+        for pool in pools
+        for _ in range(pool.replicas)
+    ]
+    started, finished = {}, {}
+    events = []
+    now = 0.0
+
+    def fetch(worker):
+        pool = worker["pool"]
+        if (
+            len(worker["reserved"]) + worker["running"]
+            >= pool.concurrency * pool.prefetch_multiplier
+        ):
+            return False
+        heads = [broker[q][0] for q in pool.queues if broker.get(q)]
+        if not heads:
+            return False
+        index = min(heads)
+        broker[tasks[index][0]].popleft()
+        worker["reserved"].append(index)
+        return True
+
+    def start(position, worker):
+        if worker["running"] >= worker["pool"].concurrency or not worker["reserved"]:
+            return False
+        index = worker["reserved"].popleft()
+        worker["running"] += 1
+        started[index] = now
+        heapq.heappush(events, (now + tasks[index][1], index, position))
+        return True
+
+    while True:
+        progress = True
+        while progress:
+            progress = False
+            for position, worker in enumerate(workers):
+                progress |= fetch(worker)
+                progress |= start(position, worker)
+        if not events:
+            break
+        now, index, position = heapq.heappop(events)
+        workers[position]["running"] -= 1
+        finished[index] = now
+
+    report = {}
+    for queue in broker:
+        indexes = [i for i, (q, _) in enumerate(tasks) if q == queue]
+        waits = sorted(started[i] for i in indexes)
+        last = max(finished[i] for i in indexes)
+        report[queue] = {
+            "tasks": len(indexes),
+            "finished_seconds": round(last, 1),
+            "per_minute": round(60 * len(indexes) / last, 1) if last else 0.0,
+            "p95_wait_seconds": round(waits[int(0.95 * (len(waits) - 1))], 1),
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--compose-file", type=Path, default=COMPOSE_FILE)
+    parser.add_argument("--light-tasks", type=int, default=2000)
+    parser.add_argument("--heavy-tasks", type=int, default=20)
+    parser.add_argument("--light-seconds", type=float, default=5.0)
+    parser.add_argument("--heavy-seconds", type=float, default=600.0)
+    parser.add_argument(
+        "--heavy-task-memory",
+        default="2G",
+        help="memory a heavy task needs, it bounds the single pool's processes",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    pools = worker_pools(args.compose_file)
+    tasks = workload(
+        args.light_tasks,
+        args.heavy_tasks,
+        args.light_seconds,
+        args.heavy_seconds,
+        args.seed,
+    )
+    layouts = {
+        "single pool": [single_pool(pools, parse_memory(args.heavy_task_memory))],
+        "per-queue workers": pools,
+    }
+    print(
+        f"{'layout':<18} {'processes':>9} {'queue':<8} {'tasks/min':>10} "
+        f"{'p95 wait (s)':>13} {'done after (s)':>15}"
+    )
+    for name, layout in layouts.items():
+        processes = sum(pool.concurrency * pool.replicas for pool in layout)
+        report = simulate(layout, tasks)
+        for queue, stats in sorted(report.items()):
+            print(
+                f"{name:<18} {processes:>9} {queue:<8} {stats['per_minute']:>10,.1f} "
+                f"{stats['p95_wait_seconds']:>13,.1f} "
+                f"{stats['finished_seconds']:>15,.1f}"
+            )
+            name = processes = ""
+
+
+if __name__ == "__main__":
+    main()
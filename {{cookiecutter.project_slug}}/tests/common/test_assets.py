@@ -0,0 +1,37 @@
+import pendulum
+
+from airflow.models import DAG
+from airflow.operators.empty import EmptyOperator
+from common.assets import asset, consumed_uris, produced_uris, unproduced_assets
+
+START = pendulum.datetime(2024, 1, 1, tz="UTC")
+
+
+def test_produced_and_consumed_assets():
+    """
+    Test outlets and asset schedules, including conditions, are read
+    """
+    orders, customers = asset("orders"), asset("customers")
+    with DAG("producer", schedule=None, start_date=START) as producer:
+        EmptyOperator(task_id="load", outlets=[orders])
+    consumer = DAG("consumer", schedule=(orders | customers), start_date=START)
+
+    assert produced_uris(producer) == {orders.uri}
+    assert consumed_uris(consumer) == {orders.uri, customers.uri}
+    assert consumed_uris(producer) == set()
+
+
+def test_unproduced_assets():
+    """
+    Test consumers of an asset no DAG produces are reported
+    """
+    orders = asset("orders")
+    with DAG("producer", schedule=None, start_date=START) as producer:
+        EmptyOperator(task_id="load", outlets=[orders])
+    consumer = DAG("consumer", schedule=[orders], start_date=START)
+    orphan = DAG("orphan", schedule=[asset("refunds")], start_date=START)
+
+    assert unproduced_assets([producer, consumer]) == {}
+    assert unproduced_assets([producer, consumer, orphan]) == {
+        "orphan": {asset("refunds").uri}
+    }
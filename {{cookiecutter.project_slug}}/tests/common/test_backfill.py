@@ -0,0 +1,91 @@
+from datetime import timedelta
+
+import pendulum
+import pytest
+from sqlalchemy import delete, select
+
+from airflow.models import DAG, DagRun, TaskInstance
+from airflow.operators.empty import EmptyOperator
+from airflow.utils.session import create_session
+from common.backfill import Backfill, intervals
+
+START = pendulum.datetime(2024, 1, 1, tz="UTC")
+
+
+@pytest.fixture
+def dag(airflow_db):
+    with DAG(
+        "test_backfill",
+        schedule="@daily",
+        start_date=START,
+        catchup=False,
+    ) as dag:
+        EmptyOperator(task_id="extract") >> EmptyOperator(task_id="load")
+    dag.sync_to_db()
+    yield dag
+    with create_session() as session:
+        session.execute(delete(TaskInstance).where(TaskInstance.dag_id == dag.dag_id))
+        session.execute(delete(DagRun).where(DagRun.dag_id == dag.dag_id))
+
+
+def set_states(dag, states):
+    with create_session() as session:
+        runs = session.scalars(select(DagRun).where(DagRun.dag_id == dag.dag_id))
+        for run in runs:
+            state = states.get(run.execution_date.day)
+            if state:
+                run.state = state
+                for ti in run.get_task_instances(session=session):
+                    ti.state = "success" if state == "success" else "failed"
+
+
+def test_intervals_newest_first(dag):
+    """
+    Test the intervals of the schedule in the range are listed newest first
+    """
+    infos = intervals(dag, START, START + timedelta(days=2))
+
+    assert [info.logical_date.day for info in infos] == [3, 2, 1]
+    assert infos[0].data_interval.end == START + timedelta(days=3)
+
+
+def test_step_bounds_active_runs_and_resumes(dag):
+    """
+    Test runs are queued newest first up to the limit, and failed runs queued
+    again once
+    """
+    backfill = Backfill(
+        dag, START, START + timedelta(days=2), max_active_runs=2, pool="backfill"
+    )
+    with create_session() as session:
+        status = backfill.step(session)
+    assert (status.created, status.active, status.pending) == (2, 2, 1)
+    with create_session() as session:
+        runs = session.scalars(select(DagRun).where(DagRun.dag_id == dag.dag_id))
+        assert sorted(run.execution_date.day for run in runs) == [2, 3]
+        pools = session.scalars(
+            select(TaskInstance.pool).where(TaskInstance.dag_id == dag.dag_id)
+        )
+        assert set(pools) == {"backfill"}
+        assert backfill.step(session).created == 0
+
+    set_states(dag, {3: "success", 2: "failed"})
+    with create_session() as session:
+        status = backfill.step(session)
+    # The first interval and the failed one run again
+    assert (status.succeeded, status.created, status.pending) == (1, 2, 0)
+    with create_session() as session:
+        pools = session.scalars(
+            select(TaskInstance.pool).where(TaskInstance.dag_id == dag.dag_id)
+        )
+        assert set(pools) == {"backfill"}
+
+    set_states(dag, {1: "success", 2: "failed"})
+    with create_session() as session:
+        status = backfill.step(session)
+    assert (status.succeeded, status.failed, status.finished) == (2, 1, True)
+
+    # A new backfill of the range resumes with the failed interval
+    with create_session() as session:
+        status = Backfill(dag, START, START + timedelta(days=2)).step(session)
+    assert (status.succeeded, status.created) == (2, 1)
@@ -0,0 +1,183 @@
+import json
+from datetime import timedelta
+
+import pendulum
+import pytest
+from sqlalchemy import Column, Float, MetaData, String, Table, create_engine
+
+from airflow.models import DAG
+from airflow.operators.empty import EmptyOperator
+from airflow.sensors.external_task import ExternalTaskSensor
+from airflow.utils import timezone
+from airflow.utils.sqlalchemy import UtcDateTime
+from common.assets import asset
+from common.critical_path import (
+    DependencyCycleError,
+    DependencyGraph,
+    historical_durations,
+)
+
+START = pendulum.datetime(2024, 1, 1, tz="UTC")
+ORDERS = asset("test.orders")
+
+
+def dags():
+    with DAG("extract", schedule="@daily", start_date=START) as extract:
+        orders = EmptyOperator(task_id="orders", outlets=[ORDERS])
+        customers = EmptyOperator(task_id="customers")
+    with DAG("transform", schedule=[ORDERS], start_date=START) as transform:
+        EmptyOperator(task_id="stage") >> EmptyOperator(task_id="model")
+    with DAG("report", schedule="@daily", start_date=START) as report:
+        wait = ExternalTaskSensor(
+            task_id="wait_model", external_dag_id="transform", external_task_id="model"
+        )
+        wait >> EmptyOperator(task_id="publish")
+        customers >> EmptyOperator(task_id="unused", dag=extract)
+    del orders
+    return [extract, transform, report]
+
+
+DURATIONS = {
+    ("extract", "orders"): (100.0, 150.0, 30),
+    ("extract", "customers"): (500.0, 600.0, 30),
+    ("extract", "unused"): (10.0, 10.0, 30),
+    ("transform", "stage"): (50.0, 300.0, 30),
+    ("transform", "model"): (200.0, 250.0, 30),
+    ("report", "wait_model"): (3000.0, 4000.0, 30),
+    ("report", "publish"): (20.0, 30.0, 30),
+}
+
+
+def test_analyze_follows_assets_and_external_task_sensors():
+    """
+    Test the critical path crosses DAGs and the sensor's wait weighs nothing
+    """
+    graph = DependencyGraph.from_dags(dags())
+    graph.weigh(DURATIONS)
+
+    report = graph.analyze("report.publish", "p50")
+
+    assert report["landing_seconds"] == 100 + 50 + 200 + 20
+    assert [step["node"] for step in report["critical_path"]] == [
+        "extract.orders",
+        ORDERS.uri,
+        "transform.stage",
+        "transform.model",
+        "report.wait_model",
+        "report.publish",
+    ]
+    # Tasks not upstream of the target are left out
+    assert set(report["tasks"]) == {
+        "extract.orders",
+        "transform.stage",
+        "transform.model",
+        "report.wait_model",
+        "report.publish",
+    }
+    assert report["tasks"]["transform.model"]["slack"] == 0
+    assert [s["task"] for s in report["speedups"]][0] == "transform.model"
+    assert report["no_history"] == []
+
+
+def test_analyze_reports_slack_and_actual_gains():
+    """
+    Test a speedup only counts up to the slack of the parallel branch
+    """
+    with DAG("fan_in", schedule=None, start_date=START) as dag:
+        slow = EmptyOperator(task_id="slow")
+        fast = EmptyOperator(task_id="fast")
+        [slow, fast] >> EmptyOperator(task_id="join")
+    graph = DependencyGraph.from_dags([dag])
+    graph.weigh(
+        {
+            ("fan_in", "slow"): (100.0, 100.0, 5),
+            ("fan_in", "fast"): (70.0, 70.0, 5),
+        }
+    )
+
+    report = graph.analyze()
+
+    assert report["target"] == "fan_in.join"
+    assert report["tasks"]["fan_in.fast"]["slack"] == 30
+    assert report["speedups"] == [
+        {"task": "fan_in.slow", "duration": 100.0, "max_landing_gain": 30.0}
+    ]
+    assert report["no_history"] == ["fan_in.join"]
+
+    dot = graph.to_dot(report)
+    assert 'subgraph "cluster_fan_in"' in dot
+    assert '"fan_in.slow" -> "fan_in.join" [color=red, penwidth=2];' in dot
+    assert '"fan_in.fast" -> "fan_in.join";' in dot
+    json.dumps(report)
+
+
+def test_analyze_rejects_cycles_across_dags():
+    """
+    Test DAGs waiting for each other are reported
+    """
+    with DAG("ping", schedule=None, start_date=START) as ping:
+        ExternalTaskSensor(task_id="wait", external_dag_id="pong")
+    with DAG("pong", schedule=None, start_date=START) as pong:
+        ExternalTaskSensor(task_id="wait", external_dag_id="ping")
+    graph = DependencyGraph.from_dags([ping, pong])
+
+    with pytest.raises(DependencyCycleError):
+        graph.analyze()
+
+
+def test_historical_durations_prefers_the_summaries(tmp_path):
+    """
+    Test the tasks without a summary get percentiles of their task instances
+    """
+    from common.task_durations import duration_summary
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'airflow.db'}")
+    task_instance = Table(
+        "task_instance",
+        MetaData(),
+        Column("dag_id", String(250)),
+        Column("task_id", String(250)),
+        Column("state", String(20)),
+        Column("duration", Float),
+        Column("end_date", UtcDateTime),
+    )
+    task_instance.metadata.create_all(engine)
+    duration_summary.metadata.create_all(engine)
+    now = timezone.datetime(2024, 6, 1)
+    with engine.begin() as conn:
+        conn.execute(
+            duration_summary.insert().values(
+                dag_id="etl",
+                task_id="load",
+                samples="[]",
+                p50=12.0,
+                p95=30.0,
+                runs=40,
+                updated_at=now,
+            )
+        )
+        conn.execute(
+            task_instance.insert(),
+            [
+                {
+                    "dag_id": "etl",
+                    "task_id": task_id,
+                    "state": state,
+                    "duration": float(i),
+                    "end_date": now - timedelta(days=days),
+                }
+                for i in range(1, 11)
+                for task_id, state, days in (
+                    ("load", "success", 1),
+                    ("extract", "success", 1),
+                    ("extract", "failed", 1),
+                    ("extract", "success", 60),
+                )
+            ],
+        )
+
+    durations = historical_durations(engine, now - timedelta(days=30))
+    engine.dispose()
+
+    assert durations[("etl", "load")] == (12.0, 30.0, 40)
+    assert durations[("etl", "extract")] == (5.5, 9.55, 10)
@@ -0,0 +1,131 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from airflow.models import DAG
+from common.dbt_project import DbtProject, build_dbt_tasks, select_models
+
+pytest.importorskip("dbt.cli.main")
+
+EXAMPLE_PROJECT = Path(__file__).resolve().parents[2] / "dbt"
+
+
+@pytest.fixture(scope="module")
+def project(tmp_path_factory, monkeypatch_module):
+    """
+    Copy of the bundled example project with a parsed manifest.
+    """
+    project_dir = tmp_path_factory.mktemp("dbt") / "analytics"
+    shutil.copytree(
+        EXAMPLE_PROJECT, project_dir, ignore=shutil.ignore_patterns("target")
+    )
+    monkeypatch_module.setenv("DBT_DUCKDB_PATH", str(project_dir / "analytics.duckdb"))
+
+    project = DbtProject(project_dir)
+    project.build_manifest()
+    return project
+
+
+@pytest.fixture(scope="module")
+def monkeypatch_module():
+    with pytest.MonkeyPatch.context() as mp:
+        yield mp
+
+
+def test_manifest_only_rebuilt_when_models_change(project):
+    """
+    Test the manifest is reused until a model file changes
+    """
+    assert project.manifest_is_current()
+    assert project.build_manifest() is False
+
+    model = project.project_dir / "models" / "marts" / "daily_revenue.sql"
+    model.write_text(model.read_text() + "\n-- changed\n")
+    assert not project.manifest_is_current()
+    assert project.build_manifest() is True
+    assert project.manifest_is_current()
+
+
+def test_select_models(project):
+    """
+    Test models are selected from the manifest by name, tag and path
+    """
+    manifest = project.load_manifest()
+
+    def names(selected):
+        return sorted(manifest["nodes"][unique_id]["name"] for unique_id in selected)
+
+    assert names(select_models(manifest)) == [
+        "customer_orders",
+        "daily_revenue",
+        "stg_customers",
+        "stg_orders",
+    ]
+    assert names(select_models(manifest, ["tag:marts"])) == [
+        "customer_orders",
+        "daily_revenue",
+    ]
+    assert names(select_models(manifest, ["path:models/staging"])) == [
+        "stg_customers",
+        "stg_orders",
+    ]
+    assert names(select_models(manifest, exclude=["tag:staging"])) == [
+        "customer_orders",
+        "daily_revenue",
+    ]
+
+
+def test_build_dbt_tasks_one_task_per_model(project, monkeypatch):
+    """
+    Test a task is built per model from the manifest without running dbt
+    """
+
+    def fail(*args, **kwargs):
+        raise AssertionError("dbt must not run at DAG parse time")
+
+    monkeypatch.setattr(DbtProject, "invoke", fail)
+    with DAG("dbt_models", schedule=None) as dag:
+        build_dbt_tasks(project)
+
+    assert sorted(dag.task_ids) == [
+        "customer_orders",
+        "daily_revenue",
+        "stg_customers",
+        "stg_orders",
+    ]
+    assert dag.get_task("customer_orders").upstream_task_ids == {
+        "stg_customers",
+        "stg_orders",
+    }
+    # Independent models can run concurrently
+    assert dag.get_task("daily_revenue").upstream_task_ids == {"stg_orders"}
+    assert dag.get_task("stg_customers").upstream_task_ids == set()
+
+
+def test_build_dbt_tasks_keeps_order_through_unselected_models(project):
+    """
+    Test dependencies through models left out of the selection are kept
+    """
+    with DAG("dbt_marts", schedule=None) as dag:
+        build_dbt_tasks(project, select=["customer_orders", "stg_customers"])
+
+    assert dag.get_task("customer_orders").upstream_task_ids == {"stg_customers"}
+
+
+def test_model_task_runs_with_partial_parse(project):
+    """
+    Test a model task runs against DuckDB from the partial parse artifacts
+    """
+    project.invoke(project.cli_args("seed"))
+    with DAG("dbt_run", schedule=None):
+        tasks = build_dbt_tasks(project, select=["stg_orders", "daily_revenue"])
+
+    assert (project.target_path / "partial_parse.msgpack").exists()
+    for task in sorted(tasks.values(), key=lambda t: len(t.upstream_task_ids)):
+        task.execute(context={})
+
+    duckdb = pytest.importorskip("duckdb")
+    with duckdb.connect(str(project.project_dir / "analytics.duckdb")) as conn:
+        rows = conn.execute("select count(*) from daily_revenue").fetchone()
+    assert rows == (3,)
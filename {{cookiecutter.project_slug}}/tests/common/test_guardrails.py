@@ -0,0 +1,88 @@
+from datetime import timedelta
+
+import pytest
+
+from airflow.decorators import task
+from airflow.exceptions import AirflowClusterPolicyViolation
+from airflow.models import DAG
+from airflow.operators.empty import EmptyOperator
+from common.dbt_project import DbtModelOperator
+from common.guardrails import enforce_dag, enforce_task, parse_guardrails
+
+RULES = parse_guardrails(
+    {
+        "dags": {"catchup": False, "max_active_runs": 4},
+        "tasks": {
+            "require_owner": True,
+            "trigger_rules": ["all_success"],
+            "execution_timeout_minutes": {"default": 30, "max": 120},
+            "max_mapped_tasks": 10,
+            "max_active_tis_per_dagrun": 2,
+            "pools_by_operator": {"DbtModelOperator": "dbt"},
+        },
+    }
+)
+
+
+def test_dag_rules():
+    """
+    Test DAGs catching up or with too many active runs are rejected
+    """
+    enforce_dag(DAG("ok", schedule=None, catchup=False, max_active_runs=4), RULES)
+
+    dag = DAG("greedy", schedule=None, catchup=True, max_active_runs=32)
+    with pytest.raises(AirflowClusterPolicyViolation) as e:
+        enforce_dag(dag, RULES)
+    assert str(e.value) == (
+        "DAG greedy breaks the guardrails: catchup must be False; "
+        "max_active_runs 32 is over 4"
+    )
+
+
+def test_task_defaults_filled_in():
+    """
+    Test the timeout, mapped concurrency and pool defaults are filled in
+    """
+    with DAG("etl", schedule=None, catchup=False):
+        plain = EmptyOperator(task_id="plain")
+        dbt = DbtModelOperator(task_id="dbt", project=None, model="orders")
+
+        @task
+        def load(item):
+            return item
+
+        mapped = load.expand(item=[1, 2, 3])
+
+    for t in (plain, dbt, mapped.operator):
+        enforce_task(t, RULES)
+
+    assert plain.execution_timeout == timedelta(minutes=30)
+    assert plain.pool == "default_pool"
+    assert dbt.pool == "dbt"
+    assert mapped.operator.max_active_tis_per_dagrun == 2
+
+
+def test_task_rules():
+    """
+    Test tasks breaking the rules are rejected with every violation listed
+    """
+    with DAG("etl", schedule=None, catchup=False):
+        slow = EmptyOperator(
+            task_id="slow",
+            owner="",
+            trigger_rule="all_done",
+            execution_timeout=timedelta(hours=5),
+        )
+
+        @task
+        def load(item):
+            return item
+
+        fan_out = load.expand(item=list(range(50)))
+
+    with pytest.raises(AirflowClusterPolicyViolation, match="no owner set") as e:
+        enforce_task(slow, RULES)
+    assert "trigger rule all_done is not one of all_success" in str(e.value)
+    assert "execution_timeout 5:00:00 is over 2:00:00" in str(e.value)
+    with pytest.raises(AirflowClusterPolicyViolation, match="maps 50 task instances"):
+        enforce_task(fan_out.operator, RULES)
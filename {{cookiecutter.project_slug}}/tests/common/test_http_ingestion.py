@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import pytest
+
+from common.http_ingestion import (
+    AdaptiveLimit,
+    CursorPagination,
+    HttpIngestionError,
+    OffsetPagination,
+    ingest,
+)
+from scripts.http_ingestion_benchmark import StandInServer
+
+
+def records(folder):
+    return sorted(
+        item["id"]
+        for path in folder.glob("*.json")
+        for item in json.loads(path.read_text())["data"]
+    )
+
+
+def test_adaptive_limit_increases_and_halves():
+    """
+    Test the limit grows with successes and halves once per overload
+    """
+
+    async def scenario():
+        limit = AdaptiveLimit(initial=4, maximum=6)
+        for _ in range(4):
+            await limit.release(await limit.acquire())
+        assert limit.limit == 5
+        started = [await limit.acquire() for _ in range(5)]
+        # The requests in flight when the server got overloaded fail together
+        for start in started:
+            await limit.release(start, throttled=True)
+        return limit.limit
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_ingest_follows_cursors_of_each_endpoint(tmp_path):
+    """
+    Test every page of every endpoint is written and the rate reported
+    """
+    with StandInServer(records=250, latency=0.005) as server:
+        report = asyncio.run(
+            ingest(
+                server.url,
+                ["/orders", "/refunds"],
+                tmp_path,
+                pagination=CursorPagination(),
+                params={"limit": 50},
+            )
+        )
+
+    assert (report["requests"], report["pages"], report["retries"]) == (10, 10, 0)
+    assert report["requests_per_second"] > 0
+    for endpoint in ("orders", "refunds"):
+        assert records(tmp_path / endpoint) == list(range(250))
+    assert not list(tmp_path.rglob("*.part"))
+
+
+def test_ingest_backs_off_when_throttled(tmp_path):
+    """
+    Test offset pages are fetched concurrently, the requests answered 429
+    retried and the concurrency decreased
+    """
+    with StandInServer(records=2000, latency=0.01, max_in_flight=6) as server:
+        report = asyncio.run(
+            ingest(
+                server.url,
+                ["/items"],
+                tmp_path,
+                pagination=OffsetPagination(page_size=50),
+                max_concurrency=32,
+                initial_concurrency=16,
+            )
+        )
+
+    assert server.throttled > 0
+    assert report["retries"] > 0
+    assert report["concurrency"] < 16
+    assert records(tmp_path / "items") == list(range(2000))
+    print(f"{report['requests_per_second']} requests/s")
+
+
+def test_ingest_gives_up_after_retries(tmp_path):
+    """
+    Test a server always throttling fails the ingestion
+    """
+    with (
+        StandInServer(records=10, max_in_flight=-1) as server,
+        pytest.raises(HttpIngestionError),
+    ):
+        asyncio.run(ingest(server.url, ["/items"], tmp_path, max_retries=2))
+
+
+def test_ingest_under_base_path_retries_cut_responses(tmp_path):
+    """
+    Test the endpoints are joined to the path of the base URL and the
+    responses cut mid-body retried without leaving partial pages
+    """
+    with StandInServer(records=250, latency=0.001, cut_every=3) as server:
+        report = asyncio.run(
+            ingest(
+                f"{server.url}/api/v1",
+                ["/orders", "refunds"],
+                tmp_path,
+                pagination=CursorPagination(),
+                params={"limit": 50},
+            )
+        )
+
+    assert server.paths == {"/api/v1/orders", "/api/v1/refunds"}
+    assert server.cut > 0
+    assert report["retries"] == server.cut
+    for endpoint in ("orders", "refunds"):
+        assert records(tmp_path / endpoint) == list(range(250))
+    assert not list(tmp_path.rglob("*.part"))
@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    select,
+)
+
+from common.incremental import IncrementalSource, load_increment, upsert
+
+START = datetime(2024, 6, 1)
+SOURCE = IncrementalSource(
+    name="shop.orders",
+    source_table="orders",
+    target_table="stg_orders",
+    key=("order_id",),
+    lookback=timedelta(minutes=15),
+    batch_size=10,
+)
+
+orders = Table(
+    "orders",
+    MetaData(),
+    Column("order_id", Integer, primary_key=True),
+    Column("status", String(20)),
+    Column("updated_at", DateTime),
+)
+
+
+@pytest.fixture
+def engines(tmp_path):
+    source = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    target = create_engine(f"sqlite:///{tmp_path / 'target.db'}")
+    orders.metadata.create_all(source)
+    yield source, target
+    source.dispose()
+    target.dispose()
+
+
+def write_orders(engine, rows):
+    with engine.begin() as conn:
+        for order_id, status, updated_at in rows:
+            conn.execute(orders.delete().where(orders.c.order_id == order_id))
+            conn.execute(
+                orders.insert().values(
+                    order_id=order_id, status=status, updated_at=updated_at
+                )
+            )
+
+
+def table_rows(engine, name):
+    table = Table(name, MetaData(), autoload_with=engine)
+    with engine.connect() as conn:
+        return sorted(tuple(row) for row in conn.execute(select(table)))
+
+
+def test_load_increment_only_reads_changed_rows(engines):
+    """
+    Test a run loads the rows changed since the watermark and its lookback
+    """
+    source, target = engines
+    # Batches of 10 rows end in the middle of rows sharing an updated_at
+    write_orders(
+        source,
+        [(i, "new", START + timedelta(hours=i // 4)) for i in range(25)],
+    )
+
+    first = load_increment(source, target, SOURCE)
+
+    assert (first["rows_loaded"], first["batches"]) == (25, 3)
+    assert table_rows(target, "stg_orders") == table_rows(source, "orders")
+
+    changed = START + timedelta(hours=7)
+    write_orders(source, [(3, "paid", changed), (7, "paid", changed)])
+    write_orders(source, [(25, "new", changed)])
+
+    second = load_increment(source, target, SOURCE)
+
+    # The changed rows and the ones of the last 15 minutes before the watermark
+    assert second["rows_loaded"] == 3 + 1
+    assert second["watermark"] == changed.isoformat()
+    assert table_rows(target, "stg_orders") == table_rows(source, "orders")
+
+
+def test_load_increment_catches_late_rows_within_lookback(engines):
+    """
+    Test rows committed after the watermark passed them are loaded when they
+    are within the lookback
+    """
+    source, target = engines
+    write_orders(source, [(1, "new", START + timedelta(hours=1))])
+    load_increment(source, target, SOURCE)
+
+    write_orders(
+        source,
+        [
+            (2, "new", START + timedelta(minutes=50)),
+            (3, "new", START + timedelta(minutes=30)),
+        ],
+    )
+    load_increment(source, target, SOURCE)
+
+    assert [row[0] for row in table_rows(target, "stg_orders")] == [1, 2]
+
+
+def test_upsert_keeps_the_most_recent_version(engines):
+    """
+    Test an older version of a row does not replace a newer one
+    """
+    _, target = engines
+    orders.metadata.create_all(target)
+    with target.begin() as conn:
+        upsert(
+            conn,
+            orders,
+            [{"order_id": 1, "status": "paid", "updated_at": START}],
+            SOURCE,
+        )
+        upsert(
+            conn,
+            orders,
+            [
+                {
+                    "order_id": 1,
+                    "status": "new",
+                    "updated_at": START - timedelta(minutes=1),
+                }
+            ],
+            SOURCE,
+        )
+
+    assert table_rows(target, "orders") == [(1, "paid", START)]
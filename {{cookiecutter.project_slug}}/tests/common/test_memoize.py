@@ -0,0 +1,89 @@
+import os
+import time
+
+import pendulum
+
+from airflow.decorators import dag, task
+from common.assets import asset
+from common.memoize import ResultStore, memoize, memoize_key
+
+
+def test_result_store_evicts_least_recently_used(tmp_path):
+    """
+    Test the results read last are kept when the store is over its limits
+    """
+    store = ResultStore(tmp_path, max_entries=2)
+    for i, key in enumerate(("aa1", "bb2")):
+        store.put(key, {"rows": i})
+        # Modification times of the files written in the same tick are equal
+        os.utime(store._path(key), (time.time() - 10 + i,) * 2)
+
+    assert store.get("aa1") == (True, {"rows": 0})
+    assert store.put("cc3", [1, 2]) == 1
+
+    assert store.get("bb2") == (False, None)
+    assert store.get("cc3") == (True, [1, 2])
+    assert store.stats() | {"bytes": 0} == {
+        "entries": 2,
+        "bytes": 0,
+        "hits": 2,
+        "misses": 1,
+        "evictions": 1,
+        "hit_rate": 0.667,
+    }
+
+
+def test_memoize_skips_calls_with_the_same_key(tmp_path):
+    """
+    Test a call is only run again when its arguments or its version change
+    """
+    calls = []
+    store = ResultStore(tmp_path)
+
+    def double(x):
+        calls.append(x)
+        return {"x": x * 2}
+
+    assert memoize(store)(double)(2) == {"x": 4}
+    assert memoize(store)(double)(2) == {"x": 4}
+    assert memoize(store)(double)(3) == {"x": 6}
+    assert memoize(store, version="2")(double)(3) == {"x": 6}
+
+    assert calls == [2, 3, 3]
+    assert memoize_key(double, (2,), {}) != memoize_key(double, (), {"x": 2})
+
+
+def test_memoized_task_depends_on_its_inlets(airflow_db, tmp_path):
+    """
+    Test a memoized task of a DAG run is skipped until its inlet is updated
+    """
+    store = ResultStore(tmp_path)
+    orders = asset("test_memoize.orders")
+    calls = []
+
+    @dag(schedule=None, start_date=pendulum.datetime(2024, 1, 1), catchup=False)
+    def test_memoize():
+        @task(outlets=[orders])
+        def load_orders():
+            pass
+
+        @task(inlets=[orders])
+        @memoize(store)
+        def order_features(day):
+            calls.append(day)
+            return day
+
+        load_orders() >> order_features("2024-01-01")
+
+    memoized_dag = test_memoize()
+    # The events of assets missing from the database are dropped
+    memoized_dag.sync_to_db()
+    features = memoized_dag.partial_subset("order_features", include_upstream=False)
+    features.test()
+    features.test()
+    # A new event of the orders asset
+    memoized_dag.test()
+    features.test()
+
+    assert calls == ["2024-01-01", "2024-01-01"]
+    assert (store.hits, store.misses) == (2, 2)
@@ -0,0 +1,115 @@
+import pstats
+import sys
+import tracemalloc
+from types import SimpleNamespace
+
+import pytest
+
+from airflow.models import DAG
+from airflow.operators.python import PythonOperator
+from common.profiling import profile_if_requested
+
+
+def allocate():
+    return [str(i) * 10 for i in range(20_000)]
+
+
+@pytest.fixture
+def log_folder(tmp_path, monkeypatch):
+    monkeypatch.setenv("AIRFLOW__LOGGING__BASE_LOG_FOLDER", str(tmp_path))
+    return tmp_path
+
+
+def run(task, params=None):
+    """
+    Run the task between its pre and post execute hooks like a worker does.
+    """
+    ti = SimpleNamespace(
+        key=(task.dag_id, task.task_id),
+        dag_id=task.dag_id,
+        task_id=task.task_id,
+        run_id="manual",
+        try_number=1,
+    )
+    context = {"ti": ti, "task": task, "params": params or {}}
+    if task._pre_execute_hook:
+        task._pre_execute_hook(context)
+    result = task.execute(context)
+    if task._post_execute_hook:
+        task._post_execute_hook(context, result)
+
+
+def test_tasks_not_profiled_by_default(log_folder):
+    """
+    Test the hooks are left untouched when profiling is not requested
+    """
+    with DAG("etl", schedule=None):
+        task = PythonOperator(task_id="load", python_callable=allocate)
+
+    profile_if_requested(task)
+
+    assert task._pre_execute_hook is None
+    assert task._post_execute_hook is None
+
+
+def test_profiled_from_env(log_folder, monkeypatch):
+    """
+    Test the env flag writes the profile next to the task log
+    """
+    monkeypatch.setenv("AIRFLOW_PROFILE_TASKS", "other.*, etl.lo*")
+    post_results = []
+    with DAG("etl", schedule=None):
+        task = PythonOperator(
+            task_id="load",
+            python_callable=allocate,
+            post_execute=lambda context, result: post_results.append(len(result)),
+        )
+
+    profile_if_requested(task)
+    run(task)
+
+    attempt = log_folder / "dag_id=etl" / "run_id=manual" / "task_id=load"
+    stats = pstats.Stats(str(attempt / "attempt=1.pstats"))
+    assert any(func[2] == "allocate" for func in stats.stats)
+    assert "test_profiling.py" in (attempt / "attempt=1.allocations.txt").read_text()
+    assert post_results == [20_000]
+
+
+def test_profiled_from_run_params(log_folder):
+    """
+    Test the profile param is read from the run's params
+    """
+    with DAG("etl", schedule=None, params={"profile": False}):
+        task = PythonOperator(task_id="load", python_callable=allocate)
+    profile_if_requested(task)
+    attempt = log_folder / "dag_id=etl" / "run_id=manual" / "task_id=load"
+
+    run(task, params={"profile": False})
+    assert not attempt.exists()
+
+    run(task, params={"profile": True})
+    assert (attempt / "attempt=1.pstats").exists()
+
+
+def test_failed_runs_profiled(log_folder, monkeypatch):
+    """
+    Test a run raising in execute still writes its profile and stops tracing
+    """
+    monkeypatch.setenv("AIRFLOW_PROFILE_TASKS", "etl.load")
+
+    def fail():
+        allocate()
+        raise ValueError("source unavailable")
+
+    with DAG("etl", schedule=None):
+        task = PythonOperator(task_id="load", python_callable=fail)
+    profile_if_requested(task)
+
+    with pytest.raises(ValueError, match="source unavailable"):
+        run(task)
+
+    attempt = log_folder / "dag_id=etl" / "run_id=manual" / "task_id=load"
+    stats = pstats.Stats(str(attempt / "attempt=1.pstats"))
+    assert any(func[2] == "fail" for func in stats.stats)
+    assert not tracemalloc.is_tracing()
+    assert sys.getprofile() is None
@@ -0,0 +1,24 @@
+import pytest
+
+from common.remote_logging import log_location, main
+
+
+def test_log_location():
+    """
+    Test the bucket and prefix are read from the remote base log folder
+    """
+    assert log_location("s3://airflow-logs/logs/") == ("airflow-logs", "logs")
+    assert log_location("s3://airflow-logs") == ("airflow-logs", "")
+    with pytest.raises(ValueError, match="not an s3"):
+        log_location("/opt/airflow/logs")
+
+
+def test_create_bucket_skipped_without_remote_logging(monkeypatch, capsys):
+    """
+    Test airflow-init does not need the bucket when remote logging is off
+    """
+    monkeypatch.setenv("AIRFLOW__LOGGING__REMOTE_LOGGING", "False")
+
+    main(["create-bucket"])
+
+    assert "Remote logging is off" in capsys.readouterr().out
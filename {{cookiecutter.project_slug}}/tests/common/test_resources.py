@@ -0,0 +1,98 @@
+import pytest
+
+from airflow.models import DAG, Pool
+from airflow.operators.empty import EmptyOperator
+from common.resources import (
+    PoolSpec,
+    ResourcesSpecError,
+    apply_priority_weight,
+    diff_pools,
+    parse_spec,
+    sync_pools,
+)
+
+SPEC = {
+    "pools": {
+        "default_pool": {"slots": 128, "description": "Default pool"},
+        "test_resources_api": {"slots": 2, "description": "Rate limited API"},
+    },
+    "queues": {"default": {}, "heavy": {"description": "Memory hungry tasks"}},
+    "priority_weights": [
+        {"task_id": "load_*", "queue": "heavy", "priority_weight": 20},
+        {"tag": "critical", "priority_weight": 10, "weight_rule": "absolute"},
+    ],
+}
+
+
+def test_parse_spec_rejects_invalid_specs():
+    """
+    Test the default pool, a queue and valid rules are required
+    """
+    with pytest.raises(ResourcesSpecError, match="default_pool"):
+        parse_spec({"pools": {}, "queues": {"default": {}}})
+    with pytest.raises(ResourcesSpecError, match="queue"):
+        parse_spec({"pools": SPEC["pools"]})
+    with pytest.raises(ResourcesSpecError, match="rule"):
+        parse_spec({**SPEC, "priority_weights": [{"owner": "x", "priority_weight": 1}]})
+
+
+def test_diff_pools():
+    """
+    Test only missing and changed pools are written
+    """
+    spec = parse_spec(SPEC)
+    current = {
+        "default_pool": PoolSpec("default_pool", 128, "Default pool"),
+        "legacy": PoolSpec("legacy", 1),
+    }
+
+    create, update, undeclared = diff_pools(spec, current)
+    assert [p.name for p in create] == ["test_resources_api"]
+    assert update == []
+    assert undeclared == ["legacy"]
+
+    current["test_resources_api"] = PoolSpec("test_resources_api", 5)
+    create, update, _ = diff_pools(spec, current)
+    assert create == []
+    assert update == [spec.pools["test_resources_api"]]
+
+
+def test_apply_priority_weight():
+    """
+    Test the first matching rule applies to tasks keeping the default weight
+    """
+    spec = parse_spec(SPEC)
+    with DAG("resources", schedule=None, tags=["critical"]):
+        load = EmptyOperator(task_id="load_orders", queue="heavy")
+        report = EmptyOperator(task_id="report")
+        explicit = EmptyOperator(task_id="explicit", priority_weight=3)
+
+    for task in (load, report, explicit):
+        apply_priority_weight(task, spec)
+
+    assert load.priority_weight == 20
+    assert report.priority_weight == 10
+    assert report.priority_weight_total == 10
+    assert explicit.priority_weight == 3
+
+
+def test_sync_pools_applies_only_the_diff(airflow_db):
+    """
+    Test syncing twice writes nothing the second time
+    """
+    spec = parse_spec(SPEC)
+    sync_pools(spec)
+    try:
+        create, update, _ = sync_pools(spec)
+        assert (create, update) == ([], [])
+
+        changed = parse_spec(
+            {**SPEC, "pools": {**SPEC["pools"], "test_resources_api": {"slots": 4}}}
+        )
+        create, update, _ = sync_pools(changed, dry_run=True)
+        assert [p.name for p in update] == ["test_resources_api"]
+        create, update, _ = sync_pools(changed)
+        assert [p.slots for p in update] == [4]
+        assert sync_pools(changed)[:2] == ([], [])
+    finally:
+        Pool.delete_pool("test_resources_api")
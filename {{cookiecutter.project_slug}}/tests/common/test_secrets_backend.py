@@ -0,0 +1,81 @@
+import json
+import os
+
+import pytest
+
+from common.secrets_backend import CachedLocalFilesystemBackend
+
+
+def write_json(path, content, mtime_offset=0):
+    path.write_text(json.dumps(content))
+    # Make the change visible even when written within the mtime resolution
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + mtime_offset))
+
+
+@pytest.fixture
+def secrets(tmp_path):
+    variables = tmp_path / "variables"
+    variables.mkdir()
+    write_json(variables / "a.json", {"bucket": "raw", "region": "eu"})
+    write_json(variables / "b.json", {"bucket": "curated"})
+    connections = tmp_path / "connections.json"
+    write_json(connections, {"warehouse": "postgres://user:pass@db:5432/dwh"})
+    return variables, connections
+
+
+def test_lookups_served_from_memory(secrets, monkeypatch):
+    """
+    Test files are parsed once and folders are merged in file name order
+    """
+    variables, connections = secrets
+    backend = CachedLocalFilesystemBackend(variables, connections, reload_interval=0)
+    parsed = []
+
+    def load_variables(path):
+        parsed.append(path)
+        with open(path) as f:
+            return json.load(f)
+
+    monkeypatch.setattr("common.secrets_backend.load_variables", load_variables)
+
+    for _ in range(5):
+        assert backend.get_variable("bucket") == "curated"
+        assert backend.get_variable("region") == "eu"
+        assert backend.get_variable("missing") is None
+    assert backend.get_connection("warehouse").host == "db"
+    assert backend.get_connection("missing") is None
+
+    assert len(parsed) == 2
+
+
+def test_files_reloaded_on_change(secrets):
+    """
+    Test changed, added and removed files are picked up
+    """
+    variables, _ = secrets
+    backend = CachedLocalFilesystemBackend(variables_file_path=variables)
+    backend.reload_interval = 0
+    assert backend.get_variable("bucket") == "curated"
+
+    write_json(variables / "b.json", {"bucket": "staged"}, mtime_offset=10**9)
+    assert backend.get_variable("bucket") == "staged"
+
+    write_json(variables / "c.json", {"owner": "data"})
+    assert backend.get_variable("owner") == "data"
+
+    (variables / "b.json").unlink()
+    assert backend.get_variable("bucket") == "raw"
+
+
+def test_invalid_file_keeps_previous_secrets(secrets):
+    """
+    Test a file broken while being edited does not drop the loaded secrets
+    """
+    variables, _ = secrets
+    backend = CachedLocalFilesystemBackend(variables, reload_interval=0)
+    assert backend.get_variable("region") == "eu"
+
+    (variables / "a.json").write_text("{not json")
+    os.utime(variables / "a.json", ns=(0, 10**9))
+    assert backend.get_variable("region") == "eu"
@@ -0,0 +1,100 @@
+import pytest
+
+from common.settings import SettingNotFound, Settings
+from tests.custom_dags.utils import parse_time_variable_gets
+
+
+@pytest.fixture
+def settings(tmp_path, monkeypatch):
+    """
+    Settings with a local secrets file and a counted Variables query.
+    """
+    secrets_file = tmp_path / "settings.yaml"
+    secrets_file.write_text("source_url: https://example.com\nbatch_size: 10\n")
+    settings = Settings(secrets_file, ttl=60)
+    settings.queries = 0
+
+    def fetch_variables():
+        settings.queries += 1
+        return {"batch_size": "20", "enabled": "false", "schema": '{"a": 1}'}
+
+    monkeypatch.setattr(settings, "_fetch_variables", fetch_variables)
+    return settings
+
+
+def test_resolution_order(settings, monkeypatch):
+    """
+    Test the environment wins over the secrets file, which wins over Variables
+    """
+    assert settings.get_int("batch_size") == 10
+    monkeypatch.setenv("AIRFLOW_VAR_BATCH_SIZE", "5")
+    assert settings.get_int("batch_size") == 5
+    assert settings.get("source_url") == "https://example.com"
+    assert settings.get_bool("enabled") is False
+    assert settings.get_json("schema") == {"a": 1}
+
+
+def test_variables_fetched_once_per_ttl(settings, monkeypatch):
+    """
+    Test many lookups cost a single Variables query until the cache expires
+    """
+    from airflow.models import Variable
+
+    missing = []
+    monkeypatch.setattr(
+        Variable, "get", lambda key, default_var=None: missing.append(key)
+    )
+    for _ in range(10):
+        settings.get_bool("enabled")
+        settings.get_json("schema")
+        assert settings.get("unknown", default="x") == "x"
+
+    assert settings.queries == 1
+    assert missing == ["unknown"]
+    with pytest.raises(SettingNotFound):
+        settings.get("unknown")
+
+    settings.ttl = -1
+    settings.get_bool("enabled")
+    assert settings.queries == 2
+
+
+def test_secrets_file_reloaded_on_change(settings):
+    """
+    Test the secrets file is read again once it is modified
+    """
+    assert settings.get("source_url") == "https://example.com"
+    settings.secrets_file.write_text("source_url: https://example.org\n")
+
+    assert settings.get("source_url") == "https://example.org"
+
+
+def test_parse_time_variable_gets():
+    """
+    Test only the Variable.get calls run at DAG parse time are reported
+    """
+    source = """
+from airflow.decorators import dag, task
+from airflow.models import Variable
+
+TOP_LEVEL = Variable.get("a")
+
+
+def helper(default=Variable.get("b")):
+    return Variable.get("c")
+
+
+@dag(schedule=None)
+def pipeline():
+    batch = Variable.get("d")
+
+    @task
+    def extract():
+        return Variable.get("e")
+
+    extract()
+
+
+pipeline()
+"""
+    assert parse_time_variable_gets(source) == [5, 8, 14]
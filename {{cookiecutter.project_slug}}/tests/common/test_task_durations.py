@@ -0,0 +1,148 @@
+import json
+import random
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import (
+    Column,
+    Float,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    create_engine,
+    select,
+)
+
+from airflow.utils import timezone
+from airflow.utils.sqlalchemy import UtcDateTime
+from common.task_durations import (
+    detect_regression,
+    duration_summary,
+    mann_whitney_p,
+    percentile,
+    update_summaries,
+)
+
+NOW = timezone.datetime(2024, 6, 1)
+
+
+task_instance = Table(
+    "task_instance",
+    MetaData(),
+    Column("dag_id", String(250)),
+    Column("task_id", String(250)),
+    Column("run_id", String(250)),
+    Column("map_index", Integer, default=-1),
+    Column("state", String(20)),
+    Column("duration", Float),
+    Column("end_date", UtcDateTime),
+)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'airflow.db'}")
+    task_instance.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def add_task_instances(engine, task_id, durations, start, state="success"):
+    with engine.begin() as conn:
+        conn.execute(
+            task_instance.insert(),
+            [
+                {
+                    "dag_id": "etl",
+                    "task_id": task_id,
+                    "run_id": f"run_{start}_{i}",
+                    "state": state,
+                    "duration": duration,
+                    "end_date": start + timedelta(minutes=i),
+                }
+                for i, duration in enumerate(durations)
+            ],
+        )
+
+
+def test_percentile_and_mann_whitney():
+    """
+    Test the statistics against known values
+    """
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile(range(101), 95) == 95
+
+    random.seed(1)
+    baseline = [random.gauss(60, 5) for _ in range(50)]
+    assert mann_whitney_p([random.gauss(60, 5) for _ in range(5)], baseline) > 0.05
+    assert mann_whitney_p([180, 175, 190, 185, 170], baseline) < 0.001
+    assert mann_whitney_p([5, 5, 5, 5, 5], [5] * 30) == 1.0
+
+
+def test_detect_regression():
+    """
+    Test only a significant and large enough slowdown is flagged
+    """
+    random.seed(2)
+    baseline = [random.gauss(60, 5) for _ in range(40)]
+
+    assert detect_regression("etl", "load", baseline[:30] + baseline[30:35]) is None
+    assert detect_regression("etl", "load", baseline + [70, 72, 68, 71, 69]) is None
+    regression = detect_regression("etl", "load", baseline + [180, 175, 190, 185, 170])
+    assert regression.slowdown == pytest.approx(3, rel=0.1)
+
+
+def test_update_summaries_reads_incrementally(engine):
+    """
+    Test each run only reads the task instances that ended since the previous one
+    """
+    random.seed(3)
+    start = NOW - timedelta(days=1)
+    add_task_instances(engine, "load", [random.gauss(60, 5) for _ in range(30)], start)
+    add_task_instances(engine, "load", [1000], start, state="failed")
+
+    report = update_summaries(engine, now=NOW)
+    assert (report["rows_read"], report["regressions"]) == (30, [])
+    assert update_summaries(engine, now=NOW)["rows_read"] == 0
+
+    add_task_instances(engine, "load", [180, 175, 190, 185, 170], NOW)
+    report = update_summaries(engine, now=NOW + timedelta(hours=1))
+    assert report["rows_read"] == 5
+    assert [r["task_id"] for r in report["regressions"]] == ["load"]
+
+    with engine.connect() as conn:
+        summary = conn.execute(select(duration_summary)).one()
+    assert summary.runs == 35
+    assert len(json.loads(summary.samples)) == 35
+    assert summary.p50 < summary.p95
+
+
+def test_batches_do_not_split_equal_end_dates(engine):
+    """
+    Test rows ending at the same time are not skipped across batches
+    """
+    start = NOW - timedelta(hours=1)
+    add_task_instances(engine, "a", [1, 2, 3], start)
+    add_task_instances(engine, "b", [1, 2, 3], start)
+    add_task_instances(engine, "c", [1, 2, 3, 4, 5, 6], start)
+
+    assert update_summaries(engine, now=NOW, batch_size=4)["rows_read"] == 12
+
+
+def test_late_task_instances_are_folded_once(engine):
+    """
+    Test a task instance committed after the watermark passed its end_date is
+    folded, and the ones read again before the watermark are not counted twice
+    """
+    add_task_instances(engine, "load", [1, 2, 3], NOW - timedelta(minutes=10))
+    assert update_summaries(engine, now=NOW)["rows_read"] == 3
+
+    add_task_instances(engine, "late", [4], NOW - timedelta(minutes=9))
+    report = update_summaries(engine, now=NOW + timedelta(minutes=5))
+    assert (report["rows_read"], report["tasks_updated"]) == (1, 1)
+    assert update_summaries(engine, now=NOW + timedelta(hours=1))["rows_read"] == 0
+
+    with engine.connect() as conn:
+        runs = {row.task_id: row.runs for row in conn.execute(select(duration_summary))}
+    assert runs == {"load": 3, "late": 1}
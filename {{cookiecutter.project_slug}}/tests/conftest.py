@@ -0,0 +1,42 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Airflow puts the DAG folder on sys.path, do the same so the tests import the
+# DAG library the way DAG files do, e.g. ``from common.dbt_project import ...``
+sys.path.insert(0, str(PROJECT_ROOT / "airflow" / "dags"))
+
+# The tests run against their own SQLite metadata database, migrated once by the
+# ``airflow_db`` fixture, instead of the one of the developer's AIRFLOW_HOME.
+# Airflow reads its configuration when imported, so before the test modules.
+AIRFLOW_TEST_HOME = Path(tempfile.mkdtemp(prefix="airflow-tests-"))
+atexit.register(shutil.rmtree, AIRFLOW_TEST_HOME, ignore_errors=True)
+os.environ["AIRFLOW_HOME"] = str(AIRFLOW_TEST_HOME)
+os.environ["AIRFLOW__DATABASE__SQL_ALCHEMY_CONN"] = (
+    f"sqlite:///{AIRFLOW_TEST_HOME / 'airflow.db'}"
+)
+os.environ.setdefault(
+    "AIRFLOW__CORE__DAGS_FOLDER", str(PROJECT_ROOT / "airflow" / "dags")
+)
+os.environ.setdefault(
+    "AIRFLOW__CORE__PLUGINS_FOLDER", str(PROJECT_ROOT / "airflow" / "plugins")
+)
+os.environ.setdefault("AIRFLOW__CORE__LOAD_EXAMPLES", "False")
+os.environ.setdefault("AIRFLOW__CORE__UNIT_TEST_MODE", "True")
+
+
+@pytest.fixture(scope="session")
+def airflow_db():
+    """
+    Migrate the metadata database of the tests once for the session.
+    """
+    from airflow.utils import db
+
+    db.resetdb()
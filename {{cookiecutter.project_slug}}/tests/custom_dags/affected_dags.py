@@ -0,0 +1,380 @@
+"""
+Work out which DAG files are affected by a change.
+
+A DAG file is affected when it changed itself or when it imports, directly
+or through other modules, a module that changed. Imports are found through
+a static import graph of the python files under the DAG folders, so nothing
+is imported to compute it.
+
+The asset checks span several DAGs: a producer dropping an outlet breaks its
+unchanged consumers. ``asset_check_files`` adds the DAG files mentioning the
+assets of the change, found statically too, so the whole DAG folder is not
+parsed to check them.
+
+Run it against a git ref to list the affected DAG files::
+
+    python -m tests.custom_dags.affected_dags origin/master
+"""
+
+import argparse
+import ast
+import fnmatch
+import subprocess
+from collections import defaultdict, deque
+from pathlib import Path
+
+# Calls creating an asset, on Airflow 2 or 3.
+ASSET_FACTORIES = {"asset", "Asset", "Dataset"}
+ASSET_URI_SCHEME = "asset"
+
+# Changes to these files can affect every DAG and force a full validation run.
+FULL_RUN_PATTERNS = (
+    "pyproject.toml",
+    "tox.ini",
+    "tests/custom_dags/*",
+    "airflow/plugins/*",
+    "airflow/config/*",
+)
+
+
+def repo_root():
+    """
+    Return the root of the git repository.
+    """
+    output = subprocess.run(
+        ["git", "rev-parse", "--show-toplevel"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return Path(output.strip())
+
+
+def merge_base(base_ref, root):
+    return subprocess.run(
+        ["git", "merge-base", base_ref, "HEAD"],
+        cwd=root,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+
+def changed_files(base_ref, root):
+    """
+    Return the files changed since the merge base of ``base_ref`` and
+    ``HEAD``, relative to the repository root.
+
+    A renamed file is listed under its old and new paths, the importers of
+    the old module are affected too.
+    """
+    output = subprocess.run(
+        ["git", "diff", "--name-only", "--no-renames", merge_base(base_ref, root)],
+        cwd=root,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return [Path(line) for line in output.splitlines() if line]
+
+
+def might_contain_dag(path):
+    """
+    Same heuristic as Airflow's safe mode: the file mentions both
+    ``airflow`` and ``dag``.
+    """
+    content = path.read_bytes().lower()
+    return b"airflow" in content and b"dag" in content
+
+
+def module_name(path, roots):
+    """
+    Return the dotted module name of a file found under one of the roots.
+    """
+    for root in roots:
+        if path.is_relative_to(root):
+            parts = path.relative_to(root).with_suffix("").parts
+            if parts[-1] == "__init__":
+                parts = parts[:-1]
+            return ".".join(parts)
+    return None
+
+
+def imported_modules(path, name):
+    """
+    Yield the names of all modules imported by a python file, including the
+    parent packages whose ``__init__`` runs on import.
+    """
+    tree = ast.parse(path.read_bytes(), filename=str(path))
+    package = name if path.name == "__init__.py" else name.rpartition(".")[0]
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            targets = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                parts = package.split(".")
+                anchor = parts[: len(parts) - node.level + 1]
+                base = ".".join(filter(None, [*anchor, base]))
+            targets = [base, *(f"{base}.{alias.name}" for alias in node.names)]
+        else:
+            continue
+
+        for target in targets:
+            parts = target.split(".")
+            for i in range(1, len(parts) + 1):
+                yield ".".join(parts[:i])
+
+
+def build_import_graph(roots):
+    """
+    Map every module name imported under the roots to the files importing it.
+    """
+    importers = defaultdict(set)
+    for root in roots:
+        for path in root.rglob("*.py"):
+            name = module_name(path, [root])
+            try:
+                imports = set(imported_modules(path, name))
+            except SyntaxError:
+                # Let the validation tests report the broken file.
+                continue
+            for imported in imports - {name}:
+                importers[imported].add(path)
+    return importers
+
+
+def affected_dag_files(changed, dags_folder, roots=None, root=None):
+    """
+    Return the sorted DAG files affected by the changed files, or ``None``
+    when the change requires validating every DAG.
+
+    :param changed: changed file paths, relative to ``root``.
+    :param dags_folder: the Airflow DAG folder.
+    :param roots: the folders on ``sys.path`` holding importable modules,
+        defaults to the DAG folder.
+    :param root: repository root the changed paths are relative to.
+    """
+    root = Path(root or repo_root()).resolve()
+    dags_folder = Path(dags_folder).resolve()
+    roots = [Path(r).resolve() for r in roots or [dags_folder]]
+
+    seeds = set()
+    for relative in changed:
+        if any(fnmatch.fnmatch(str(relative), p) for p in FULL_RUN_PATTERNS):
+            return None
+        path = root / relative
+        if not any(path.is_relative_to(r) for r in roots):
+            continue
+        if path.suffix != ".py":
+            # Data files next to the DAGs (SQL, YAML, ...) can be read by any DAG.
+            return None
+        # Deleted modules are kept so the files importing them get validated.
+        seeds.add(path)
+
+    importers = build_import_graph(roots)
+    affected = set(seeds)
+    queue = deque(seeds)
+    while queue:
+        name = module_name(queue.popleft(), roots)
+        for importer in importers.get(name, ()):
+            if importer not in affected:
+                affected.add(importer)
+                queue.append(importer)
+
+    return sorted(
+        path
+        for path in affected
+        if path.exists()
+        and path.is_relative_to(dags_folder)
+        and might_contain_dag(path)
+    )
+
+
+def source_at(ref, relative, root):
+    """
+    Return the content of a file at a git ref, ``None`` if it did not exist.
+    """
+    result = subprocess.run(
+        ["git", "show", f"{ref}:{Path(relative).as_posix()}"],
+        cwd=root,
+        capture_output=True,
+        text=True,
+    )
+    return result.stdout if result.returncode == 0 else None
+
+
+def _key_pattern(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.JoinedStr):
+        return "".join(
+            part.value if isinstance(part, ast.Constant) else "*"
+            for part in node.values
+        )
+    # A name or an expression, the asset can be any
+    return "*"
+
+
+def _asset_calls(node, module_level):
+    for child in ast.iter_child_nodes(node):
+        if module_level and isinstance(
+            child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)
+        ):
+            continue
+        if isinstance(child, ast.Call) and _call_name(child) in ASSET_FACTORIES:
+            yield child
+        yield from _asset_calls(child, module_level)
+
+
+def asset_keys(source, module_level=False):
+    """
+    Return the names and URIs of the assets a python source creates, as
+    fnmatch patterns: the formatted parts of f-strings and the values that
+    are not literals match anything.
+
+    :param module_level: only the assets created outside of functions, the
+        ones a module shares with its importers.
+    """
+    tree = source if isinstance(source, ast.AST) else ast.parse(source)
+    keys = set()
+    for call in _asset_calls(tree, module_level):
+        values = [
+            *call.args[:2],
+            *(k.value for k in call.keywords if k.arg in ("name", "uri")),
+        ]
+        keys.update(_key_pattern(value) for value in values or [None])
+    return keys
+
+
+def _call_name(call):
+    func = call.func
+    return func.attr if isinstance(func, ast.Attribute) else getattr(func, "id", "")
+
+
+def _source_asset_keys(source):
+    # Only the DAG files create the assets in their functions, elsewhere they
+    # are the asset factories or scripts
+    tree = ast.parse(source)
+    defines_dag = any(
+        isinstance(node, ast.Call) and _call_name(node) in ("DAG", "dag")
+        for node in ast.walk(tree)
+    )
+    return asset_keys(tree, module_level=not defines_dag)
+
+
+def _file_asset_keys(roots):
+    """
+    Map the python files under the roots to the asset keys they create and
+    the ones the modules they import, directly or not, create at module level.
+    """
+    paths = {}
+    for root in roots:
+        for path in root.rglob("*.py"):
+            paths[module_name(path, [root])] = path
+
+    own, shared, imports = {}, {}, {}
+    for name, path in paths.items():
+        try:
+            source = path.read_bytes()
+            own[path] = _source_asset_keys(source)
+            shared[path] = asset_keys(source, module_level=True)
+            imports[path] = {
+                paths[module]
+                for module in imported_modules(path, name)
+                if module in paths
+            } - {path}
+        except SyntaxError:
+            own[path], shared[path], imports[path] = set(), set(), set()
+
+    keys = {}
+    for path in own:
+        seen, pending = {path}, [path]
+        while pending:
+            for imported in imports[pending.pop()]:
+                if imported not in seen:
+                    seen.add(imported)
+                    pending.append(imported)
+        keys[path] = own[path].union(*(shared[p] for p in seen))
+    return keys
+
+
+def keys_overlap(first, second):
+    return fnmatch.fnmatchcase(first, second) or fnmatch.fnmatchcase(second, first)
+
+
+def uri_matches(uri, patterns):
+    """
+    Whether an asset URI is one of the asset key patterns, given by name or
+    by URI.
+    """
+    uri = uri.rstrip("/")
+    return any(
+        fnmatch.fnmatchcase(uri, pattern.rstrip("/"))
+        or fnmatch.fnmatchcase(uri, f"{ASSET_URI_SCHEME}://{pattern}".rstrip("/"))
+        for pattern in patterns
+    )
+
+
+def asset_check_files(affected, changed, dags_folder, roots=None, root=None, old=None):
+    """
+    Return the DAG files to parse to check the assets of a change, with the
+    asset key patterns to check.
+
+    The keys are the ones of the affected DAG files and of the changed python
+    files, before and after the change, so an asset an unchanged DAG consumes
+    and a changed producer stopped updating is checked. The files are the
+    affected ones and the DAG files mentioning one of the keys, the producers
+    and consumers of those assets.
+
+    :param old: called with a changed path, relative to ``root``, returns its
+        source before the change or ``None``.
+    """
+    root = Path(root or repo_root()).resolve()
+    dags_folder = Path(dags_folder).resolve()
+    roots = [Path(r).resolve() for r in roots or [dags_folder]]
+    file_keys = _file_asset_keys(roots)
+
+    patterns = set()
+    for path in affected:
+        patterns |= file_keys.get(Path(path).resolve(), set())
+    for relative in changed:
+        path = root / relative
+        if path.suffix != ".py" or not any(path.is_relative_to(r) for r in roots):
+            continue
+        patterns |= file_keys.get(path, set())
+        source = old(relative) if old else None
+        if source:
+            try:
+                patterns |= _source_asset_keys(source)
+            except SyntaxError:
+                patterns.add("*")
+
+    files = set(affected)
+    for path, keys in file_keys.items():
+        if (
+            path.is_relative_to(dags_folder)
+            and any(keys_overlap(k, p) for k in keys for p in patterns)
+            and might_contain_dag(path)
+        ):
+            files.add(path)
+    return sorted(files), patterns
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("base_ref", help="git ref to diff against")
+    parser.add_argument("--dags-folder", default="airflow/dags")
+    args = parser.parse_args(argv)
+
+    root = repo_root()
+    files = affected_dag_files(changed_files(args.base_ref, root), args.dags_folder)
+    if files is None:
+        print("ALL")
+    else:
+        print("\n".join(str(path.relative_to(root)) for path in files))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Run every DAG end to end with ``dag.test()`` for the smoke tests.
+
+DAGs run in parallel in ``DAG_RUN_WORKERS`` processes, by default one per CPU.
+Each process works on its own copy of a migrated SQLite metadata database, so
+the runs neither share state nor touch the configured database. The database
+is migrated once per Airflow version and reused by the following sessions.
+
+Operators reaching external systems are replaced by the fakes registered in
+``fakes.py``. The state and the duration of every task are written to
+``DAG_RUN_REPORT``, the DAGs slowest in the previous report start first.
+
+Airflow is only imported in the worker processes once their database is set,
+the module level imports are kept to the standard library and pluggy, which
+Airflow's listeners are built on, for that reason.
+"""
+
+import contextlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pluggy
+
+log = logging.getLogger(__name__)
+# airflow.listeners.hookimpl, without importing Airflow
+hookimpl = pluggy.HookimplMarker("airflow")
+
+REPORT_FILE = Path(os.environ.get("DAG_RUN_REPORT", "junitxml_report/dag_runs.json"))
+TIMEOUT = int(os.environ.get("DAG_RUN_TIMEOUT", 120))
+OUTPUT_TAIL = 5000
+
+
+def template_database() -> Path:
+    """
+    Return a migrated SQLite database for the installed Airflow version.
+    """
+    from airflow import __version__
+
+    path = Path(tempfile.gettempdir()) / f"airflow-dag-runs-{__version__}.db"
+    if path.exists():
+        return path
+    migrating = path.with_suffix(f".{os.getpid()}.tmp")
+    env = {
+        **os.environ,
+        "AIRFLOW__DATABASE__SQL_ALCHEMY_CONN": f"sqlite:///{migrating}",
+        "AIRFLOW__CORE__LOAD_EXAMPLES": "False",
+    }
+    subprocess.run(
+        [sys.executable, "-m", "airflow", "db", "migrate"],
+        env=env,
+        check=True,
+        capture_output=True,
+    )
+    os.replace(migrating, path)
+    return path
+
+
+class TaskTimer:
+    """
+    Listener timing the task runs, ``dag.test()`` leaves their start date empty.
+    """
+
+    def __init__(self):
+        self.started = {}
+        self.seconds = {}
+
+    @hookimpl
+    def on_task_instance_running(self, task_instance):
+        key = (task_instance.task_id, task_instance.map_index)
+        self.started[key] = time.perf_counter()
+
+    def _stop(self, task_instance):
+        key = (task_instance.task_id, task_instance.map_index)
+        if key in self.started:
+            self.seconds[key] = round(time.perf_counter() - self.started.pop(key), 3)
+
+    @hookimpl
+    def on_task_instance_success(self, task_instance):
+        self._stop(task_instance)
+
+    @hookimpl
+    def on_task_instance_failed(self, task_instance):
+        self._stop(task_instance)
+
+
+def _init_worker(template, folder):
+    database = Path(folder) / f"airflow-{os.getpid()}.db"
+    shutil.copy(template, database)
+    os.environ["AIRFLOW__DATABASE__SQL_ALCHEMY_CONN"] = f"sqlite:///{database}"
+
+
+def run_dag(dag_id, fileloc, timeout=TIMEOUT) -> dict:
+    """
+    Run the DAG in the worker process and return its state and task timings.
+    """
+    from airflow.listeners.listener import get_listener_manager
+    from airflow.models import DagBag
+    from airflow.utils.timeout import timeout as time_limit
+
+    from .fakes import install_fakes
+
+    result = {"dag_id": dag_id, "state": None, "faked": [], "tasks": []}
+    output = io.StringIO()
+    timer = TaskTimer()
+    get_listener_manager().add_listener(timer)
+    started = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            dag = DagBag(fileloc, include_examples=False).get_dag(dag_id)
+            result["faked"] = install_fakes(dag)
+            with time_limit(timeout, f"{dag_id} did not finish in {timeout}s"):
+                dag_run = dag.test()
+            result["state"] = str(dag_run.state)
+            result["tasks"] = [
+                {
+                    "task_id": ti.task_id,
+                    "map_index": ti.map_index,
+                    "state": str(ti.state),
+                    "seconds": timer.seconds.get((ti.task_id, ti.map_index)),
+                }
+                for ti in dag_run.get_task_instances()
+            ]
+    except Exception:
+        result["error"] = traceback.format_exc()
+    finally:
+        get_listener_manager().pm.unregister(timer)
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    if result["state"] != "success":
+        result["output"] = output.getvalue()[-OUTPUT_TAIL:]
+    return result
+
+
+def previous_durations(report_file=REPORT_FILE) -> dict:
+    try:
+        with open(report_file) as f:
+            return {r["dag_id"]: r["seconds"] for r in json.load(f)["dag_runs"]}
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def run_dags(dags, workers=None, report_file=REPORT_FILE) -> dict:
+    """
+    Run the ``(dag_id, fileloc)`` DAGs in parallel and return their results by
+    DAG id.
+    """
+    dags = list(dags)
+    if not dags:
+        return {}
+    workers = workers or int(os.environ.get("DAG_RUN_WORKERS", os.cpu_count()))
+    durations = previous_durations(report_file)
+    dags.sort(key=lambda dag: durations.get(dag[0], float("inf")), reverse=True)
+
+    started = time.perf_counter()
+    template = template_database()
+    with (
+        tempfile.TemporaryDirectory() as folder,
+        ProcessPoolExecutor(
+            max_workers=min(workers, len(dags)),
+            # A fresh interpreter per worker, Airflow reads the database
+            # connection when it is imported
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(template, folder),
+        ) as pool,
+    ):
+        futures = {
+            dag_id: pool.submit(run_dag, dag_id, fileloc) for dag_id, fileloc in dags
+        }
+        results = {dag_id: future.result() for dag_id, future in futures.items()}
+
+    elapsed = round(time.perf_counter() - started, 3)
+    report_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(report_file, "w") as f:
+        json.dump({"seconds": elapsed, "dag_runs": list(results.values())}, f, indent=2)
+    log.warning("Ran %d DAGs in %.1fs, timings in %s", len(dags), elapsed, report_file)
+    return results
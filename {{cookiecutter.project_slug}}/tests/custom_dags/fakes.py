@@ -0,0 +1,81 @@
+"""
+Fakes of the operators reaching external systems, used when the DAGs run in
+the tests, see ``dag_runs.py``.
+
+A fake replaces the ``execute`` of the operator class registered for it and of
+its subclasses, what it returns is pushed as the task's XCom::
+
+    @fake("airflow.providers.http.operators.http.HttpOperator")
+    def http_response(task, context):
+        return '{"status": "ok"}'
+"""
+
+FAKES = {}
+
+
+def fake(*class_paths):
+    """
+    Register the decorated function as the fake of the operator classes.
+    """
+
+    def register(function):
+        for path in class_paths:
+            FAKES[path] = function
+        return function
+
+    return register
+
+
+def class_path(cls) -> str:
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def fake_for(operator_class):
+    for cls in operator_class.__mro__:
+        function = FAKES.get(class_path(cls))
+        if function is not None:
+            return function
+    return None
+
+
+def _faked_execute(function):
+    # Airflow passes a sentinel keyword to the execute of operator classes
+    def execute(self, context, **kwargs):
+        self.log.info("Running the fake of %s", class_path(type(self)))
+        return function(self, context)
+
+    execute.fake = function
+    return execute
+
+
+def install_fakes(dag) -> list[str]:
+    """
+    Replace the ``execute`` of the faked operators of the DAG, for the whole
+    process, and return the ids of the faked tasks.
+    """
+    faked = []
+    for task in dag.tasks:
+        # Mapped tasks create their operators when they run
+        operator_class = getattr(task, "operator_class", type(task))
+        if not isinstance(operator_class, type):
+            continue
+        function = fake_for(operator_class)
+        if function is None:
+            continue
+        if getattr(operator_class.execute, "fake", None) is not function:
+            operator_class.execute = _faked_execute(function)
+        faked.append(task.task_id)
+    return faked
+
+
+@fake(
+    "common.dbt_project.DbtModelOperator",
+    "common.http_ingestion.HttpIngestOperator",
+    "common.incremental.IncrementalLoadOperator",
+    "airflow.providers.common.sql.operators.sql.SQLExecuteQueryOperator",
+    "airflow.providers.http.operators.http.HttpOperator",
+    "airflow.providers.http.sensors.http.HttpSensor",
+    "airflow.sensors.external_task.ExternalTaskSensor",
+)
+def no_op(task, context):
+    return None
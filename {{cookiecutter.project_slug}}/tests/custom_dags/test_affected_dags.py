@@ -0,0 +1,171 @@
+import subprocess
+from pathlib import Path
+
+from .affected_dags import (
+    affected_dag_files,
+    asset_check_files,
+    asset_keys,
+    changed_files,
+)
+
+DAG_SOURCE = "from airflow import DAG\n{imports}\n"
+
+
+def write_tree(root, files):
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+
+def test_changed_dag_file_is_affected(tmp_path):
+    """
+    Test a changed DAG file is validated on its own
+    """
+    write_tree(
+        tmp_path,
+        {
+            "dags/a.py": DAG_SOURCE.format(imports=""),
+            "dags/b.py": DAG_SOURCE.format(imports=""),
+        },
+    )
+
+    affected = affected_dag_files([Path("dags/a.py")], tmp_path / "dags", root=tmp_path)
+
+    assert affected == [tmp_path / "dags/a.py"]
+
+
+def test_dags_importing_changed_module_are_affected(tmp_path):
+    """
+    Test DAGs importing a changed common module, directly or not, are validated
+    """
+    write_tree(
+        tmp_path,
+        {
+            "dags/common/__init__.py": "",
+            "dags/common/hooks.py": "X = 1\n",
+            "dags/common/operators.py": "from .hooks import X\n",
+            "dags/direct.py": DAG_SOURCE.format(imports="from common import hooks"),
+            "dags/indirect.py": DAG_SOURCE.format(
+                imports="from common.operators import X"
+            ),
+            "dags/unrelated.py": DAG_SOURCE.format(imports="import json"),
+        },
+    )
+
+    affected = affected_dag_files(
+        [Path("dags/common/hooks.py")], tmp_path / "dags", root=tmp_path
+    )
+
+    assert affected == [tmp_path / "dags/direct.py", tmp_path / "dags/indirect.py"]
+
+
+def test_deleted_module_affects_importers(tmp_path):
+    """
+    Test DAGs importing a deleted module are validated
+    """
+    write_tree(
+        tmp_path,
+        {"dags/uses_gone.py": DAG_SOURCE.format(imports="import gone")},
+    )
+
+    affected = affected_dag_files(
+        [Path("dags/gone.py")], tmp_path / "dags", root=tmp_path
+    )
+
+    assert affected == [tmp_path / "dags/uses_gone.py"]
+
+
+def test_shared_files_force_full_run(tmp_path):
+    """
+    Test changes to shared configuration or data files validate every DAG
+    """
+    write_tree(tmp_path, {"dags/a.py": DAG_SOURCE.format(imports="")})
+
+    assert (
+        affected_dag_files([Path("tox.ini")], tmp_path / "dags", root=tmp_path) is None
+    )
+    assert (
+        affected_dag_files([Path("dags/sql/q.sql")], tmp_path / "dags", root=tmp_path)
+        is None
+    )
+
+
+def test_unrelated_change_affects_nothing(tmp_path):
+    """
+    Test changes outside the DAG folders do not trigger any validation
+    """
+    write_tree(tmp_path, {"dags/a.py": DAG_SOURCE.format(imports="")})
+
+    assert (
+        affected_dag_files([Path("README.md")], tmp_path / "dags", root=tmp_path) == []
+    )
+
+
+def test_asset_keys():
+    """
+    Test the asset keys are extracted statically, as patterns
+    """
+    source = (
+        "from common.assets import asset\n"
+        "ORDERS = asset('warehouse.orders')\n"
+        "def loads(table):\n"
+        "    return [asset(f'warehouse.{table}'), Dataset(uri=table)]\n"
+    )
+
+    assert asset_keys(source) == {"warehouse.orders", "warehouse.*", "*"}
+    assert asset_keys(source, module_level=True) == {"warehouse.orders"}
+
+
+def test_consumers_of_changed_producer_are_checked(tmp_path):
+    """
+    Test the unchanged consumers of an asset a changed producer no longer
+    updates are parsed to check it
+    """
+    consumer = DAG_SOURCE.format(imports="from common.assets import asset")
+    write_tree(
+        tmp_path,
+        {
+            "dags/common/__init__.py": "",
+            "dags/common/assets.py": "def asset(name): ...\n",
+            "dags/producer.py": consumer,
+            "dags/consumer.py": consumer + "schedule = [asset('warehouse.orders')]\n",
+            "dags/unrelated.py": consumer + "schedule = [asset('warehouse.items')]\n",
+        },
+    )
+    old = consumer + "outlets = [asset('warehouse.orders')]\n"
+    changed = [Path("dags/producer.py")]
+    affected = affected_dag_files(changed, tmp_path / "dags", root=tmp_path)
+
+    files, patterns = asset_check_files(
+        affected, changed, tmp_path / "dags", root=tmp_path, old=lambda path: old
+    )
+
+    assert files == [tmp_path / "dags/consumer.py", tmp_path / "dags/producer.py"]
+    assert patterns == {"warehouse.orders"}
+
+
+def test_renamed_module_lists_both_paths(tmp_path):
+    """
+    Test a renamed module is changed under its old path too, so the DAGs
+    still importing it are validated
+    """
+    write_tree(tmp_path, {"dags/common/x.py": "X = 1\n"})
+
+    def git(*args):
+        subprocess.run(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+            cwd=tmp_path,
+            check=True,
+            capture_output=True,
+        )
+
+    git("init", "-q")
+    git("add", "-A")
+    git("commit", "-qm", "base")
+    git("mv", "dags/common/x.py", "dags/common/y.py")
+    git("commit", "-qm", "rename")
+
+    changed = changed_files("HEAD~1", tmp_path)
+
+    assert sorted(changed) == [Path("dags/common/x.py"), Path("dags/common/y.py")]
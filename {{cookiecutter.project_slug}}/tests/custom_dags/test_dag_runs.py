@@ -0,0 +1,61 @@
+import functools
+
+import pytest
+
+from .dag_runs import run_dags
+from .fakes import FAKES, install_fakes
+from .utils import get_dags
+
+# Add the ids of the DAGs that cannot run in the tests, even with fakes
+SKIPPED_DAG_RUNS = set()
+
+
+@functools.cache
+def dag_runs():
+    """
+    Run all the DAGs once for the whole test session.
+    """
+    return run_dags(
+        (dag_id, dag.fileloc)
+        for dag_id, dag, _ in get_dags()
+        if dag_id not in SKIPPED_DAG_RUNS
+    )
+
+
+@pytest.mark.parametrize(
+    "dag_id,dag,fileloc", get_dags(), ids=[x[2] for x in get_dags()]
+)
+def test_dag_runs(dag_id, dag, fileloc):
+    """
+    Test every DAG runs successfully end to end with dag.test()
+    """
+    if dag_id in SKIPPED_DAG_RUNS:
+        pytest.skip(f"{dag_id} is in SKIPPED_DAG_RUNS")
+    result = dag_runs()[dag_id]
+
+    assert "error" not in result, f"{dag_id} did not run:\n{result['error']}"
+    failed = [t["task_id"] for t in result["tasks"] if t["state"] != "success"]
+    assert result["state"] == "success", (
+        f"{dag_id} ended {result['state']}, tasks {failed} did not succeed:\n"
+        f"{result['output']}"
+    )
+
+
+def test_fakes_replace_execute(monkeypatch):
+    """
+    Test the fake of an operator class also replaces its subclasses' execute
+    """
+    from airflow.models.dag import DAG
+    from airflow.operators.bash import BashOperator
+
+    class Subclass(BashOperator):
+        pass
+
+    monkeypatch.setitem(
+        FAKES, "airflow.operators.bash.BashOperator", lambda task, context: "fake"
+    )
+    with DAG("fakes", schedule=None) as dag:
+        Subclass(task_id="faked", bash_command="exit 1")
+
+    assert install_fakes(dag) == ["faked"]
+    assert dag.get_task("faked").execute({}) == "fake"
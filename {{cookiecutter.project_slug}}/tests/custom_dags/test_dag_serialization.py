@@ -0,0 +1,123 @@
+"""
+Budget checks on the serialized form of every DAG.
+
+The scheduler, the dag-processor and the UI all work from the serialized
+DAG, so these tests serialize each DAG the same way the scheduler does and
+fail the ones that grow past the configured budgets. Budgets can be
+overridden with ``DAG_BUDGET_*`` environment variables and a per-DAG report
+is written to ``DAG_BUDGET_REPORT``.
+"""
+
+import json
+import os
+from collections import deque
+from pathlib import Path
+
+import pytest
+
+from airflow.serialization.serialized_objects import SerializedDAG
+
+from .utils import get_dags
+
+DAG_BUDGETS = {
+    "serialized_bytes": int(
+        os.environ.get("DAG_BUDGET_MAX_SERIALIZED_BYTES", 1024 * 1024)
+    ),
+    "task_count": int(os.environ.get("DAG_BUDGET_MAX_TASKS", 500)),
+    "edge_count": int(os.environ.get("DAG_BUDGET_MAX_EDGES", 2000)),
+    "graph_depth": int(os.environ.get("DAG_BUDGET_MAX_DEPTH", 50)),
+    "max_template_field_bytes": int(
+        os.environ.get("DAG_BUDGET_MAX_TEMPLATE_FIELD_BYTES", 64 * 1024)
+    ),
+}
+
+REPORT_PATH = Path(
+    os.environ.get("DAG_BUDGET_REPORT", "junitxml_report/dag_budget_report.json")
+)
+
+
+def graph_depth(dag):
+    """
+    Return the number of tasks on the longest dependency chain of a DAG.
+    """
+    indegree = {task.task_id: len(task.upstream_task_ids) for task in dag.tasks}
+    level = dict.fromkeys(indegree, 1)
+    queue = deque(task_id for task_id, degree in indegree.items() if degree == 0)
+    while queue:
+        task_id = queue.popleft()
+        for child in dag.task_dict[task_id].downstream_task_ids:
+            level[child] = max(level[child], level[task_id] + 1)
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                queue.append(child)
+    return max(level.values(), default=0)
+
+
+def template_field_sizes(serialized):
+    """
+    Return the serialized size in bytes of every templated field,
+    keyed by ``<task_id>.<field>``.
+    """
+    sizes = {}
+    for task in serialized["dag"].get("tasks", []):
+        task = task.get("__var", task)
+        for field in task.get("template_fields", []):
+            if field in task:
+                value = json.dumps(task[field], sort_keys=True, default=str)
+                sizes[f"{task['task_id']}.{field}"] = len(value.encode("utf-8"))
+    return sizes
+
+
+def measure_dag(dag):
+    """
+    Serialize a DAG the way the scheduler stores it and collect its metrics.
+    """
+    serialized = SerializedDAG.to_dict(dag)
+    payload = json.dumps(serialized, sort_keys=True).encode("utf-8")
+    field_sizes = template_field_sizes(serialized)
+    largest_field = max(field_sizes, key=field_sizes.get, default=None)
+
+    return {
+        "serialized_bytes": len(payload),
+        "task_count": len(dag.tasks),
+        "edge_count": sum(len(task.downstream_task_ids) for task in dag.tasks),
+        "graph_depth": graph_depth(dag),
+        "max_template_field_bytes": field_sizes.get(largest_field, 0),
+        "largest_template_field": largest_field,
+    }
+
+
+@pytest.fixture(scope="module")
+def budget_report():
+    """
+    Collect the metrics of every DAG and write them out once all checks ran.
+    """
+    report = {}
+    yield report
+
+    REPORT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    REPORT_PATH.write_text(
+        json.dumps({"budgets": DAG_BUDGETS, "dags": report}, indent=2)
+    )
+
+
+@pytest.mark.parametrize(
+    "dag_id,dag,fileloc", get_dags(), ids=[x[2] for x in get_dags()]
+)
+def test_dag_serialization_budget(dag_id, dag, fileloc, budget_report):
+    """
+    Test that the serialized DAG stays within the size and complexity budgets
+    """
+    metrics = measure_dag(dag)
+    over_budget = {
+        name: f"{metrics[name]} > {limit}"
+        for name, limit in DAG_BUDGETS.items()
+        if metrics[name] > limit
+    }
+    budget_report[dag_id] = {
+        "fileloc": fileloc,
+        **metrics,
+        "over_budget": sorted(over_budget),
+    }
+
+    assert not over_budget, f"{dag_id} in {fileloc} is over budget: {over_budget}"
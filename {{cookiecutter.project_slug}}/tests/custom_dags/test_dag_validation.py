@@ -3,12 +3,17 @@ import os
 import pytest
 
 from airflow.exceptions import AirflowDagCycleException
-from airflow.models import DagBag
 from airflow.utils.dag_cycle_tester import check_cycle
 
+from common.assets import unproduced_assets
+from common.guardrails import dag_violations, load_guardrails, task_violations
+from common.resources import load_spec
 from cryptography.fernet import Fernet
 from dotenv import load_dotenv
 
+from .affected_dags import uri_matches
+from .utils import get_asset_dags, get_dag_bag, get_dags, parse_time_variable_gets
+
 load_dotenv()
 
 
@@ -49,34 +54,19 @@ def pytest_configure():
 
     initdb()
 
+
 # Add the tags for your data pipelines
 APPROVED_TAGS = {
+    "elt",
     "maintainance",
 }
 
 
-def get_dags():
-    """
-    Generate a tuple of dag_id, <DAG objects> in the DagBag
-    """
-
-    dag_bag = DagBag(include_examples=False)
-
-    def strip_path_prefix(path):
-        return os.path.relpath(path, os.environ.get("AIRFLOW_HOME"))
-
-    return [(k, v, strip_path_prefix(v.fileloc)) for k, v in dag_bag.dags.items()]
-
-
 def test_dags_parse():
     """
     Test that all dags can parse on the UI.
     """
-    dagbag = DagBag()
-    dagbag.collect_dags(
-        dag_folder=f"{os.environ.get('AIRFLOW_HOME')}/dags",
-        include_examples=False,
-    )
+    dagbag = get_dag_bag()
     assert dagbag.import_errors == {}
 
 
@@ -85,7 +75,7 @@ def test_no_cycles():
     Test that all dags have no cycles.
     i.e the tasks dependencies do not form loops.
     """
-    dag_bag = DagBag(include_examples=False)
+    dag_bag = get_dag_bag()
     try:
         for _, dag in dag_bag.dags.items():
             check_cycle(dag)
@@ -93,19 +83,6 @@ def test_no_cycles():
         pytest.fail(f"DID RAISE {AirflowDagCycleException}")
 
 
-def test_task_parameters():
-    """
-    Test all dags have set owner and catchup to false
-    """
-    dag_bag = DagBag()
-    for dag_id, dag in dag_bag.dags.items():
-        for task_id, task in dag.task_dict.items():
-            assert task.owner, f"Task {task_id} in DAG {dag_id} has no owner set"
-            assert (
-                dag.catchup is False
-            ), f"Task {task_id} in DAG {dag_id} has not set catchup to False"
-
-
 @pytest.mark.parametrize(
     "dag_id,dag,fileloc", get_dags(), ids=[x[2] for x in get_dags()]
 )
@@ -124,25 +101,77 @@ def test_dag_tags(dag_id, dag, fileloc):
 def test_dag_task(dag_id, dag, fileloc):
     """
     Test if all DAGs contain a task or taskgroup
-    and all tasks use the trigger_rule all_success
     """
     has_task = len(dag.tasks) > 0
 
     has_task_group = dag.task_group
     assert has_task or has_task_group, f"DAG {dag_id} has no tasks or task groups"
-    for task in dag.tasks:
-        t_rule = task.trigger_rule
-        assert (
-            t_rule == "all_success"
-        ), f"{task} in {dag_id} has the trigger rule {t_rule}"
 
 
 def test_dag_ids_unique():
     """
     Test that all DAG IDs are unique globally.
     """
-    dag_bag = DagBag()
+    dag_bag = get_dag_bag()
     dag_ids = [dag.dag_id for dag in dag_bag.dags.values()]
     unique_dag_ids = set(dag_ids)
 
     assert len(dag_ids) == len(unique_dag_ids), "DAG IDs are not unique"
+
+
+@pytest.mark.parametrize(
+    "dag_id,dag,fileloc", get_dags(), ids=[x[2] for x in get_dags()]
+)
+def test_no_parse_time_variable_get(dag_id, dag, fileloc):
+    """
+    Test DAG files do not call Variable.get when they are parsed,
+    use common.settings or the var template variable instead
+    """
+    with open(dag.fileloc) as f:
+        lines = parse_time_variable_gets(f.read())
+    assert not lines, f"{fileloc} calls Variable.get at parse time on lines {lines}"
+
+
+@pytest.mark.parametrize(
+    "dag_id,dag,fileloc", get_dags(), ids=[x[2] for x in get_dags()]
+)
+def test_task_resources_declared(dag_id, dag, fileloc):
+    """
+    Test all tasks use a pool and a queue declared in resources.yaml
+    """
+    spec = load_spec()
+    for task in dag.tasks:
+        assert task.pool in spec.pools, (
+            f"{task} in {dag_id} uses the undeclared pool {task.pool}"
+        )
+        assert task.queue in spec.queues, (
+            f"{task} in {dag_id} uses the undeclared queue {task.queue}"
+        )
+
+
+@pytest.mark.parametrize(
+    "dag_id,dag,fileloc", get_dags(), ids=[x[2] for x in get_dags()]
+)
+def test_dag_guardrails(dag_id, dag, fileloc):
+    """
+    Test DAGs follow guardrails.yaml, the cluster policies reject them otherwise.
+    Covers the owner, catchup and trigger rules, the rules left unset are skipped
+    """
+    rules = load_guardrails()
+    violations = dag_violations(dag, rules)
+    for task in dag.tasks:
+        violations += [f"{task.task_id}: {v}" for v in task_violations(task, rules)]
+    assert not violations, f"{dag_id} breaks the guardrails: {violations}"
+
+
+def test_consumed_assets_are_produced():
+    """
+    Test the DAGs scheduled on assets have a DAG producing each of them
+    """
+    dags, patterns = get_asset_dags()
+    missing = {
+        dag_id: sorted(u for u in uris if patterns is None or uri_matches(u, patterns))
+        for dag_id, uris in unproduced_assets(dags).items()
+    }
+    missing = {dag_id: uris for dag_id, uris in missing.items() if uris}
+    assert not missing, f"DAGs scheduled on assets no DAG produces: {missing}"
@@ -0,0 +1,163 @@
+"""
+Shared DagBag loading for the validation tests.
+
+When ``DAG_VALIDATION_BASE_REF`` is set only the DAG files affected by the
+changes since that git ref are parsed, otherwise every DAG is.
+"""
+
+import ast
+import functools
+import logging
+import os
+import subprocess
+
+from airflow.configuration import conf
+from airflow.models import DagBag
+
+from .affected_dags import (
+    affected_dag_files,
+    asset_check_files,
+    changed_files,
+    merge_base,
+    repo_root,
+    source_at,
+)
+
+log = logging.getLogger(__name__)
+
+
+@functools.cache
+def _change():
+    """
+    Return the repository root, the merge base and the changed files, or
+    ``None`` to validate every DAG.
+    """
+    base_ref = os.environ.get("DAG_VALIDATION_BASE_REF")
+    if not base_ref:
+        return None
+
+    try:
+        root = repo_root()
+        return root, merge_base(base_ref, root), changed_files(base_ref, root)
+    except subprocess.CalledProcessError as e:
+        log.warning("Could not diff against %s, validating all DAGs: %s", base_ref, e)
+        return None
+
+
+def _roots():
+    return [conf.get("core", "dags_folder"), conf.get("core", "plugins_folder")]
+
+
+def selected_dag_files():
+    """
+    Return the DAG files to validate, or ``None`` to validate all of them.
+    """
+    change = _change()
+    if change is None:
+        return None
+    root, _, changed = change
+    dags_folder = conf.get("core", "dags_folder")
+    return affected_dag_files(changed, dags_folder, roots=_roots(), root=root)
+
+
+def _parse(files):
+    dag_bag = DagBag(include_examples=False, collect_dags=False)
+    for path in files:
+        dag_bag.process_file(str(path), only_if_updated=False)
+    return dag_bag
+
+
+@functools.cache
+def get_dag_bag():
+    """
+    Parse the selected DAG files once for the whole test session.
+    """
+    files = selected_dag_files()
+    if files is None:
+        return DagBag(include_examples=False)
+
+    log.warning("Validating %d affected DAG files", len(files))
+    return _parse(files)
+
+
+@functools.cache
+def get_asset_dags():
+    """
+    Return the DAGs to check the assets of and the asset key patterns to
+    check, ``None`` for all of them.
+
+    Only the affected DAG files are validated: the DAG files mentioning the
+    assets of the change are parsed too, see ``asset_check_files``.
+    """
+    files = selected_dag_files()
+    if files is None:
+        return list(get_dag_bag().dags.values()), None
+
+    root, base, changed = _change()
+    asset_files, patterns = asset_check_files(
+        files,
+        changed,
+        conf.get("core", "dags_folder"),
+        roots=_roots(),
+        root=root,
+        old=lambda relative: source_at(base, relative, root),
+    )
+    log.warning("Checking the assets of %d DAG files", len(asset_files))
+    return list(_parse(asset_files).dags.values()), patterns
+
+
+def get_dags():
+    """
+    Generate a tuple of dag_id, <DAG objects> in the DagBag
+    """
+
+    dag_bag = get_dag_bag()
+
+    def strip_path_prefix(path):
+        return os.path.relpath(path, os.environ.get("AIRFLOW_HOME"))
+
+    return [(k, v, strip_path_prefix(v.fileloc)) for k, v in dag_bag.dags.items()]
+
+
+def _name(node):
+    return node.attr if isinstance(node, ast.Attribute) else getattr(node, "id", "")
+
+
+def _is_dag_decorator(node):
+    return _name(node.func if isinstance(node, ast.Call) else node) == "dag"
+
+
+def _is_variable_get(node):
+    if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)):
+        return False
+    return node.func.attr == "get" and _name(node.func.value) == "Variable"
+
+
+def parse_time_variable_gets(source):
+    """
+    Return the line numbers of the ``Variable.get`` calls run when a DAG file
+    is parsed: at module level or in the body of a ``@dag`` function, but not
+    in task callables.
+    """
+    lines = []
+
+    def visit(node, parse_time):
+        if isinstance(node, ast.FunctionDef | ast.AsyncFunctionDef | ast.Lambda):
+            # Defaults and decorators are evaluated when the function is defined
+            defaults = [*node.args.defaults, *node.args.kw_defaults]
+            decorators = getattr(node, "decorator_list", [])
+            for child in [*defaults, *decorators]:
+                if child is not None:
+                    visit(child, parse_time)
+            body_parse_time = parse_time and any(map(_is_dag_decorator, decorators))
+            body = node.body if isinstance(node.body, list) else [node.body]
+            for child in body:
+                visit(child, body_parse_time)
+            return
+        if parse_time and _is_variable_get(node):
+            lines.append(node.lineno)
+        for child in ast.iter_child_nodes(node):
+            visit(child, parse_time)
+
+    visit(ast.parse(source), parse_time=True)
+    return sorted(lines)
@@ -0,0 +1,74 @@
+import socket
+import sys
+
+import pytest
+
+from scripts.airflow_launcher import Component, Supervisor, airflow_components
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+@pytest.mark.parametrize(
+    "major_version,standalone,expected",
+    [
+        (2, False, ["webserver", "scheduler", "triggerer"]),
+        (2, True, ["webserver", "scheduler", "dag-processor", "triggerer"]),
+        (3, False, ["api-server", "scheduler", "dag-processor", "triggerer"]),
+    ],
+)
+def test_airflow_components(major_version, standalone, expected):
+    """
+    Test the component set follows the Airflow major version
+    """
+    components = airflow_components(major_version, standalone_dag_processor=standalone)
+
+    assert [c.name for c in components] == expected
+
+
+def test_supervisor_waits_for_health_and_reports(tmp_path):
+    """
+    Test components start in parallel and the time to ready is reported
+    """
+    port = free_port()
+    components = [
+        Component(
+            "http",
+            [sys.executable, "-m", "http.server", str(port), "-d", str(tmp_path)],
+            health_url=f"http://localhost:{port}/",
+        ),
+        Component(
+            "check",
+            [sys.executable, "-c", "import time; time.sleep(60)"],
+            health_command=[sys.executable, "-c", "pass"],
+        ),
+    ]
+    supervisor = Supervisor(components, log_dir=tmp_path, ready_timeout=30)
+    try:
+        report = supervisor.run(until_ready=True)
+    finally:
+        supervisor.shutdown()
+
+    assert set(report["components"]) == {"http", "check"}
+    assert report["cold_start_seconds"] >= max(report["components"].values())
+    assert (tmp_path / "startup.json").exists()
+    assert all(p.poll() is not None for p in supervisor.processes.values())
+
+
+def test_supervisor_restarts_crashed_components(tmp_path):
+    """
+    Test a crashing component is restarted until it gives up
+    """
+    components = [Component("crash", [sys.executable, "-c", "raise SystemExit(3)"])]
+    supervisor = Supervisor(
+        components, log_dir=tmp_path, ready_timeout=30, max_restarts=2
+    )
+
+    with pytest.raises(RuntimeError, match="crash crashed 2 times"):
+        supervisor.run()
+    supervisor.shutdown()
+
+    assert supervisor.restarts["crash"] == 3
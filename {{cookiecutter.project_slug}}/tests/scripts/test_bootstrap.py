@@ -0,0 +1,87 @@
+import subprocess
+import zipfile
+
+from scripts.bootstrap import Steps, lock_key, missing_wheels, sync, venv_python
+
+LOCK = "# Generated by scripts/bootstrap.py lock, do not edit\ntinypkg==1.0\n"
+
+
+def build_wheel(wheelhouse, name="tinypkg", version="1.0"):
+    wheelhouse.mkdir(parents=True, exist_ok=True)
+    dist_info = f"{name}-{version}.dist-info"
+    files = {
+        f"{name}.py": "VALUE = 42\n",
+        f"{dist_info}/METADATA": (
+            f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n"
+        ),
+        f"{dist_info}/WHEEL": (
+            "Wheel-Version: 1.0\nGenerator: test\nRoot-Is-Purelib: true\n"
+            "Tag: py3-none-any\n"
+        ),
+    }
+    record = "".join(f"{path},,\n" for path in files) + f"{dist_info}/RECORD,,\n"
+    with zipfile.ZipFile(wheelhouse / f"{name}-{version}-py3-none-any.whl", "w") as z:
+        for path, content in files.items():
+            z.writestr(path, content)
+        z.writestr(f"{dist_info}/RECORD", record)
+
+
+def test_missing_wheels_and_key_follow_the_lock(tmp_path):
+    """
+    Test only the pins without a wheel are fetched and the key is the lock's
+    """
+    lock_file = tmp_path / "requirements.lock"
+    lock_file.write_text(LOCK + "Other.Pkg==2.0 ; python_version >= '3.8'\n")
+    build_wheel(tmp_path / "wheels")
+
+    assert missing_wheels(lock_file, tmp_path / "wheels") == ["Other.Pkg==2.0"]
+    key = lock_key(lock_file, tmp_path)
+    lock_file.write_text(LOCK)
+    assert lock_key(lock_file, tmp_path) != key
+
+
+def test_sync_reuses_the_cached_venv(tmp_path):
+    """
+    Test the venv is built offline from the wheelhouse once, then reused
+    """
+    lock_file = tmp_path / "requirements.lock"
+    lock_file.write_text(LOCK)
+    cache = tmp_path / "cache"
+    build_wheel(cache / "wheels")
+    link = tmp_path / ".venv"
+
+    first_steps, second_steps = Steps(), Steps()
+    venv = sync(
+        link,
+        lock_file,
+        cache,
+        tmp_path,
+        install_project=False,
+        steps=first_steps,
+    )
+    again = sync(
+        link,
+        lock_file,
+        cache,
+        tmp_path,
+        install_project=False,
+        steps=second_steps,
+    )
+
+    assert again == venv
+    assert link.resolve() == venv.resolve()
+    output = subprocess.run(
+        [venv_python(link), "-c", "import tinypkg; print(tinypkg.VALUE)"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    assert output == "42\n"
+    assert "install" in dict(first_steps.timings)
+    assert [name for name, _ in second_steps.timings] == [
+        "hash lock",
+        "reuse cached venv",
+    ]
+    lines = []
+    second_steps.report(lines.append)
+    assert lines[-1].startswith("total")
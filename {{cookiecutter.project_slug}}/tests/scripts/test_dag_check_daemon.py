@@ -0,0 +1,108 @@
+import shutil
+
+import pytest
+
+from scripts.dag_check_daemon import main
+from tests.conftest import PROJECT_ROOT
+
+GOOD_DAG = """
+import pendulum
+from airflow import DAG
+from airflow.operators.empty import EmptyOperator
+from common.names import DAG_ID
+
+with DAG(
+    DAG_ID, start_date=pendulum.datetime(2024, 1, 1), schedule=None, catchup=False
+):
+    EmptyOperator(task_id="noop")
+"""
+
+LABELLED_DAG = """
+import pendulum
+from airflow import DAG
+from airflow.operators.empty import EmptyOperator
+from common.labels import LABEL
+
+with DAG(
+    LABEL, start_date=pendulum.datetime(2024, 1, 1), schedule=None, catchup=False
+):
+    EmptyOperator(task_id="noop")
+"""
+
+BROKEN_DAG = """
+from airflow import DAG
+import missing_module
+"""
+
+
+@pytest.fixture
+def dags_folder(tmp_path):
+    folder = tmp_path / "dags"
+    project_dags = PROJECT_ROOT / "airflow" / "dags"
+    shutil.copytree(
+        project_dags / "common",
+        folder / "common",
+        ignore=shutil.ignore_patterns("__pycache__"),
+    )
+    shutil.copy(project_dags / "resources.yaml", folder)
+    shutil.copy(project_dags / "guardrails.yaml", folder)
+    (folder / "common" / "names.py").write_text('DAG_ID = "good_dag"\n')
+    (folder / "common" / "labels.py").write_text(
+        'from common.names import DAG_ID\n\nLABEL = f"{DAG_ID}_label"\n'
+    )
+    (folder / "good.py").write_text(GOOD_DAG)
+    (folder / "labelled.py").write_text(LABELLED_DAG)
+    (folder / "broken.py").write_text(BROKEN_DAG)
+    return folder
+
+
+@pytest.fixture
+def daemon_args(tmp_path, dags_folder):
+    args = ["--socket", str(tmp_path / "check.sock"), "--dags-folder", str(dags_folder)]
+    yield args
+    main([*args, "stop"])
+
+
+def test_check_reports_import_errors(dags_folder, daemon_args, capsys):
+    """
+    Test the daemon parses DAG files and reports the broken ones
+    """
+    exit_code = main(
+        [
+            *daemon_args,
+            "check",
+            str(dags_folder / "good.py"),
+            str(dags_folder / "broken.py"),
+        ]
+    )
+
+    captured = capsys.readouterr()
+    assert exit_code == 1
+    assert "good_dag" in captured.out
+    assert "missing_module" in captured.err
+
+
+def test_check_picks_up_changed_common_modules(dags_folder, daemon_args, capsys):
+    """
+    Test a warm daemon sees changes to preloaded common modules
+    """
+    good = str(dags_folder / "good.py")
+    assert main([*daemon_args, "check", good]) == 0
+
+    (dags_folder / "common" / "names.py").write_text('DAG_ID = "renamed_dag"\n')
+    capsys.readouterr()
+    assert main([*daemon_args, "check", good]) == 0
+    assert "renamed_dag" in capsys.readouterr().out
+
+
+def test_check_reimports_importers_of_changed_modules(dags_folder, daemon_args, capsys):
+    """
+    Test a warm daemon re-imports the preloaded modules importing a changed one
+    """
+    labelled = str(dags_folder / "labelled.py")
+    assert main([*daemon_args, "check", labelled]) == 0
+    assert "good_dag_label" in capsys.readouterr().out
+
+    (dags_folder / "common" / "names.py").write_text('DAG_ID = "renamed_dag"\n')
+    assert main([*daemon_args, "check", labelled]) == 0
+    assert "renamed_dag_label" in capsys.readouterr().out
@@ -0,0 +1,16 @@
+from scripts.http_ingestion_benchmark import StandInServer, measure
+
+
+def test_measure_fetches_the_same_pages_each_way():
+    """
+    Test the sequential and concurrent fetches report the same pages
+    """
+    with StandInServer(records=300, latency=0.005) as server:
+        reports = measure(server, ["/a", "/b"], page_size=100, max_concurrency=8)
+
+    assert set(reports) == {"sequential", "cursor", "offset"}
+    assert reports["sequential"]["pages"] == reports["cursor"]["pages"] == 6
+    # Offset pages are fetched until the first empty one
+    assert reports["offset"]["pages"] == 6
+    for report in reports.values():
+        assert report["requests_per_second"] > 0
@@ -0,0 +1,16 @@
+from scripts.log_latency_benchmark import FolderStore, measure
+
+
+def test_measure_writes_reads_and_cleans_up(tmp_path):
+    """
+    Test the latencies of both operations are reported and the logs deleted
+    """
+    store = FolderStore(tmp_path / "logs")
+
+    report = measure(store, logs=20, lines=50, concurrency=4)
+
+    assert set(report) == {"write", "read"}
+    for stats in report.values():
+        assert stats["per_second"] > 0
+        assert 0 < stats["p50_ms"] <= stats["p95_ms"]
+    assert not list((tmp_path / "logs").iterdir())
@@ -0,0 +1,92 @@
+from collections import Counter
+
+from sqlalchemy import Boolean, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+
+from scripts.metadata_db_benchmark import (
+    copy_columns,
+    copy_line,
+    history,
+    hot_queries,
+    plan_findings,
+    recommend,
+)
+
+
+def test_history_rows():
+    """
+    Test the DAG runs and task instances seeded for each DAG
+    """
+    rows = list(history(dags=20, runs=10, tasks=5))
+    tables = Counter(table for table, _ in rows)
+    runs = {(row["dag_id"], row["run_id"]) for table, row in rows if table == "dag_run"}
+    task_instances = [row for table, row in rows if table == "task_instance"]
+
+    assert tables == {"dag": 20, "dag_run": 200, "task_instance": 1000}
+    assert {(row["dag_id"], row["run_id"]) for row in task_instances} == runs
+    # The latest run of bench_00000 is running and has a task to schedule
+    assert {row.get("state") for row in task_instances} >= {
+        "success",
+        "running",
+        "scheduled",
+    }
+
+
+def test_copy_columns_fill_required_columns():
+    """
+    Test the required columns missing from the seed rows get fallback values
+    """
+    columns = [
+        {"name": "id", "type": UUID(), "nullable": False, "default": None},
+        {"name": "dag_id", "type": String(), "nullable": False, "default": None},
+        {"name": "note", "type": String(), "nullable": True, "default": None},
+        {"name": "map_index", "type": Integer(), "nullable": False, "default": "-1"},
+        {"name": "is_paused", "type": Boolean(), "nullable": False, "default": None},
+    ]
+
+    names, fallbacks = copy_columns(columns, {"dag_id": "a\tb", "note": None})
+    line = copy_line(names, fallbacks, {"dag_id": "a\tb", "note": None})
+
+    assert names == ["dag_id", "note", "id", "is_paused"]
+    dag_id, note, id_, is_paused = line.rstrip("\n").split("\t")
+    assert (dag_id, note, is_paused) == ("a\\tb", r"\N", "f")
+    assert len(id_) == 36
+
+
+def test_recommend_uncovered_indexes():
+    """
+    Test indexes are recommended for slow queries only when none covers them
+    """
+    plan = {
+        "Plan": {
+            "Node Type": "Limit",
+            "Plans": [
+                {
+                    "Node Type": "Seq Scan",
+                    "Relation Name": "task_instance",
+                    "Actual Rows": 100,
+                    "Actual Loops": 1,
+                    "Rows Removed by Filter": 50_000,
+                }
+            ],
+        }
+    }
+    queries = {query.name: query for query in hot_queries()}
+    results = [
+        {
+            "query": queries["task_duration_batch"],
+            "p95_ms": 250.0,
+            "findings": plan_findings(plan),
+        },
+        {"query": queries["grid_dag_runs"], "p95_ms": 500.0, "findings": []},
+        {"query": queries["task_duration_chart"], "p95_ms": 1.0, "findings": []},
+    ]
+    existing = {"dag_run": [(["dag_id", "execution_date"], False)]}
+
+    sql = recommend(results, existing, task_instances=20_000_000, budget_ms=100)
+
+    assert results[0]["findings"] == ["seq scan on task_instance (50,100 rows)"]
+    assert "ON task_instance (state, end_date);" in sql
+    assert "ON dag_run" not in sql
+    assert "task_id, start_date" not in sql
+    assert "airflow db clean" in sql
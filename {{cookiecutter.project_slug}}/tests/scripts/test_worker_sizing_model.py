@@ -0,0 +1,51 @@
+from common.resources import load_spec
+from scripts.worker_sizing_model import (
+    WorkerPool,
+    single_pool,
+    simulate,
+    worker_pools,
+    workload,
+)
+from tests.conftest import PROJECT_ROOT
+
+
+def test_compose_workers_consume_declared_queues():
+    """
+    Test every queue of resources.yaml has a worker with a memory limit
+    """
+    pools = worker_pools(PROJECT_ROOT / "docker-compose.local.yml")
+
+    assert {q for pool in pools for q in pool.queues} == set(load_spec().queues)
+    assert all(pool.memory for pool in pools)
+
+
+def test_prefetching_holds_short_tasks_behind_long_ones():
+    """
+    Test a worker runs the tasks it reserved in order, even when another is idle
+    """
+    tasks = [("default", 10.0), ("default", 1.0), ("default", 1.0)]
+
+    def finished(prefetch_multiplier):
+        pool = WorkerPool("w", ("default",), 1, prefetch_multiplier, replicas=2)
+        return simulate([pool], tasks)["default"]["finished_seconds"]
+
+    assert finished(prefetch_multiplier=1) == 10.0
+    assert finished(prefetch_multiplier=4) == 11.0
+
+
+def test_per_queue_workers_raise_throughput():
+    """
+    Test splitting the queues beats a single pool sized for the heavy tasks
+    """
+    pools = [
+        WorkerPool("light", ("default",), 16, 4, replicas=2, memory=2 * 2**30),
+        WorkerPool("heavy", ("heavy",), 4, 1, memory=8 * 2**30),
+    ]
+    tasks = workload(500, 10, light_seconds=5, heavy_seconds=600)
+
+    single = simulate([single_pool(pools, task_memory=2 * 2**30)], tasks)
+    split = simulate(pools, tasks)
+
+    assert single_pool(pools, task_memory=2 * 2**30).concurrency == 6
+    assert split["default"]["per_minute"] > 5 * single["default"]["per_minute"]
+    assert split["heavy"]["finished_seconds"] <= single["heavy"]["finished_seconds"]